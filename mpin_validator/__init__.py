@@ -0,0 +1,53 @@
+"""
+MPIN validators and the engine that serves them.
+
+The validator classes live in ``validators.py``; the other modules
+precompute and serve their results so that production checks do not
+have to run the detector pipeline. Importing the package loads nothing:
+each name below is imported on first access, so a short-lived worker
+that only checks PINs never pays for NumPy, asyncio or multiprocessing::
+
+    from mpin_validator import UniversalMPINValidator
+"""
+
+import importlib
+
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "MPINValidator": "validators",
+    "EnhancedMPINValidator": "validators",
+    "DetailedMPINValidator": "validators",
+    "SixDigitMPINValidator": "validators",
+    "UniversalMPINValidator": "validators",
+    "DemographicProfile": "validators",
+    "MPINResult": "validators",
+    "check_batch": "vectorized",
+    "BatchEvaluator": "service",
+    "ValidationService": "service",
+    "ParallelAuditor": "parallel",
+    "DemographicStore": "demographics",
+    "Policy": "rules",
+}
+
+_SUBMODULES = (
+    "audit", "bench", "datelike", "dates", "demographics", "entropy", "guessrank", "instrumentation",
+    "loadgen", "ordering", "parallel", "reasons", "rules", "service", "shared", "suggest", "tables",
+    "validators", "vectorized",
+)
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
@@ -0,0 +1,173 @@
+"""
+Non-interactive bulk audit of PINs and demographics.
+
+Records stream from a CSV or JSONL file (or stdin) through a generator
+pipeline, are checked in chunks on every core, and are written to stdout
+in input order, so memory stays constant however large the input is::
+
+    python -m mpin_validator.audit customers.csv --format jsonl > results.jsonl
+
+Each record carries ``pin`` and optionally ``dob``, ``spouse_dob`` and
+``anniversary`` in DD-MM-YYYY format. A JSONL line that is not a JSON
+object is reported as an error row in its place, like an invalid PIN.
+"""
+
+import argparse
+import collections
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+from mpin_validator.parallel import ParallelAuditor
+
+
+FIELDS = ("pin", "dob", "spouse_dob", "anniversary")
+OUTPUT_FIELDS = ("mpin", "strength", "reasons", "error")
+
+Record = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+class MalformedRecord:
+    """An input line that holds no record, audited as an error row"""
+
+    __slots__ = ("line", "error")
+
+    def __init__(self, line: int, error: str):
+        self.line = line
+        self.error = error
+
+    def __eq__(self, other):
+        return isinstance(other, MalformedRecord) and (self.line, self.error) == (other.line, other.error)
+
+    def __repr__(self) -> str:
+        return f"MalformedRecord({self.line!r}, {self.error!r})"
+
+    def result(self) -> Dict:
+        return {"mpin": "", "error": f"Line {self.line}: {self.error}"}
+
+
+def _json_rows(stream: TextIO) -> Iterator[Union[Dict, MalformedRecord]]:
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield MalformedRecord(number, "not valid JSON")
+            continue
+        yield row if isinstance(row, dict) else MalformedRecord(number, "not a JSON object")
+
+
+def read_records(stream: TextIO, input_format: str) -> Iterator[Union[Record, MalformedRecord]]:
+    """
+    Yield (pin, dob, spouse_dob, anniversary) tuples from a CSV or JSONL stream.
+
+    Missing or empty demographic fields become None. JSONL lines that are
+    not JSON objects yield a MalformedRecord instead.
+    """
+    if input_format == "csv":
+        rows = csv.DictReader(stream)
+    elif input_format == "jsonl":
+        rows = _json_rows(stream)
+    else:
+        raise ValueError(f"Unsupported input format: {input_format}")
+
+    for row in rows:
+        if isinstance(row, MalformedRecord):
+            yield row
+            continue
+        pin = row.get("pin")
+        yield (str(pin) if pin is not None else "",) + tuple(row.get(field) or None for field in FIELDS[1:])
+
+
+def audit(records: Iterable[Union[Record, MalformedRecord]], workers: int = 1,
+          chunk_size: int = 1000) -> Iterator[Dict]:
+    """
+    Check records on a process pool and yield results in input order.
+
+    Chunks are shipped to workers in a compact form and at most two per
+    worker are in flight (see parallel.ParallelAuditor), so a slow
+    consumer or a huge input does not pile up results in memory.
+    MalformedRecords skip the pool and yield their error row in place.
+    """
+    # Error rows, and the input position of each record sent to the pool,
+    # in the order the pool reads them
+    malformed = collections.deque()
+    positions = collections.deque()
+
+    def checked() -> Iterator[Record]:
+        for position, record in enumerate(records):
+            if isinstance(record, MalformedRecord):
+                malformed.append((position, record.result()))
+            else:
+                positions.append(position)
+                yield record
+
+    with ParallelAuditor(workers, chunk_size) as auditor:
+        for result in auditor.audit(checked()):
+            position = positions.popleft()
+            while malformed and malformed[0][0] < position:
+                yield malformed.popleft()[1]
+            yield result
+    while malformed:
+        yield malformed.popleft()[1]
+
+
+def write_results(results: Iterable[Dict], stream: TextIO, output_format: str) -> int:
+    """Write results as JSONL or CSV and return how many were written"""
+    count = 0
+    if output_format == "jsonl":
+        for result in results:
+            stream.write(json.dumps(result) + "\n")
+            count += 1
+    elif output_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            row = dict(result)
+            row["reasons"] = ";".join(result.get("reasons", []))
+            writer.writerow(row)
+            count += 1
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    return count
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Audit PINs and demographics in bulk")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="CSV or JSONL file of records (default: stdin)")
+    parser.add_argument("--input-format", choices=("csv", "jsonl"),
+                        help="Input format (default: from the file extension, else jsonl)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl",
+                        help="Output format (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Records per work unit (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format
+    if input_format is None:
+        input_format = "csv" if args.input.lower().endswith(".csv") else "jsonl"
+
+    started = time.perf_counter()
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    try:
+        records = read_records(stream, input_format)
+        count = write_results(audit(records, args.workers, args.chunk_size), sys.stdout, args.format)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    elapsed = time.perf_counter() - started
+
+    rate = count / elapsed if elapsed else 0.0
+    print(f"Audited {count} records in {elapsed:.2f}s ({rate:,.0f} records/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
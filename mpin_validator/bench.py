@@ -0,0 +1,478 @@
+"""
+Benchmark suite for every validator generation and pattern detector.
+
+Each validator class from parta to parte runs check_mpin over fixed,
+seeded workloads, and every detector in a class's pattern_detectors is
+timed on its own over the same PINs. parta to partd are scripts at the
+repository root, so run the suite from there. Results are printed as
+JSON so runs can be compared across commits::
+
+    python -m mpin_validator.bench --size 5000 --repeat 3 --output bench.json
+
+Workloads:
+    weak-heavy         mostly sequences, repeats, palindromes and years
+    strong-heavy       distinct, non-adjacent digits
+    demographic-hit    PINs derived from the customer's own dates
+    mixed-length       uniform 4- and 6-digit PINs, half with demographics
+
+The report also times a cold import of the core engine in fresh
+interpreters; the command exits with status 1 when it is over budget::
+
+    python -m mpin_validator.bench --import-only --import-budget 50
+
+Thread scaling shares one UniversalMPINValidator between threads that
+call the stateless check() with prebuilt profiles::
+
+    python -m mpin_validator.bench --threads 1,2,4,8
+
+Every timed loop first waits for the weakness table builds its warm-up
+started, and its row records in "tables_warm" whether parte's
+validators then answered from their tables.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mpin_validator import tables, validators as core
+
+
+Profile = Tuple[Optional[str], Optional[str], Optional[str]]
+Workload = List[Tuple[str, Profile]]
+
+NO_PROFILE = (None, None, None)
+
+# Cold import of the core engine, in milliseconds
+IMPORT_BUDGET_MS = 50.0
+
+# Modules the core engine must leave to the code paths that need them
+HEAVY_MODULES = ("numpy", "asyncio", "multiprocessing", "concurrent.futures", "unittest", "argparse")
+
+# (name, supported PIN lengths) for every validator generation
+VALIDATORS = (
+    ("parta.MPINValidator", (4,)),
+    ("partb.MPINValidator", (4,)),
+    ("partb.EnhancedMPINValidator", (4,)),
+    ("partc.MPINValidator", (4,)),
+    ("partc.EnhancedMPINValidator", (4,)),
+    ("partc.DetailedMPINValidator", (4,)),
+    ("partd.MPINValidator", (6,)),
+    ("partd.EnhancedMPINValidator", (6,)),
+    ("partd.DetailedMPINValidator", (6,)),
+    ("partd.SixDigitMPINValidator", (6,)),
+    ("parte.MPINValidator", (4,)),
+    ("parte.EnhancedMPINValidator", (4,)),
+    ("parte.DetailedMPINValidator", (4,)),
+    ("parte.SixDigitMPINValidator", (6,)),
+    ("parte.UniversalMPINValidator", (4, 6)),
+)
+
+
+def load_validator(name: str) -> Callable:
+    """
+    The validator class of a generation, e.g. "partc.DetailedMPINValidator".
+
+    parta to partd are scripts at the repository root, imported only when
+    their generation is benchmarked; parte's validators are the package's
+    own, so its test module is never imported.
+    """
+    module, _, attribute = name.partition(".")
+    if module == "parte":
+        return getattr(core, attribute)
+    return getattr(importlib.import_module(module), attribute)
+
+
+def _random_date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1950, 2005)}"
+
+
+def _weak_pin(rng: random.Random, length: int) -> str:
+    """A PIN with one of the classic weak shapes"""
+    start = rng.randrange(10)
+    shape = rng.randrange(5)
+    if shape == 0:
+        step = rng.choice((1, -1))
+        return "".join(str((start + step * i) % 10) for i in range(length))
+    if shape == 1:
+        return str(start) * length
+    if shape == 2:
+        half = "".join(str(rng.randrange(10)) for _ in range((length + 1) // 2))
+        return (half + half[::-1][length % 2:])[:length]
+    if shape == 3:
+        pair = f"{start}{rng.randrange(10)}"
+        return (pair * length)[:length]
+    year = str(rng.randint(1950, 2025))
+    return (year + year[2:] * 2)[:length]
+
+
+def _strong_pin(rng: random.Random, length: int) -> str:
+    """A PIN of distinct digits with no two neighbours one step apart"""
+    while True:
+        digits = rng.sample(range(10), length)
+        if all(abs(a - b) not in (1, 9) for a, b in zip(digits, digits[1:])):
+            return "".join(map(str, digits))
+
+
+def _date_pin(rng: random.Random, date_str: str, length: int) -> str:
+    """A PIN derived from a DD-MM-YYYY date"""
+    day, month, year = date_str.split("-")
+    if length == 4:
+        return rng.choice((day + month, month + day, year, day + year[2:]))
+    return rng.choice((day + month + year[2:], year[2:] + month + day,
+                       month + day + year[2:], day + month + year[:2]))
+
+
+def make_workloads(size: int, seed: int = 0) -> Dict[str, Workload]:
+    """
+    Build the seeded workloads.
+
+    Args:
+        size (int): PINs per workload and length
+        seed (int): Random seed
+
+    Returns:
+        dict: Workload name -> list of (pin, profile); profiles repeat
+        over short runs, as they do for one customer's attempts
+    """
+    rng = random.Random(seed)
+    workloads = {}
+
+    for name, pick in (("weak-heavy", lambda length: _weak_pin(rng, length)
+                        if rng.random() < 0.9 else _strong_pin(rng, length)),
+                       ("strong-heavy", lambda length: _strong_pin(rng, length)
+                        if rng.random() < 0.9 else _weak_pin(rng, length))):
+        workloads[name] = [(pick(length), NO_PROFILE) for length in (4, 6) for _ in range(size)]
+
+    hits = []
+    for length in (4, 6):
+        target = len(hits) + size
+        while len(hits) < target:
+            profile = (_random_date(rng), _random_date(rng), _random_date(rng))
+            for _ in range(8):
+                hits.append((_date_pin(rng, rng.choice(profile), length), profile))
+    workloads["demographic-hit"] = hits
+
+    mixed = []
+    while len(mixed) < 2 * size:
+        profile = (_random_date(rng), None, None) if rng.random() < 0.5 else NO_PROFILE
+        for _ in range(8):
+            length = rng.choice((4, 6))
+            mixed.append((f"{rng.randrange(10 ** length):0{length}d}", profile))
+    workloads["mixed-length"] = mixed
+    return workloads
+
+
+def _best_of(repeat: int, run: Callable[[], float]) -> float:
+    return min(run() for _ in range(repeat))
+
+
+def tables_warm(validator) -> Optional[bool]:
+    """
+    Check that a validator, or each one inside a UniversalMPINValidator, has its weakness table ready.
+
+    Returns:
+        bool or None: None for the older generations, which have no tables
+    """
+    checkers = list(getattr(validator, "validators", {}).values()) or [validator]
+    if not all(isinstance(checker, core.MPINValidator) for checker in checkers):
+        return None
+    return all(tables.detector_mask(checker) is not None
+               and tables.get_table(checker, getattr(checker, "pin_length", 4)) is not None
+               for checker in checkers)
+
+
+def _warm_up(validator, calls: Callable[[], object]) -> Optional[bool]:
+    """
+    Run calls, wait for the table builds they started and run them again,
+    so one-off builds and loads stay out of the measurement.
+
+    Returns:
+        bool or None: tables_warm(validator) once warmed up
+    """
+    calls()
+    tables.wait_for_builds()
+    calls()
+    return tables_warm(validator)
+
+
+def time_check_mpin(factory: Callable, workload: Workload, repeat: int = 1) -> Dict:
+    """
+    Time check_mpin over a workload, calling set_demographics per profile.
+
+    Returns:
+        dict: calls, best-of-repeat check and profile seconds, ns per call,
+        the fraction of PINs rated weak and whether the tables were warm
+    """
+    validator = factory()
+    has_demographics = hasattr(validator, "set_demographics")
+    # One PIN of each length loads or builds every table the workload reads
+    samples = {}
+    for pin, _ in workload:
+        samples.setdefault(len(pin), pin)
+
+    def warm():
+        if has_demographics:
+            validator.set_demographics(*workload[0][1])
+        for pin in samples.values():
+            validator.check_mpin(pin)
+
+    warm_tables = _warm_up(validator, warm)
+    groups = []
+    for pin, profile in workload:
+        if groups and groups[-1][0] == profile:
+            groups[-1][1].append(pin)
+        else:
+            groups.append((profile, [pin]))
+
+    weak = 0
+    profile_seconds = float("inf")
+    check_seconds = float("inf")
+    for _ in range(repeat):
+        setup = checks = 0.0
+        weak = 0
+        for profile, pins in groups:
+            if has_demographics:
+                started = time.perf_counter()
+                validator.set_demographics(*profile)
+                setup += time.perf_counter() - started
+            check = validator.check_mpin
+            started = time.perf_counter()
+            results = [check(pin) for pin in pins]
+            checks += time.perf_counter() - started
+            weak += sum(result.get("strength") == "WEAK" for result in results)
+        profile_seconds = min(profile_seconds, setup)
+        check_seconds = min(check_seconds, checks)
+
+    return {
+        "calls": len(workload),
+        "check_seconds": round(check_seconds, 6),
+        "profile_seconds": round(profile_seconds, 6),
+        "ns_per_call": round(check_seconds / len(workload) * 1e9),
+        "weak_fraction": round(weak / len(workload), 4),
+        "tables_warm": warm_tables,
+    }
+
+
+def time_threads(workload: Workload, thread_counts=(1, 2, 4), repeat: int = 1) -> List[Dict]:
+    """
+    Time one shared UniversalMPINValidator checking a workload from several threads.
+
+    Each customer's profile is built once up front, as a service would
+    cache it, and each thread checks an equal share of the workload with
+    check(). With the GIL the threads take turns, so the rows measure
+    contention; a free-threaded interpreter shows the scaling.
+
+    Returns:
+        list: A row per thread count with wall seconds, checks per second,
+        the speedup over the first count and whether the tables were warm
+    """
+    validator = core.UniversalMPINValidator()
+    profiles = {profile: validator.make_profile(*profile) for profile in {profile for _, profile in workload}}
+    calls = [(pin, profiles[profile]) for pin, profile in workload]
+    check = validator.check
+
+    def warm():
+        for pin, profile in calls:
+            check(pin, profile)
+
+    warm_tables = _warm_up(validator, warm)
+
+    def work(barrier: threading.Barrier, share):
+        barrier.wait()
+        for pin, profile in share:
+            check(pin, profile)
+
+    rows = []
+    for threads in thread_counts:
+        def run():
+            barrier = threading.Barrier(threads + 1)
+            workers = [threading.Thread(target=work, args=(barrier, calls[i::threads])) for i in range(threads)]
+            for worker in workers:
+                worker.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for worker in workers:
+                worker.join()
+            return time.perf_counter() - started
+
+        seconds = _best_of(repeat, run)
+        rows.append({
+            "threads": threads,
+            "calls": len(calls),
+            "seconds": round(seconds, 6),
+            "checks_per_second": round(len(calls) / seconds),
+            "speedup": round(rows[0]["seconds"] / seconds, 2) if rows else 1.0,
+            "tables_warm": warm_tables,
+        })
+    return rows
+
+
+def time_detector(detector: Callable[[str], bool], pins: List[str], repeat: int = 1) -> Dict:
+    """Time one detector over PINs and report its hit rate"""
+    def run():
+        started = time.perf_counter()
+        for pin in pins:
+            detector(pin)
+        return time.perf_counter() - started
+
+    seconds = _best_of(repeat, run)
+    hits = sum(1 for pin in pins if detector(pin))
+    return {
+        "calls": len(pins),
+        "seconds": round(seconds, 6),
+        "ns_per_call": round(seconds / len(pins) * 1e9),
+        "hit_rate": round(hits / len(pins), 4),
+    }
+
+
+def _detector_owners():
+    """Classes that define a pattern_detectors list, with their PIN length"""
+    return tuple((name.partition(".")[0], load_validator(name)(), length)
+                 for name, length in (("partc.MPINValidator", 4),
+                                      ("partd.MPINValidator", 6),
+                                      ("partd.SixDigitMPINValidator", 6),
+                                      ("parte.MPINValidator", 4),
+                                      ("parte.SixDigitMPINValidator", 6)))
+
+
+def measure_import(module: str = "mpin_validator.validators", repeat: int = 5,
+                   budget_ms: float = IMPORT_BUDGET_MS) -> Dict:
+    """
+    Time a cold import of a module, each run in a fresh interpreter.
+
+    Interpreter startup is excluded; the fastest run is kept.
+
+    Returns:
+        dict: "module", "ms", "budget_ms", "within_budget" and the
+        "heavy_modules" the import pulled in
+    """
+    code = ("import sys, time\n"
+            "started = time.perf_counter()\n"
+            f"import {module}\n"
+            "elapsed = time.perf_counter() - started\n"
+            f"print(elapsed, *[name for name in {HEAVY_MODULES!r} if name in sys.modules])")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    best = float("inf")
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, check=True,
+                                capture_output=True, text=True).stdout.split()
+        best = min(best, float(output[0]))
+        heavy = output[1:]
+
+    ms = best * 1000
+    return {"module": module, "ms": ms, "budget_ms": budget_ms,
+            "within_budget": ms <= budget_ms, "heavy_modules": heavy}
+
+
+def run(size: int = 2000, repeat: int = 3, seed: int = 0,
+        validators: Optional[List[str]] = None, import_budget_ms: float = IMPORT_BUDGET_MS,
+        thread_counts=(1, 2, 4)) -> Dict:
+    """
+    Run the whole suite.
+
+    Args:
+        size (int): PINs per workload and length
+        repeat (int): Runs per measurement; the fastest is kept
+        seed (int): Workload seed
+        validators (list): Validator names to run (default: all)
+        import_budget_ms (float): Budget for the core engine import
+        thread_counts (iterable): Threads to time the shared validator with
+
+    Returns:
+        dict: JSON-serializable report with "import", "check_mpin",
+        "detectors" and "threads" rows
+    """
+    workloads = make_workloads(size, seed)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)(),
+        "size": size,
+        "repeat": repeat,
+        "seed": seed,
+        "import": measure_import(repeat=repeat, budget_ms=import_budget_ms),
+        "check_mpin": [],
+        "detectors": [],
+    }
+
+    for name, lengths in VALIDATORS:
+        if validators is not None and name not in validators:
+            continue
+        factory = load_validator(name)
+        for workload_name, workload in workloads.items():
+            if workload_name == "mixed-length" and len(lengths) < 2:
+                continue
+            pins = [(pin, profile) for pin, profile in workload if len(pin) in lengths]
+            row = {"validator": name, "workload": workload_name}
+            row.update(time_check_mpin(factory, pins, repeat))
+            report["check_mpin"].append(row)
+
+    seen = set()
+    for module, owner, length in _detector_owners():
+        for detector in owner.pattern_detectors:
+            key = (module, detector.__qualname__, length)
+            if key in seen:
+                continue
+            seen.add(key)
+            for workload_name in ("weak-heavy", "strong-heavy"):
+                pins = [pin for pin, _ in workloads[workload_name] if len(pin) == length]
+                row = {"module": module, "detector": detector.__qualname__,
+                       "length": length, "workload": workload_name}
+                row.update(time_detector(detector, pins, repeat))
+                report["detectors"].append(row)
+
+    report["threads"] = time_threads(workloads["demographic-hit"] + workloads["mixed-length"],
+                                     thread_counts, repeat)
+    return report
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark every MPIN validator and detector")
+    parser.add_argument("--size", type=int, default=2000,
+                        help="PINs per workload and length (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement, fastest kept (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Workload seed (default: %(default)s)")
+    parser.add_argument("--validator", action="append", dest="validators",
+                        help="Only run this validator (repeatable), e.g. parte.UniversalMPINValidator")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--threads", default="1,2,4",
+                        help="Comma-separated thread counts sharing one validator (default: %(default)s)")
+    parser.add_argument("--import-only", action="store_true", help="Only time the core engine import")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS,
+                        help="Import budget in milliseconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.import_only:
+        report = {"import": measure_import(repeat=args.repeat, budget_ms=args.import_budget)}
+    else:
+        thread_counts = [int(count) for count in args.threads.split(",")]
+        report = run(args.size, args.repeat, args.seed, args.validators, args.import_budget, thread_counts)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    imported = report["import"]
+    if not imported["within_budget"] or imported["heavy_modules"]:
+        print(f"Importing {imported['module']} took {imported['ms']:.1f} ms "
+              f"(budget {imported['budget_ms']:.1f} ms) and loaded {imported['heavy_modules'] or 'no heavy modules'}",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Date-likeness of digit strings without exception-driven parsing.
+
+Detectors ask whether a PIN reads as a date: DDMMYY, MMDDYY or YYMMDD for
+six digits, DDMM or MMDD for four. Instead of assembling date strings
+and calling strptime inside try/except, every valid date of a format and
+year window is written once into a validity table with one byte per
+value of the keyspace, so a check is a single index. Tables are built
+from calendar arithmetic (leap years included) on first use and cached.
+
+Two-digit years are read as ``century + YY``. Four-digit formats carry
+no year; with ``calendar=False`` they only require a month of 1-12 and
+a day of 1-31, as parte's _is_pin_pattern always has.
+"""
+
+import datetime
+import functools
+import time
+from typing import Iterable, Optional, Tuple
+
+
+# Field order of each supported format
+FORMATS = {
+    "DDMMYY": ("day", "month", "year"),
+    "MMDDYY": ("month", "day", "year"),
+    "YYMMDD": ("year", "month", "day"),
+    "DDMM": ("day", "month"),
+    "MMDD": ("month", "day"),
+}
+
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def days_in_month(month: int, year: Optional[int] = None) -> int:
+    """Days in a month; February has 29 when the year is unknown"""
+    if month == 2 and (year is None or is_leap(year)):
+        return 29
+    return _MONTH_DAYS[month - 1]
+
+
+def is_valid_date(day: int, month: int, year: Optional[int] = None) -> bool:
+    """Check a calendar date with integer arithmetic only"""
+    return 1 <= month <= 12 and 1 <= day <= days_in_month(month, year)
+
+
+_current_year = 0
+_year_ends = 0.0
+
+
+def current_year() -> int:
+    """The local calendar year, re-read from the clock only when a year ends"""
+    global _current_year, _year_ends
+    if time.time() >= _year_ends:
+        year = datetime.datetime.now().year
+        _year_ends = datetime.datetime(year + 1, 1, 1).timestamp()
+        _current_year = year
+    return _current_year
+
+
+def _values(fields: Tuple[str, ...], day: int, month: int, yy: int) -> int:
+    parts = {"day": day, "month": month, "year": yy}
+    value = 0
+    for field in fields:
+        value = value * 100 + parts[field]
+    return value
+
+
+@functools.lru_cache(maxsize=32)
+def validity_table(formats: Tuple[str, ...], first_year: int = 1900, last_year: int = 2099,
+                   century: int = 2000, calendar: bool = True) -> bytes:
+    """
+    One byte per value of the formats' keyspace, 1 where it reads as a date.
+
+    Args:
+        formats (tuple): Format names of one length, e.g. ("DDMMYY", "MMDDYY")
+        first_year (int): Earliest accepted year (formats with a year)
+        last_year (int): Latest accepted year (formats with a year)
+        century (int): Added to two-digit years
+        calendar (bool): Require the day to exist in its month; when False
+            any day of 1-31 and month of 1-12 is accepted
+
+    Returns:
+        bytes: Indexed by int(pin)
+    """
+    lengths = {2 * len(FORMATS[name]) for name in formats}
+    if len(lengths) != 1:
+        raise ValueError("Formats of a validity table must share one length")
+    table = bytearray(10 ** lengths.pop())
+
+    for name in formats:
+        fields = FORMATS[name]
+        if "year" in fields:
+            years = [(yy, century + yy) for yy in range(100) if first_year <= century + yy <= last_year]
+        else:
+            years = [(0, None)]
+        for yy, year in years:
+            for month in range(1, 13):
+                last_day = days_in_month(month, year) if calendar else 31
+                for day in range(1, last_day + 1):
+                    table[_values(fields, day, month, yy)] = 1
+    return bytes(table)
+
+
+def reads_as_date(mpin: str, formats: Iterable[str], first_year: int = 1900, last_year: int = 2099,
+                  century: int = 2000, calendar: bool = True) -> bool:
+    """Check if a digit string is a valid date in any of the formats"""
+    table = validity_table(tuple(formats), first_year, last_year, century, calendar)
+    return len(table) == 10 ** len(mpin) and bool(table[int(mpin)])
+
+
+def date_flags(values, formats: Iterable[str], first_year: int = 1900, last_year: int = 2099,
+               century: int = 2000, calendar: bool = True):
+    """
+    Vectorized reads_as_date over an integer array of PIN values.
+
+    Requires NumPy.
+
+    Returns:
+        np.ndarray: bool per value
+    """
+    import numpy as np
+
+    table = np.frombuffer(validity_table(tuple(formats), first_year, last_year, century, calendar),
+                          dtype=np.uint8)
+    return table[np.asarray(values, dtype=np.int64)].astype(bool)
@@ -0,0 +1,292 @@
+"""
+Precomputed demographic patterns for every calendar date 1900-2100.
+
+set_demographics derives 4- and 6-digit PIN patterns from each date with a
+regex and a few dozen string concatenations, yet only 73,414 calendar
+dates exist between 1900 and 2100 and customers share them heavily. The
+date table holds the output of each extractor for every one of those
+dates as packed integers (``10 ** len(pattern) + int(pattern)``) in a
+CSR layout indexed by day number, so looking up a date is index
+arithmetic plus a slice of a memory-mapped file.
+
+Dates outside the range, impossible dates and unusual formats still go
+through the extractor. Rebuild the table with::
+
+    python -m mpin_validator.dates build
+"""
+
+import functools
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+from mpin_validator import shared
+from mpin_validator.datelike import days_in_month, is_leap
+
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+
+# Extractor sections: 4 for EnhancedMPINValidator, 6 for SixDigitMPINValidator
+KINDS = (4, 6)
+
+# File layout: header, then per kind a section header, offsets and patterns
+DATES_MAGIC = b"MPINDATE"
+DATES_VERSION = 1
+_HEADER = struct.Struct("<8sHHHHI")
+_SECTION = struct.Struct("<II")
+
+# Name of the table in a shared segment
+SHARED_NAME = "dates.patterns"
+
+# Dates every table is checked against before its first use
+PROBE_DATES = ("01-01-1900", "29-02-2000", "07-11-1985", "31-12-2100")
+
+# Date strings whose day number is remembered per table
+INDEX_CACHE_SIZE = 1 << 16
+_UNKNOWN = object()
+
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+Extractor = Callable[[str], Set[str]]
+
+
+def _days_before_year(year: int) -> int:
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
+
+
+def date_index(day: int, month: int, year: int,
+               first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> Optional[int]:
+    """Day number of a calendar date from 1 January of first_year, or None"""
+    if not (first_year <= year <= last_year and 1 <= month <= 12 and day >= 1):
+        return None
+    leap = is_leap(year)
+    if day > days_in_month(month, year):
+        return None
+    return (_days_before_year(year) - _days_before_year(first_year)
+            + _DAYS_BEFORE_MONTH[month - 1] + (month > 2 and leap) + day - 1)
+
+
+def parse_date(date_str: str) -> Optional[Tuple[int, int, int]]:
+    """(day, month, year) of a DD-MM-YYYY or DD/MM/YYYY string of ASCII digits, else None"""
+    if not isinstance(date_str, str) or len(date_str) != 10 \
+            or date_str[2] not in "-/" or date_str[5] not in "-/":
+        return None
+    digits = date_str[:2] + date_str[3:5] + date_str[6:]
+    if not digits.isascii() or not digits.isdigit():
+        return None
+    return int(digits[:2]), int(digits[2:4]), int(digits[4:])
+
+
+def iter_dates(first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR) -> Iterator[str]:
+    """Every calendar date of the range as DD-MM-YYYY, in day-number order"""
+    for year in range(first_year, last_year + 1):
+        for month in range(1, 13):
+            for day in range(1, days_in_month(month, year) + 1):
+                yield f"{day:02d}-{month:02d}-{year}"
+
+
+def _pack(pattern: str) -> int:
+    return 10 ** len(pattern) + int(pattern)
+
+
+class DatePatternTable:
+    """
+    Memory-mapped extractor output for every date of a year range.
+
+    Section ``kind`` holds, for day number i, the packed patterns
+    patterns[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer=None):
+        """
+        Args:
+            path (str): Date table written by write_date_table
+            buffer: The file's contents, e.g. from a shared segment
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Date tables are stored little-endian")
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer
+        name = path or "date table"
+
+        magic, version, self.first_year, self.last_year, kind_count, self.date_count = \
+            _HEADER.unpack_from(self._buffer, 0)
+        if magic != DATES_MAGIC:
+            raise ValueError(f"{name} is not an MPIN date table")
+        if version != DATES_VERSION:
+            raise ValueError(f"{name} has format version {version}, expected {DATES_VERSION}")
+
+        self.path = path
+        self._sections = {}
+        self._verified = {}
+        self._indices = {}
+        view = memoryview(self._buffer)
+        position = _HEADER.size
+        for _ in range(kind_count):
+            kind, pattern_count = _SECTION.unpack_from(self._buffer, position)
+            position += _SECTION.size
+            end = position + 4 * (self.date_count + 1 + pattern_count)
+            if end > len(self._buffer):
+                raise ValueError(f"{name} is truncated")
+            offsets = view[position:position + 4 * (self.date_count + 1)].cast("I")
+            patterns = view[position + 4 * (self.date_count + 1):end].cast("I")
+            self._sections[kind] = (offsets, patterns)
+            position = end
+        self.decode = functools.lru_cache(maxsize=8192)(self._decode)
+
+    @property
+    def kinds(self):
+        return tuple(self._sections)
+
+    def index(self, date_str: str) -> Optional[int]:
+        """Day number of a date string inside the table's range, or None"""
+        if not isinstance(date_str, str):
+            return None
+        index = self._indices.get(date_str, _UNKNOWN)
+        if index is _UNKNOWN:
+            parsed = parse_date(date_str)
+            index = None if parsed is None else date_index(*parsed, self.first_year, self.last_year)
+            if len(self._indices) >= INDEX_CACHE_SIZE:
+                self._indices.clear()
+            self._indices[date_str] = index
+        return index
+
+    def packed(self, kind: int, index: int) -> memoryview:
+        """Packed patterns of one date, as a slice of the mapped file"""
+        offsets, patterns = self._sections[kind]
+        return patterns[offsets[index]:offsets[index + 1]]
+
+    def _decode(self, kind: int, index: int) -> frozenset:
+        return frozenset(str(packed)[1:] for packed in self.packed(kind, index))
+
+    def verify(self, kind: int, extractor: Extractor) -> bool:
+        """Check the section against an extractor on the probe dates (cached)"""
+        key = (kind, getattr(extractor, "__func__", extractor))
+        if key not in self._verified:
+            self._verified[key] = kind in self._sections and all(
+                self.index(date_str) is None or self.decode(kind, self.index(date_str)) == extractor(date_str)
+                for date_str in PROBE_DATES)
+        return self._verified[key]
+
+    def close(self):
+        self._sections = {}
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def write_date_table(path: str, extractors: Dict[int, Extractor],
+                     first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR):
+    """
+    Run each extractor over every date of the range and write the table,
+    replacing path atomically.
+
+    Args:
+        path (str): Destination file
+        extractors (dict): Kind -> function of a DD-MM-YYYY string
+            returning its pattern set
+        first_year (int): First year of the range
+        last_year (int): Last year of the range
+    """
+    from mpin_validator import tables
+
+    dates = list(iter_dates(first_year, last_year))
+    sections = []
+    for kind, extractor in extractors.items():
+        offsets = array("I", [0])
+        patterns = array("I")
+        for date_str in dates:
+            patterns.extend(sorted(_pack(pattern) for pattern in extractor(date_str)))
+            offsets.append(len(patterns))
+        sections.append(_SECTION.pack(kind, len(patterns)) + offsets.tobytes() + patterns.tobytes())
+
+    header = _HEADER.pack(DATES_MAGIC, DATES_VERSION, first_year, last_year, len(sections), len(dates))
+    tables._write_atomic(path, [header] + sections, ".dates-")
+
+
+def date_table_path() -> str:
+    """Default date table file, next to the bit-plane files"""
+    from mpin_validator import tables
+    return os.path.join(tables.table_directory(), "dates.patterns")
+
+
+_table: Optional[DatePatternTable] = None
+_loaded = False
+
+
+def get_table() -> Optional[DatePatternTable]:
+    """The mapped date table, or None if it has not been built"""
+    global _table, _loaded
+    if not _loaded:
+        buffer = shared.lookup(SHARED_NAME)
+        try:
+            _table = DatePatternTable(buffer=buffer) if buffer is not None else DatePatternTable(date_table_path())
+        except (OSError, ValueError):
+            _table = None
+        _loaded = True
+    return _table
+
+
+def reset_table():
+    """Map the table again on next use, e.g. after a rebuild or a new MPIN_TABLE_DIR"""
+    global _table, _loaded
+    _table = None
+    _loaded = False
+
+
+def date_patterns(date_str: str, kind: int, extractor: Extractor) -> Set[str]:
+    """
+    Patterns of a date from the table, falling back to the extractor.
+
+    Args:
+        date_str (str): Date in DD-MM-YYYY format
+        kind (int): Table section holding this extractor's output
+        extractor: The string-based extractor the section was built from
+
+    Returns:
+        set: A new set the caller may modify
+    """
+    table = _table if _loaded else get_table()
+    if table is not None:
+        index = table.index(date_str)
+        if index is not None and table.verify(kind, extractor):
+            return set(table.decode(kind, index))
+    return extractor(date_str)
+
+
+def main(argv=None):
+    """Command line entry point for rebuilding the date table"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the precomputed demographic date table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Extract patterns for every date and write the table")
+    build.add_argument("--first-year", type=int, default=FIRST_YEAR)
+    build.add_argument("--last-year", type=int, default=LAST_YEAR)
+    build.add_argument("--output", help="Destination file (default: next to the bit-plane files)")
+    args = parser.parse_args(argv)
+
+    # The validators import this module, so load them only when building
+    from mpin_validator import validators
+
+    output = args.output or date_table_path()
+    started = time.perf_counter()
+    write_date_table(output, {
+        4: validators.EnhancedMPINValidator()._compute_date_patterns,
+        6: validators.SixDigitMPINValidator()._compute_date_patterns,
+    }, args.first_year, args.last_year)
+    elapsed = time.perf_counter() - started
+
+    print(f"Wrote patterns of {args.first_year}-{args.last_year} to {output} in {elapsed:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Compact store of demographic-derived PINs for many customers.
+
+Each customer's DOB, spouse DOB and anniversary patterns are kept as
+packed integers in one flat array, sorted per customer, with an offset
+index into it (CSR layout). A parallel array holds the reason bit of each
+pattern. Nothing is stored per customer as a Python object, and a saved
+store can be memory-mapped so many processes share one copy.
+
+A PIN is packed as ``10 ** len(pin) + int(pin)``, which keeps leading
+zeros and the PIN length apart ("0615" and "615" differ).
+"""
+
+import os
+from array import array
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# PIN lengths kept in the store
+STORE_LENGTHS = (4, 6)
+
+_ARRAYS = ("customer_ids", "offsets", "patterns", "kinds")
+
+
+def pack_pin(mpin: str) -> int:
+    """Pack a digit string into an integer that keeps its length"""
+    return 10 ** len(mpin) + int(mpin)
+
+
+def unpack_pin(packed: int) -> str:
+    """Recover the digit string of a packed PIN"""
+    return str(packed)[1:]
+
+
+class DemographicStore:
+    """
+    Demographic patterns of many customers in flat, optionally mapped arrays.
+
+    Customer ids are integers and sorted; customer i owns
+    patterns[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, customer_ids: np.ndarray, offsets: np.ndarray,
+                 patterns: np.ndarray, kinds: np.ndarray):
+        if len(offsets) != len(customer_ids) + 1 or len(patterns) != len(kinds):
+            raise ValueError("Inconsistent demographic store arrays")
+        self.customer_ids = customer_ids
+        self.offsets = offsets
+        self.patterns = patterns
+        self.kinds = kinds
+
+    def __len__(self) -> int:
+        return len(self.customer_ids)
+
+    def __contains__(self, customer_id: int) -> bool:
+        row = int(np.searchsorted(self.customer_ids, customer_id))
+        return row < len(self.customer_ids) and self.customer_ids[row] == customer_id
+
+    def _row(self, customer_id: int) -> int:
+        row = int(np.searchsorted(self.customer_ids, customer_id))
+        if row == len(self.customer_ids) or self.customer_ids[row] != customer_id:
+            raise KeyError(customer_id)
+        return row
+
+    def lookup(self, customer_id: int, mpin: str) -> int:
+        """
+        Return the demographic reason bits of a customer's PIN.
+
+        Args:
+            customer_id (int): Customer to check
+            mpin (str): PIN digit string
+
+        Returns:
+            int: One of the reasons.DEMOGRAPHIC_* bits, or 0 if the PIN is
+            not derived from the customer's dates
+        """
+        row = self._row(customer_id)
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        key = pack_pin(mpin)
+        at = start + int(np.searchsorted(self.patterns[start:end], key))
+        if at < end and self.patterns[at] == key:
+            return int(self.kinds[at])
+        return 0
+
+    def lookup_many(self, customer_ids: Sequence[int], packed: Sequence[int]) -> np.ndarray:
+        """
+        Vectorized lookup of packed PINs (see pack_pin) for many customers.
+
+        Returns:
+            np.ndarray: uint8 demographic reason bits per query
+        """
+        customer_ids = np.asarray(customer_ids, dtype=np.int64)
+        keys = np.asarray(packed, dtype=np.int64)
+        rows = np.searchsorted(self.customer_ids, customer_ids)
+        if (rows == len(self.customer_ids)).any() or \
+                (self.customer_ids[np.minimum(rows, len(self) - 1)] != customer_ids).any():
+            raise KeyError("Unknown customer id in batch")
+
+        result = np.zeros(len(keys), dtype=np.uint8)
+        if not len(self.patterns):
+            return result
+
+        # Bisect every customer's segment at once
+        low = self.offsets[rows].astype(np.int64)
+        end = self.offsets[rows + 1].astype(np.int64)
+        high = end.copy()
+        last = len(self.patterns) - 1
+        while True:
+            active = low < high
+            if not active.any():
+                break
+            middle = (low + high) // 2
+            right = self.patterns[np.minimum(middle, last)] < keys
+            low = np.where(active & right, middle + 1, low)
+            high = np.where(active & ~right, middle, high)
+
+        at = np.minimum(low, last)
+        found = (low < end) & (self.patterns[at] == keys)
+        result[found] = self.kinds[at[found]]
+        return result
+
+    def save(self, directory: str):
+        """Write the store as .npy files that load() can memory-map"""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "DemographicStore":
+        """
+        Open a saved store.
+
+        Args:
+            directory (str): Directory written by save()
+            mmap (bool): Map the arrays read-only instead of reading them
+        """
+        mode = "r" if mmap else None
+        return cls(*(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+                     for name in _ARRAYS))
+
+
+class DemographicStoreBuilder:
+    """
+    Accumulate customers' demographic patterns into a DemographicStore.
+
+    Patterns and their reason bits come from a detailed validator's
+    _profile_patterns, the same split into DOB, spouse DOB and anniversary
+    that make_profile and check() use.
+    """
+
+    def __init__(self, validator=None, lengths: Tuple[int, ...] = STORE_LENGTHS):
+        """
+        Args:
+            validator: Detailed validator used to derive the patterns
+                (default: SixDigitMPINValidator)
+            lengths (tuple): PIN lengths to keep
+        """
+        if validator is None:
+            from mpin_validator.validators import SixDigitMPINValidator
+            validator = SixDigitMPINValidator()
+        self.validator = validator
+        self.lengths = frozenset(lengths)
+        self._customer_ids = array("q")
+        self._counts = array("q")
+        self._patterns = array("I")
+        self._kinds = array("B")
+
+    def _profile_patterns(self, dob: Optional[str], spouse_dob: Optional[str],
+                          anniversary: Optional[str]):
+        """Packed patterns and reason bits of one profile, sorted by pattern"""
+        patterns = self.validator._profile_patterns(dob, spouse_dob, anniversary)
+        return sorted((pack_pin(pattern), bit) for pattern, bit in patterns.items()
+                      if len(pattern) in self.lengths)
+
+    def add(self, customer_id: int, dob: str = None, spouse_dob: str = None,
+            anniversary: str = None):
+        """Add one customer's demographics"""
+        entries = self._profile_patterns(dob, spouse_dob, anniversary)
+        self._customer_ids.append(customer_id)
+        self._counts.append(len(entries))
+        for packed, bit in entries:
+            self._patterns.append(packed)
+            self._kinds.append(bit)
+
+    def add_many(self, records: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]]):
+        """Add (customer_id, dob, spouse_dob, anniversary) records"""
+        for record in records:
+            self.add(*record)
+
+    def build(self) -> DemographicStore:
+        """Sort customers by id and return the finished store"""
+        customer_ids = np.frombuffer(self._customer_ids, dtype=np.int64).copy()
+        counts = np.frombuffer(self._counts, dtype=np.int64)
+        patterns = np.frombuffer(self._patterns, dtype=np.uint32).copy()
+        kinds = np.frombuffer(self._kinds, dtype=np.uint8).copy()
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+        order = np.argsort(customer_ids, kind="stable")
+        customer_ids = customer_ids[order]
+        if len(customer_ids) > 1 and (customer_ids[1:] == customer_ids[:-1]).any():
+            raise ValueError("Duplicate customer id in demographic store")
+
+        # Gather each customer's segment in the new order
+        counts = counts[order]
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        source = np.repeat(starts[order] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return DemographicStore(customer_ids, offsets, patterns[source], kinds[source])
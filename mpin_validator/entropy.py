@@ -0,0 +1,156 @@
+"""
+Entropy scores of digit strings, precomputed per keyspace.
+
+partd scores a PIN as 0.7 * the Shannon entropy of its digit counts plus
+0.3 * the share of adjacent positions holding different digits. The score
+depends only on the multiset of counts and the number of transitions, so
+a length has few distinct scores: 32 for six digits, under 256 up to
+eight. Each keyspace is stored as one uint8 level per value plus a table
+of the float scores, 1 MB for six digits. Levels are not binned: each
+score is exact up to float rounding (a few ULPs from the formula's order
+of operations), and threshold decisions and rounded scores are identical.
+
+Full keyspace tables up to TABLE_LENGTH digits are built with NumPy on
+first use and cached; without NumPy, and for longer PINs, the score of
+each count multiset is computed once and memoised.
+"""
+
+import functools
+import math
+from typing import Optional, Tuple
+
+from mpin_validator import shared
+
+# Longest PIN whose whole keyspace is precomputed
+TABLE_LENGTH = 6
+
+_SHANNON_WEIGHT = 0.7
+_TRANSITION_WEIGHT = 0.3
+
+# Radix of level keys; exceeds the ten digits that can share a count
+_KEY_BASE = 11
+
+
+@functools.lru_cache(maxsize=None)
+def level_score(counts: Tuple[int, ...], transitions: int) -> float:
+    """
+    Score of a PIN from its digit counts and adjacent-digit changes.
+
+    Args:
+        counts (tuple): Occurrences of each distinct digit, largest first
+        transitions (int): Adjacent positions holding different digits
+
+    Returns:
+        float: Combined entropy score
+    """
+    length = sum(counts)
+    entropy = 0.0
+    for count in counts:
+        probability = count / length
+        entropy -= probability * math.log2(probability)
+    return _SHANNON_WEIGHT * entropy + _TRANSITION_WEIGHT * (transitions / (length - 1))
+
+
+def _digit_score(mpin: str) -> float:
+    counts = {}
+    for digit in mpin:
+        counts[digit] = counts.get(digit, 0) + 1
+    transitions = sum(1 for i in range(len(mpin) - 1) if mpin[i] != mpin[i + 1])
+    return level_score(tuple(sorted(counts.values(), reverse=True)), transitions)
+
+
+def _level_keys(values, length: int):
+    """One int64 key per value encoding its digit-count multiset and transitions"""
+    import numpy as np
+    from mpin_validator import vectorized
+
+    digits = vectorized.digit_matrix(values, length)
+    rows = np.repeat(np.arange(len(digits), dtype=np.int64) * 10, length)
+    counts = np.bincount(rows + digits.reshape(-1), minlength=10 * len(digits)).reshape(-1, 10)
+    transitions = np.count_nonzero(digits[:, 1:] != digits[:, :-1], axis=1)
+
+    # Base-11 place c holds how many digits occur c times
+    multiset = (_KEY_BASE ** counts.astype(np.int64)).sum(axis=1)
+    return multiset * length + transitions
+
+
+def _key_levels(keys, length: int) -> Tuple[float, ...]:
+    """Exact scores of decoded level keys"""
+    levels = []
+    for key in keys.tolist():
+        multiset, transitions = divmod(key, length)
+        counts = []
+        for count in range(length + 1):
+            multiset, digits = divmod(multiset, _KEY_BASE)
+            if count:
+                counts += [count] * digits
+        levels.append(level_score(tuple(reversed(counts)), transitions))
+    return tuple(levels)
+
+
+def shared_name(length: int, part: str) -> str:
+    """Name of the codes or levels part of a length's score table in a shared segment"""
+    return f"entropy{length}.{part}"
+
+
+@functools.lru_cache(maxsize=TABLE_LENGTH)
+def score_table(length: int) -> Optional[Tuple[bytes, Tuple[float, ...]]]:
+    """
+    Quantised scores of every PIN of a length.
+
+    Read from the attached shared segment when it holds the length,
+    otherwise built; requires NumPy to build and returns None without it
+    or beyond TABLE_LENGTH.
+
+    Returns:
+        tuple: (codes, levels) where levels[codes[int(pin)]] is the score
+    """
+    if not 2 <= length <= TABLE_LENGTH:
+        return None
+    codes, levels = shared.lookup(shared_name(length, "codes")), shared.lookup(shared_name(length, "levels"))
+    if codes is not None and levels is not None:
+        return codes, tuple(levels.cast("d"))
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    keys, codes = np.unique(_level_keys(np.arange(10 ** length, dtype=np.int64), length),
+                            return_inverse=True)
+    return codes.astype(np.uint8).tobytes(), _key_levels(keys, length)
+
+
+def reset_score_tables():
+    """Forget score tables, e.g. after a new shared segment was attached"""
+    score_table.cache_clear()
+
+
+def score(mpin: str) -> float:
+    """Entropy score of a digit string, read from its keyspace table when there is one"""
+    table = score_table(len(mpin)) if len(mpin) <= TABLE_LENGTH else None
+    if table is None:
+        return _digit_score(mpin)
+    codes, levels = table
+    return levels[codes[int(mpin)]]
+
+
+def scores(values, length: int):
+    """
+    Vectorized score over an integer array of PIN values of one length.
+
+    Requires NumPy. Lengths beyond TABLE_LENGTH are scored from their
+    count multisets without a keyspace table.
+
+    Returns:
+        np.ndarray: float64 score per value
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.int64)
+    table = score_table(length)
+    if table is not None:
+        codes, levels = table
+        return np.asarray(levels)[np.frombuffer(codes, dtype=np.uint8)[values]]
+
+    keys, codes = np.unique(_level_keys(values, length), return_inverse=True)
+    return np.asarray(_key_levels(keys, length))[codes.reshape(-1)]
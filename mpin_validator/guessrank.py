@@ -0,0 +1,239 @@
+"""
+Guess ranks: how many attempts an informed attacker needs for each PIN.
+
+The attacker is assumed to know our detectors. PINs are guessed in order
+of how many active detectors flag them (most first), then by entropy
+score (lowest first, see ``entropy.py``), then by value. The whole order
+of a keyspace is computed once per detector policy and kept as a packed
+array of PIN values, with the inverse array giving each PIN's 1-based
+rank, so a rank is one index. Orders are cached next to the weakness
+tables under the same policy fingerprint::
+
+    ranks = guessrank.get_ranks(validator, 6)
+    ranks.rank(482915)                        # guesses needed
+    ranks.compromise_probability(5)           # P(found within 5 attempts)
+"""
+
+import os
+import struct
+import sys
+import threading
+import weakref
+from array import array
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+from mpin_validator import entropy, shared, tables
+
+
+# Rank file layout: header, then the guessing order as uint32 PIN values
+RANKS_MAGIC = b"MPINRANK"
+RANKS_VERSION = 1
+_HEADER = struct.Struct("<8sHBI")
+
+
+class GuessRanks:
+    """The attacker's guessing order over every PIN of one length"""
+
+    def __init__(self, length: int, order: array, ranks: Optional[array] = None):
+        """
+        Args:
+            length (int): PIN length
+            order (array): Every PIN value of the length, in guessing order
+            ranks (array): The rank of each PIN value, if already known
+        """
+        if len(order) != 10 ** length:
+            raise ValueError(f"A {length}-digit guessing order holds {10 ** length} PINs")
+        self.length = length
+        self.order = order
+        if ranks is None:
+            ranks = array("I", bytes(4 * len(order)))
+            for rank, value in enumerate(order, 1):
+                ranks[value] = rank
+        self.ranks = ranks
+
+    def rank(self, value: int) -> int:
+        """Guesses an attacker needs to reach the PIN value, from 1"""
+        return self.ranks[value]
+
+    def guesses(self, attempts: int) -> Tuple[str, ...]:
+        """The first attempts PINs the attacker tries"""
+        return tuple(f"{value:0{self.length}d}" for value in self.order[:attempts])
+
+    def compromise_probability(self, attempts: int,
+                               weights: Union[Sequence[float], Mapping[str, float], None] = None) -> float:
+        """
+        Chance that a user's PIN falls within the attacker's first attempts.
+
+        Args:
+            attempts (int): Guesses allowed before lockout
+            weights: How often users pick each PIN, indexed by PIN value
+                or keyed by PIN string (default: every PIN equally often).
+                PINs missing from a mapping are never picked.
+
+        Returns:
+            float: Probability between 0 and 1
+        """
+        attempts = max(0, min(attempts, len(self.order)))
+        if weights is None:
+            return attempts / len(self.order)
+        if isinstance(weights, Mapping):
+            total = sum(weights.values())
+            found = sum(weights.get(pin, 0) for pin in self.guesses(attempts))
+        else:
+            if len(weights) != len(self.order):
+                raise ValueError(f"Expected one weight per {self.length}-digit PIN")
+            total = sum(weights)
+            found = sum(weights[value] for value in self.order[:attempts])
+        return found / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+def _class_counts(validator, length: int):
+    """Number of active detectors flagging each PIN, or None if it cannot be computed"""
+    mask = tables.detector_mask(validator)
+    if mask is None:
+        if length > tables.IN_MEMORY_LENGTH:
+            return None
+        return [sum(1 for detector in validator.pattern_detectors if detector(f"{value:0{length}d}"))
+                for value in range(10 ** length)]
+
+    # Read the detector bits from the weakness table, building it if need be
+    table = tables.get_table(validator, length, wait=True)
+    if table is None or (not isinstance(table, tables.WeaknessTable) and not table.covers(mask)):
+        return None
+    if length <= tables.IN_MEMORY_LENGTH:
+        return [bin(table.lookup(value) & mask).count("1") for value in range(10 ** length)]
+
+    import numpy as np
+    from mpin_validator import vectorized
+
+    masks = vectorized.gather_masks(table, np.arange(10 ** length, dtype=np.int64), mask)
+    return sum((masks >> bit) & 1 for bit in range(len(tables.DETECTOR_NAMES))).astype(np.int64)
+
+
+def build_order(validator, length: int) -> Optional[array]:
+    """
+    Order every PIN of a length the way an informed attacker would guess.
+
+    Detector bits come from the validator's weakness table, which is
+    built and cached first if needed; longer keyspaces need NumPy.
+
+    Returns:
+        array: uint32 PIN values in guessing order, or None
+    """
+    counts = _class_counts(validator, length)
+    if counts is None:
+        return None
+    if isinstance(counts, list):
+        values = range(10 ** length)
+        key = {value: (-counts[value], entropy.score(f"{value:0{length}d}"), value) for value in values}
+        return array("I", sorted(values, key=key.__getitem__))
+
+    import numpy as np
+
+    values = np.arange(10 ** length, dtype=np.int64)
+    order = np.lexsort((values, entropy.scores(values, length), -counts))
+    return array("I", order.astype(np.uint32).tobytes())
+
+
+def ranks_path(length: int, fingerprint: str) -> str:
+    """Cached guessing order for a PIN length and policy fingerprint"""
+    return os.path.join(tables.table_directory(), f"guessrank{length}-{fingerprint[:16]}.order")
+
+
+def shared_name(length: int, fingerprint: str, part: str) -> str:
+    """Name of the order or ranks part of a length's guess ranks in a shared segment"""
+    return f"guessrank{length}-{fingerprint[:16]}.{part}"
+
+
+def write_order(order: array, length: int, path: str):
+    """Write a guessing order, replacing path atomically"""
+    data = array("I", order)
+    if sys.byteorder != "little":
+        data.byteswap()
+    tables._write_atomic(path, [_HEADER.pack(RANKS_MAGIC, RANKS_VERSION, length, len(data)), data.tobytes()],
+                         ".order-")
+
+
+def read_order(path: str, length: int) -> Optional[array]:
+    """Read a guessing order written by write_order, or None if it is missing or unusable"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, stored_length, count = _HEADER.unpack_from(data, 0)
+    if (magic, version, stored_length, count) != (RANKS_MAGIC, RANKS_VERSION, length, 10 ** length) \
+            or len(data) != _HEADER.size + 4 * count:
+        return None
+    order = array("I", data[_HEADER.size:])
+    if sys.byteorder != "little":
+        order.byteswap()
+    return order
+
+
+_ranks: Dict[Tuple, Optional[GuessRanks]] = {}
+_ranks_lock = threading.Lock()
+
+# Ranks of validators with instance-level detectors, per pipeline
+_instance_ranks = weakref.WeakKeyDictionary()
+
+
+def get_ranks(validator, length: int) -> Optional[GuessRanks]:
+    """
+    Return the guess ranks for the validator's detector policy.
+
+    Mapped from the attached shared segment, or loaded from the cache
+    directory when a file matches the policy fingerprint, otherwise built
+    (a few seconds for six digits) and saved.
+
+    Returns:
+        GuessRanks or None: None for custom detectors beyond
+        IN_MEMORY_LENGTH digits or without NumPy. Custom detector
+        pipelines are ordered once per validator instance and pipeline,
+        in memory only.
+    """
+    if tables.detector_mask(validator) is None:
+        # Instance-level detectors are not part of the fingerprint
+        key = (length, tuple(validator.pattern_detectors))
+        with _ranks_lock:
+            cached = _instance_ranks.setdefault(validator, {})
+            if key not in cached:
+                order = build_order(validator, length)
+                cached[key] = GuessRanks(length, order) if order is not None else None
+            return cached[key]
+
+    key = (length, tables.policy_fingerprint(validator, length))
+    if key in _ranks:
+        return _ranks[key]
+    with _ranks_lock:
+        if key not in _ranks:
+            order = shared.lookup(shared_name(length, key[1], "order"))
+            ranks = shared.lookup(shared_name(length, key[1], "ranks"))
+            if order is not None and ranks is not None:
+                _ranks[key] = GuessRanks(length, order.cast("I"), ranks.cast("I"))
+                return _ranks[key]
+
+            path = ranks_path(length, key[1])
+            order = read_order(path, length)
+            if order is not None:
+                tables.touch(path)
+            else:
+                order = build_order(validator, length)
+                if order is not None:
+                    try:
+                        write_order(order, length, path)
+                    except OSError:
+                        pass
+            _ranks[key] = GuessRanks(length, order) if order is not None else None
+    return _ranks[key]
+
+
+def reset_ranks():
+    """Forget loaded guess ranks, e.g. after a new MPIN_TABLE_DIR"""
+    _ranks.clear()
+    _instance_ranks.clear()
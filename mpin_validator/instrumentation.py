@@ -0,0 +1,113 @@
+"""
+Opt-in hit and latency counters for the pattern detector loop.
+
+A validator with no instrumentation attached pays one attribute check per
+PIN. Attaching a DetectorInstrumentation makes is_common_mpin (parte) or
+is_weak_mpin (partd) run the detector loop through it instead, which
+records for every detector:
+
+    calls       times the detector ran
+    hits        times it returned True
+    first_hits  PINs it was the first detector to flag
+    seconds     cumulative time spent in it
+
+alongside the number of PINs checked and how many any detector flagged.
+parte validators bypass their precomputed weakness tables while
+instrumented, so the numbers describe the detector pipeline itself.
+The counters are updated under a lock, so a metrics exporter can poll
+snapshot() from another thread.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable
+
+
+Detector = Callable[[str], bool]
+
+COUNTERS = ("calls", "hits", "first_hits", "seconds")
+
+
+def detector_name(detector: Detector) -> str:
+    """Name a detector is reported under"""
+    return getattr(detector, "__name__", None) or repr(detector)
+
+
+class DetectorInstrumentation:
+    """Per-detector calls, hits, first-hit attribution and cumulative time"""
+
+    # Validators run the detector loop through this instead of their tables
+    bypasses_table = True
+
+    def __init__(self, evaluate_all: bool = False):
+        """
+        Args:
+            evaluate_all (bool): Keep running detectors after the first hit,
+                so that hits count every detector that fires (slower; the
+                verdict is unchanged)
+        """
+        self.evaluate_all = evaluate_all
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pins = 0
+        self._flagged = 0
+
+    def run(self, detectors: Iterable[Detector], mpin: str) -> bool:
+        """Run the detectors over one PIN, recording each call"""
+        timer = time.perf_counter
+        calls = []
+        first = None
+        for detector in detectors:
+            started = timer()
+            hit = bool(detector(mpin))
+            calls.append((detector_name(detector), hit, timer() - started))
+            if hit and first is None:
+                first = len(calls) - 1
+                if not self.evaluate_all:
+                    break
+
+        with self._lock:
+            self._pins += 1
+            self._flagged += first is not None
+            for position, (name, hit, seconds) in enumerate(calls):
+                stats = self._stats.get(name)
+                if stats is None:
+                    stats = self._stats[name] = dict.fromkeys(COUNTERS, 0)
+                    stats["seconds"] = 0.0
+                stats["calls"] += 1
+                stats["hits"] += hit
+                stats["first_hits"] += position == first
+                stats["seconds"] += seconds
+        return first is not None
+
+    def snapshot(self, reset: bool = False) -> Dict:
+        """
+        Copy the counters.
+
+        Args:
+            reset (bool): Zero the counters in the same step, so that
+                consecutive polls never miss or double count a call
+
+        Returns:
+            dict: {"pins": ..., "flagged": ..., "detectors": {name: counters}}
+            with detectors in the order they first ran
+        """
+        with self._lock:
+            snapshot = {
+                "pins": self._pins,
+                "flagged": self._flagged,
+                "detectors": {name: dict(stats) for name, stats in self._stats.items()},
+            }
+            if reset:
+                self._reset()
+        return snapshot
+
+    def reset(self):
+        """Zero all counters"""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._stats = {}
+        self._pins = 0
+        self._flagged = 0
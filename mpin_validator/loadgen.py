@@ -0,0 +1,134 @@
+"""
+Local load generator for the validation service.
+
+Opens keep-alive connections to a running service, replays a seeded mix
+of 4- and 6-digit check requests and reports throughput and latency
+percentiles::
+
+    python -m mpin_validator.service --port 8080 &
+    python -m mpin_validator.loadgen --port 8080 --concurrency 64 --requests 20000
+
+Pass --json for machine-readable output.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Dict, List
+
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, not {text}")
+    return value
+
+
+def make_workload(count: int, seed: int = 0) -> List[Dict]:
+    """Seeded check requests: mixed lengths, a share with demographics"""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        length = rng.choice((4, 6))
+        request = {"pin": f"{rng.randrange(10 ** length):0{length}d}"}
+        if rng.random() < 0.5:
+            request["dob"] = f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1950, 2005)}"
+        requests.append(request)
+    return requests
+
+
+async def _client(host: str, port: int, requests: List[Dict], latencies: List[float]):
+    """Send requests sequentially over one keep-alive connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            body = json.dumps(request).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(b"POST /check HTTP/1.1\r\nHost: localhost\r\n"
+                         b"Content-Type: application/json\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if not status:
+                raise ConnectionError("Service closed the connection")
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(host: str, port: int, total: int, concurrency: int, seed: int = 0) -> Dict:
+    """
+    Replay a seeded workload against a service.
+
+    Args:
+        total (int): Requests to send, at least one
+        concurrency (int): Connections to spread them over
+
+    Returns:
+        dict: requests, seconds, throughput and p50/p99/max latency in ms
+    """
+    if total <= 0 or concurrency <= 0:
+        raise ValueError("total and concurrency must be positive")
+    workload = make_workload(total, seed)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, workload[i::concurrency], latencies)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of the service")
+    parser.add_argument("--host", default="127.0.0.1", help="Service host (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="Service port (default: %(default)s)")
+    parser.add_argument("--requests", type=_positive_int, default=10000,
+                        help="Total requests (default: %(default)s)")
+    parser.add_argument("--concurrency", type=_positive_int, default=64,
+                        help="Concurrent connections (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Workload seed (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency, args.seed))
+    if args.json:
+        json.dump(report, sys.stdout)
+        print()
+    else:
+        print(f"{report['requests']} requests over {report['concurrency']} connections "
+              f"in {report['seconds']}s: {report['throughput']:,.0f} req/s, "
+              f"p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms, max {report['max_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
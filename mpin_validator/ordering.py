@@ -0,0 +1,163 @@
+"""
+Adaptive ordering of the pattern detector loop.
+
+is_common_mpin (parte) and is_weak_mpin (partd) return at the first
+detector that fires, so the order of pattern_detectors decides the
+average cost of a check. AdaptiveDetectorOrder runs every detector on a
+sample of the live traffic, timing each one and noting which fire, and
+periodically replaces the validator's list with the order that minimises
+the expected time per check on that sample. Detectors are pure, so any
+order gives the same verdict.
+
+Attach it with ``validator.enable_adaptive_ordering()``. parte validators
+keep answering from their precomputed weakness table while one is ready
+and only hand the checks that run the loop to the sampler, so it costs
+them nothing; it is meant for partd, for parte validators whose table is
+still being built and for custom detector lists.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Sequence
+
+from mpin_validator.instrumentation import detector_name
+
+
+Detector = Callable[[str], bool]
+
+
+def expected_cost(order: Sequence[str], samples: Sequence[FrozenSet[str]],
+                  costs: Dict[str, float]) -> float:
+    """Mean seconds per check of a short-circuiting loop over the samples"""
+    if not samples:
+        return 0.0
+    total = 0.0
+    for hits in samples:
+        for name in order:
+            total += costs[name]
+            if name in hits:
+                break
+    return total / len(samples)
+
+
+def best_order(names: Iterable[str], samples: Sequence[FrozenSet[str]],
+               costs: Dict[str, float]) -> List[str]:
+    """
+    Order detectors to minimise the expected cost over the samples.
+
+    Greedy: repeatedly take the detector with the lowest cost per sample
+    it would newly settle; detectors that settle none go last, cheapest
+    first, since every strong PIN still runs them all.
+    """
+    candidates = list(names)
+    remaining = list(samples)
+    order = []
+    while candidates and remaining:
+        def ratio(name):
+            settled = sum(1 for hits in remaining if name in hits)
+            return costs[name] / settled if settled else float("inf")
+
+        name = min(candidates, key=ratio)
+        if ratio(name) == float("inf"):
+            break
+        order.append(name)
+        candidates.remove(name)
+        remaining = [hits for hits in remaining if name not in hits]
+    return order + sorted(candidates, key=costs.__getitem__)
+
+
+class AdaptiveDetectorOrder:
+    """Sample detector hits and costs and periodically reorder a validator's detectors"""
+
+    # Validators answer from a ready weakness table and only run the loop through this
+    bypasses_table = False
+
+    def __init__(self, validator, sample_every: int = 100, reorder_after: int = 1000):
+        """
+        Args:
+            validator: Validator whose pattern_detectors are reordered
+            sample_every (int): Run every detector on one PIN in this many
+            reorder_after (int): Sampled PINs between reorders
+        """
+        self.validator = validator
+        self.sample_every = sample_every
+        self.reorder_after = reorder_after
+        self.reorders = 0
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._samples = []
+        self._seconds = {}
+        self._calls = {}
+
+    def run(self, detectors: Iterable[Detector], mpin: str) -> bool:
+        """Run the detector loop over one PIN, sampling one in sample_every"""
+        with self._lock:
+            self._seen += 1
+            sample = self._seen % self.sample_every == 0
+        if not sample:
+            for detector in detectors:
+                if detector(mpin):
+                    return True
+            return False
+
+        flagged = self.observe(detectors, mpin)
+        if len(self._samples) >= self.reorder_after:
+            self.reorder()
+        return flagged
+
+    def observe(self, detectors: Iterable[Detector], mpin: str) -> bool:
+        """Run and time every detector on one PIN and record the sample"""
+        timer = time.perf_counter
+        hits = []
+        timings = []
+        for detector in detectors:
+            started = timer()
+            hit = detector(mpin)
+            timings.append((detector_name(detector), timer() - started))
+            if hit:
+                hits.append(timings[-1][0])
+
+        with self._lock:
+            self._samples.append(frozenset(hits))
+            for name, seconds in timings:
+                self._seconds[name] = self._seconds.get(name, 0.0) + seconds
+                self._calls[name] = self._calls.get(name, 0) + 1
+        return bool(hits)
+
+    def fit(self, mpins: Iterable[str]):
+        """Sample a batch of PINs offline and reorder once"""
+        for mpin in mpins:
+            self.observe(self.validator.pattern_detectors, mpin)
+        self.reorder()
+
+    def costs(self) -> Dict[str, float]:
+        """Mean seconds per call of every sampled detector"""
+        with self._lock:
+            return {name: self._seconds[name] / self._calls[name] for name in self._seconds}
+
+    def reorder(self) -> List[str]:
+        """
+        Install the best order for the samples so far and start a new window.
+
+        The validator gets a new list rather than a mutated one, so loops
+        already running in other threads finish over the old order.
+
+        Returns:
+            list: Detector names in their new order
+        """
+        costs = self.costs()
+        with self._lock:
+            samples, self._samples = self._samples, []
+            self._seconds = {}
+            self._calls = {}
+
+        detectors = list(self.validator.pattern_detectors)
+        by_name = {detector_name(detector): detector for detector in detectors}
+        if not samples or set(by_name) - set(costs) or len(by_name) != len(detectors):
+            # Unsampled or duplicate names; keep the current order
+            return [detector_name(detector) for detector in detectors]
+
+        order = best_order(by_name, samples, costs)
+        self.validator.pattern_detectors = [by_name[name] for name in order]
+        self.reorders += 1
+        return order
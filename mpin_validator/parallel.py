@@ -0,0 +1,269 @@
+"""
+Process-pool executor for full-portfolio audits.
+
+Validators keep bound-method detector lists and per-customer state, so
+they are never shipped to workers. Instead each chunk travels as a
+compact payload (PIN strings, a profile index per PIN and the distinct
+profiles of the chunk) and comes back as one reason byte per PIN. Each
+worker builds its validator and weakness tables once; with the fork
+start method they are built in the parent first and inherited. With
+MPIN_SHARED_DIR set, workers map the tables published there (see
+``shared.py``) and pick up a new generation between chunks.
+Results are merged back in input order.
+
+Measure scaling with::
+
+    python -m mpin_validator.parallel --records 1000000 --workers 1,2,4,8
+"""
+
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mpin_validator import reasons, shared, tables
+from mpin_validator.validators import UniversalMPINValidator
+
+
+Record = Tuple[str, Optional[str], Optional[str], Optional[str]]
+Payload = Tuple[List[str], bytes, List[Tuple[Optional[str], Optional[str], Optional[str]]]]
+
+# Result bytes for PINs check_mpin rejects
+NOT_DIGITS = 0xFE
+BAD_LENGTH = 0xFF
+
+# PIN lengths audited unless others are given
+DEFAULT_LENGTHS = (4, 6)
+
+_validator = None
+
+
+def _worker_validator(lengths: Iterable[int] = DEFAULT_LENGTHS) -> UniversalMPINValidator:
+    """The per-process validator for the PIN lengths, with its weakness tables resolved"""
+    global _validator
+    if shared.refresh():
+        # A new generation of shared tables was published
+        _validator = None
+    if _validator is None or _validator.lengths != tuple(sorted(set(lengths))):
+        _validator = UniversalMPINValidator(lengths)
+        # Workers are long-lived, so wait for any table rebuild up front
+        for length in _validator.lengths:
+            _validator.check_mpin("0" * length)
+        tables.wait_for_builds()
+        for length in _validator.lengths:
+            _validator.check_mpin("0" * length)
+    return _validator
+
+
+def error_messages(validator: UniversalMPINValidator) -> Dict[int, str]:
+    """The check_mpin error of each result byte that is not a reason bitmask"""
+    return {NOT_DIGITS: "MPIN must be a digit string", BAD_LENGTH: validator.length_error}
+
+
+def encode_chunk(records: List[Record]) -> Payload:
+    """Pack records as PINs, a profile index per PIN and the distinct profiles"""
+    profiles = {}
+    pins = []
+    indices = array("I")
+    for pin, *profile in records:
+        pins.append(pin)
+        indices.append(profiles.setdefault(tuple(profile), len(profiles)))
+    return pins, indices.tobytes(), list(profiles)
+
+
+def evaluate_chunk(payload: Payload, lengths: Iterable[int] = DEFAULT_LENGTHS) -> bytes:
+    """
+    Check one encoded chunk.
+
+    Args:
+        payload: From encode_chunk
+        lengths (iterable): PIN lengths to accept
+
+    Returns:
+        bytes: The reason bitmask of each PIN, or NOT_DIGITS / BAD_LENGTH
+    """
+    pins, indices, profiles = payload
+    indices = array("I", indices)
+    validator = _worker_validator(lengths)
+    by_length = validator.validators
+
+    groups = collections.defaultdict(list)
+    for position, profile_index in enumerate(indices):
+        groups[profile_index].append(position)
+
+    result = bytearray(len(pins))
+    for profile_index, positions in groups.items():
+        profile = validator.make_profile(*profiles[profile_index])
+        for position in positions:
+            pin = pins[position]
+            if not isinstance(pin, str) or not pin.isdigit():
+                result[position] = NOT_DIGITS
+                continue
+            checker = by_length.get(len(pin))
+            if checker is None:
+                result[position] = BAD_LENGTH
+                continue
+            result[position] = checker.check(pin, profile).code
+    return bytes(result)
+
+
+def decode_result(pin: str, code: int, errors: Dict[int, str]) -> Dict:
+    """Rebuild the check_mpin-shaped result of one PIN, given error_messages()"""
+    if code in errors:
+        return {"mpin": pin, "error": errors[code]}
+    return {
+        "mpin": pin,
+        "strength": "WEAK" if code else "STRONG",
+        "reasons": reasons.decode_reasons(code)
+    }
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ParallelAuditor:
+    """
+    Audit record streams on a process pool, yielding results in input order.
+
+    At most max_pending chunks are in flight, so memory stays bounded for
+    any input size. Use as a context manager to shut the pool down.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 5000,
+                 max_pending: Optional[int] = None, lengths: Iterable[int] = DEFAULT_LENGTHS):
+        """
+        Args:
+            workers (int): Worker processes (default: all cores); 1 runs in-process
+            chunk_size (int): Records per work unit
+            max_pending (int): Chunks in flight (default: two per worker)
+            lengths (iterable): PIN lengths to accept, as for UniversalMPINValidator
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or 2 * self.workers
+        validator = UniversalMPINValidator(lengths)
+        self.lengths = validator.lengths
+        self.errors = error_messages(validator)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is None:
+            if multiprocessing.get_start_method() == "fork":
+                # Workers inherit the resolved tables copy-on-write
+                _worker_validator(self.lengths)
+            self._pool = multiprocessing.Pool(self.workers, initializer=_worker_validator,
+                                              initargs=(self.lengths,))
+        return self._pool
+
+    def close(self):
+        """Shut the worker pool down"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def map_codes(self, records: Iterable[Record]) -> Iterator[Tuple[List[str], bytes]]:
+        """Yield (pins, result codes) per chunk, in input order"""
+        chunks = _chunks(records, self.chunk_size)
+        if self.workers <= 1:
+            for chunk in chunks:
+                payload = encode_chunk(chunk)
+                yield payload[0], evaluate_chunk(payload, self.lengths)
+            return
+
+        pool = self._get_pool()
+        pending = collections.deque()
+        for chunk in chunks:
+            payload = encode_chunk(chunk)
+            pending.append((payload[0], pool.apply_async(evaluate_chunk, (payload, self.lengths))))
+            if len(pending) >= self.max_pending:
+                pins, result = pending.popleft()
+                yield pins, result.get()
+        while pending:
+            pins, result = pending.popleft()
+            yield pins, result.get()
+
+    def audit(self, records: Iterable[Record]) -> Iterator[Dict]:
+        """Yield a check_mpin-shaped result per record, in input order"""
+        for pins, codes in self.map_codes(records):
+            for pin, code in zip(pins, codes):
+                yield decode_result(pin, code, self.errors)
+
+
+def make_records(count: int, seed: int = 0, profiles: int = 100000) -> List[Record]:
+    """Seeded benchmark records: mixed PIN lengths over a pool of profiles"""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(profiles):
+        dates = [f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1940, 2005)}"
+                 for _ in range(3)]
+        pool.append((dates[0], dates[1] if rng.random() < 0.6 else None,
+                     dates[2] if rng.random() < 0.5 else None))
+    records = []
+    for _ in range(count):
+        length = rng.choice((4, 6))
+        records.append((f"{rng.randrange(10 ** length):0{length}d}",) + rng.choice(pool))
+    return records
+
+
+def benchmark(records: List[Record], worker_counts: Iterable[int], chunk_size: int = 5000) -> List[Dict]:
+    """Time a full audit of records for each worker count"""
+    report = []
+    baseline = None
+    for workers in worker_counts:
+        with ParallelAuditor(workers, chunk_size) as auditor:
+            list(auditor.map_codes(records[:1]))
+            started = time.perf_counter()
+            count = sum(len(codes) for _, codes in auditor.map_codes(records))
+            elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        report.append({
+            "workers": workers,
+            "records": count,
+            "seconds": round(elapsed, 3),
+            "records_per_sec": round(count / elapsed),
+            "speedup": round(baseline / elapsed, 2),
+        })
+    return report
+
+
+def main(argv=None):
+    """Command line entry point for the scaling benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the parallel audit executor")
+    parser.add_argument("--records", type=int, default=1000000, help="Records (default: %(default)s)")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}",
+                        help="Comma-separated worker counts (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="Records per work unit (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Workload seed (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    records = make_records(args.records, args.seed)
+    counts = [int(count) for count in args.workers.split(",")]
+    for row in benchmark(records, counts, args.chunk_size):
+        json.dump(row, sys.stdout)
+        print()
+
+
+if __name__ == "__main__":
+    main()
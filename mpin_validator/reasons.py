@@ -0,0 +1,92 @@
+"""
+Reason codes reported by the detailed validators.
+
+A result's reasons are one Reason bitmask: check_mpin composes it with
+bitwise operations, batch APIs and storage carry it as a single small
+integer, and the legacy reason list is only produced on output, from a
+table holding the names of every bitmask. Explain mode additionally
+names every pattern detector that flags a PIN, decoded from the detector
+bitmask of the weakness tables.
+"""
+
+import enum
+import functools
+from typing import List, Tuple
+
+from mpin_validator import tables
+
+
+class Reason(enum.IntFlag):
+    """Why a PIN is weak, in the order the legacy reason list names them"""
+
+    COMMONLY_USED = 1
+    DEMOGRAPHIC_DOB_SELF = 2
+    DEMOGRAPHIC_DOB_SPOUSE = 4
+    DEMOGRAPHIC_ANNIVERSARY = 8
+
+
+# The flags as plain ints for hot paths: IntFlag operators run enum code
+# and cost tens of times more than int ones
+COMMONLY_USED = Reason.COMMONLY_USED.value
+DEMOGRAPHIC_DOB_SELF = Reason.DEMOGRAPHIC_DOB_SELF.value
+DEMOGRAPHIC_DOB_SPOUSE = Reason.DEMOGRAPHIC_DOB_SPOUSE.value
+DEMOGRAPHIC_ANNIVERSARY = Reason.DEMOGRAPHIC_ANNIVERSARY.value
+
+DEMOGRAPHIC = DEMOGRAPHIC_DOB_SELF | DEMOGRAPHIC_DOB_SPOUSE | DEMOGRAPHIC_ANNIVERSARY
+ALL_REASONS = COMMONLY_USED | DEMOGRAPHIC
+
+# Reason bits in the order check_mpin lists them
+REASON_NAMES = tuple((flag.value, flag.name) for flag in Reason)
+
+# Legacy reason names and Reason flags of every bitmask, indexed by it
+REASON_TUPLES = tuple(tuple(name for bit, name in REASON_NAMES if mask & bit) for mask in range(ALL_REASONS + 1))
+FLAGS = tuple(Reason(mask) for mask in range(ALL_REASONS + 1))
+
+_BITS = {name: bit for bit, name in REASON_NAMES}
+
+
+def decode_reasons(mask: int) -> List[str]:
+    """Return the legacy reason list for a reason bitmask"""
+    return list(REASON_TUPLES[mask])
+
+
+def encode_reasons(reasons: List[str]) -> int:
+    """Return the reason bitmask for a legacy reason list"""
+    mask = 0
+    for reason in reasons:
+        mask |= _BITS[reason]
+    return mask
+
+
+def flags(mask: int) -> Reason:
+    """Return the Reason flags of a reason bitmask"""
+    return FLAGS[mask]
+
+
+# Explain-mode code of each pattern detector
+PATTERN_REASONS = {
+    "_is_sequential": "SEQUENTIAL",
+    "_is_repeated_digits": "REPEATED_DIGITS",
+    "_is_keyboard_pattern": "KEYPAD",
+    "_is_palindrome": "PALINDROME",
+    "_is_all_same_digit": "ALL_SAME_DIGIT",
+    "_is_common_year": "COMMON_YEAR",
+    "_is_odd_even_pattern": "ODD_EVEN",
+    "_is_double_double_pattern": "DOUBLE_DOUBLE",
+    "_is_mirror_pattern": "MIRROR",
+    "_is_pin_pattern": "DATE_LIKE",
+    "_is_arithmetic_sequence": "ARITHMETIC_SEQUENCE",
+    "_has_low_entropy": "LOW_ENTROPY",
+    "_is_triplet_pattern": "TRIPLET",
+    "_is_zigzag_pattern": "ZIGZAG",
+}
+
+# Reported for hits of detectors that have no code of their own
+CUSTOM_PATTERN = "CUSTOM_PATTERN"
+
+
+@functools.lru_cache(maxsize=None)
+def decode_patterns(mask: int) -> Tuple[str, ...]:
+    """Return the pattern codes of a detector bitmask, in detector bit order (tables.DETECTOR_NAMES)"""
+    return tuple(PATTERN_REASONS[name] for name in tables.DETECTOR_NAMES
+                 if mask & tables.DETECTOR_BITS[name])
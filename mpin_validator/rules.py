@@ -0,0 +1,577 @@
+"""
+Declarative weakness rules compiled to NumPy.
+
+A rule is one boolean expression over the digits of a PIN, written in a
+small Python-like language::
+
+    d[0] == d[1] and d[2] == d[3] and d[0] != d[2]     # AABB
+    steps(1) or steps(-1)                              # 1234, 4321
+    distinct <= 2                                      # two digits at most
+    period(length // 2)                                # 123123
+    1 <= d[0] * 10 + d[1] <= 12                        # leading month
+
+    any(d[i] == d[i + 2] for i in range(length - 2))   # 1x1, anywhere
+
+Expressions are parsed with the ``ast`` module, checked against the
+vocabulary below and compiled once into closures over a digit matrix
+(one row per PIN), so a policy of many rules evaluates a whole batch, or
+a whole keyspace in chunks, in a few array passes. Adding a rule is a
+new expression, not a new method on the hot path.
+
+DETECTOR_RULES restates every detector of parte's validators. The NumPy
+side of the weakness tables and of batch checks evaluates them through
+vectorized.detector_masks; the validators keep their Python detectors,
+which the tables probe the rules against before trusting them.
+
+Vocabulary:
+    d[i]            digit at position i (negative i counts from the end)
+    length          PIN length
+    value           the PIN as an integer
+    distinct        number of different digits
+    max_count       occurrences of the most frequent digit
+    min_count       occurrences of the least frequent digit present
+    count(x)        occurrences of digit x
+    first(x)        position of the first x, like str.find (-1 if absent)
+    adjacent(x, y)  x and y are neighbouring keys on a phone keypad
+    steps(k)        every digit is the previous one plus k (k may vary per PIN)
+    period(p)       the digits repeat with period p
+    run(k)          k equal digits in a row somewhere
+    blocks(p)       aligned p-digit blocks equal to the leading one
+    palindrome      reads the same backwards
+    all_even, all_odd, alternating_parity
+    abs(x)
+    any(e for i in range(...)), all(...), sum(...)
+    + - * // % and comparisons (chains allowed), and, or, not
+
+Digit positions, range() bounds, and the arguments of first, period,
+run and blocks may depend on length, loop variables and settings only.
+A rule may also read named settings, given defaults when it is created
+and overridden per evaluation, such as the coverage of _has_low_entropy.
+"""
+
+import ast
+import collections
+import functools
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from mpin_validator import reasons, tables
+from mpin_validator.vectorized import CHUNK_SIZE, digit_matrix
+
+
+# Evaluates to an int, a bool or an array with one entry per row
+Compiled = Callable[["_Batch"], Union[int, bool, np.ndarray]]
+
+_BINARY = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+}
+
+_COMPARE = {
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+}
+
+
+# Phone keypad adjacency read by adjacent()
+_KEYPAD = {
+    1: (2, 4),
+    2: (1, 3, 5),
+    3: (2, 6),
+    4: (1, 5, 7),
+    5: (2, 4, 6, 8),
+    6: (3, 5, 9),
+    7: (4, 8),
+    8: (5, 7, 9, 0),
+    9: (6, 8),
+    0: (8,),
+}
+_ADJACENT = np.zeros((10, 10), dtype=bool)
+for _digit, _neighbours in _KEYPAD.items():
+    _ADJACENT[_digit, list(_neighbours)] = True
+
+# Folds of the aggregate functions: (start, step)
+_AGGREGATES = {
+    "any": (False, np.logical_or),
+    "all": (True, np.logical_and),
+    "sum": (0, lambda total, value: total + np.asarray(value).astype(np.int64)),
+}
+
+
+class _Batch:
+    """A digit matrix plus the intermediates its rules share"""
+
+    def __init__(self, digits: np.ndarray):
+        self.digits = digits
+        self.names = {}
+        # Settings of the rule being evaluated and bound loop variables
+        self.scope = {}
+        self._counts = None
+        self._diffs = None
+        self._first = {}
+
+    @property
+    def counts(self) -> np.ndarray:
+        """(N, 10) occurrences of each digit, from one bincount"""
+        if self._counts is None:
+            rows = self.digits.shape[0]
+            slots = self.digits + 10 * np.arange(rows, dtype=np.int64)[:, np.newaxis]
+            self._counts = np.bincount(slots.ravel(), minlength=10 * rows).reshape(rows, 10)
+        return self._counts
+
+    @property
+    def diffs(self) -> np.ndarray:
+        """(N, length - 1) differences of neighbouring digits"""
+        if self._diffs is None:
+            self._diffs = np.diff(self.digits, axis=1)
+        return self._diffs
+
+    def first(self, x: int) -> np.ndarray:
+        """Position of the first digit x per row, -1 where there is none"""
+        if x not in self._first:
+            found = self.digits == x
+            self._first[x] = np.where(found.any(axis=1), found.argmax(axis=1), -1)
+        return self._first[x]
+
+
+def _steps(batch: _Batch, k) -> np.ndarray:
+    if isinstance(k, np.ndarray):
+        k = k[:, np.newaxis]
+    return (batch.diffs == k).all(axis=1)
+
+
+def _period(digits: np.ndarray, p: int) -> np.ndarray:
+    if p <= 0 or p >= digits.shape[1]:
+        return np.zeros(digits.shape[0], dtype=bool)
+    return (digits[:, p:] == digits[:, :-p]).all(axis=1)
+
+
+def _run(digits: np.ndarray, k: int) -> np.ndarray:
+    if k <= 1:
+        return np.ones(digits.shape[0], dtype=bool)
+    result = np.zeros(digits.shape[0], dtype=bool)
+    for start in range(digits.shape[1] - k + 1):
+        result |= (digits[:, start:start + k] == digits[:, start:start + 1]).all(axis=1)
+    return result
+
+
+def _blocks(digits: np.ndarray, p: int) -> np.ndarray:
+    if p <= 0 or p > digits.shape[1]:
+        return np.zeros(digits.shape[0], dtype=np.int64)
+    result = np.zeros(digits.shape[0], dtype=np.int64)
+    for start in range(0, digits.shape[1] - p + 1, p):
+        result += (digits[:, start:start + p] == digits[:, :p]).all(axis=1)
+    return result
+
+
+def _value(digits: np.ndarray) -> np.ndarray:
+    return digits.astype(np.int64) @ 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+
+
+def _min_count(batch: _Batch) -> np.ndarray:
+    return np.where(batch.counts > 0, batch.counts, batch.digits.shape[1] + 1).min(axis=1)
+
+
+_NAMES: Dict[str, Compiled] = {
+    "length": lambda batch: batch.digits.shape[1],
+    "value": lambda batch: _value(batch.digits),
+    "distinct": lambda batch: (batch.counts > 0).sum(axis=1),
+    "max_count": lambda batch: batch.counts.max(axis=1),
+    "min_count": _min_count,
+    "palindrome": lambda batch: (batch.digits == batch.digits[:, ::-1]).all(axis=1),
+    "all_even": lambda batch: (batch.digits % 2 == 0).all(axis=1),
+    "all_odd": lambda batch: (batch.digits % 2 == 1).all(axis=1),
+    "alternating_parity": lambda batch: (np.diff(batch.digits % 2, axis=1) != 0).all(axis=1),
+}
+
+# Functions whose argument may not depend on the digits
+_SCALAR_FUNCTIONS = {
+    "period": _period,
+    "run": _run,
+    "blocks": _blocks,
+}
+
+
+def _scalar(argument: Compiled, batch: _Batch) -> int:
+    value = argument(batch)
+    if isinstance(value, np.ndarray):
+        raise ValueError("Positions, ranges and the arguments of first(), period(), run() and blocks() "
+                         "may not depend on the digits")
+    return int(value)
+
+
+class _Compiler:
+    """Translate an expression tree into nested closures"""
+
+    def __init__(self, settings: Iterable[str] = (), shared: Iterable[str] = ()):
+        # Names bound in the batch scope: settings, then loop variables
+        self.bound = set(settings)
+        # Dumps of subexpressions that occur more than once
+        self.shared = set(shared)
+
+    def compile(self, node: ast.AST) -> Compiled:
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            raise ValueError(f"Unsupported syntax in rule: {type(node).__name__}")
+        compiled = method(node)
+        key = ast.dump(node)
+        if key in self.shared and not any(isinstance(name, ast.Name) and name.id in self.bound
+                                          for name in ast.walk(node)):
+            # Evaluate a repeated subexpression once per batch
+            def shared(batch):
+                if key not in batch.names:
+                    batch.names[key] = compiled(batch)
+                return batch.names[key]
+            return shared
+        return compiled
+
+    def _Expression(self, node):
+        return self.compile(node.body)
+
+    def _Constant(self, node):
+        if not isinstance(node.value, int) or isinstance(node.value, bool):
+            raise ValueError(f"Only integer constants are allowed in rules, not {node.value!r}")
+        value = node.value
+        return lambda batch: value
+
+    def _Name(self, node):
+        if node.id in self.bound:
+            name = node.id
+            return lambda batch: batch.scope[name]
+        if node.id not in _NAMES:
+            raise ValueError(f"Unknown name in rule: {node.id}")
+        name, function = node.id, _NAMES[node.id]
+
+        def lookup(batch):
+            # Rules of one policy share a name's value within a batch
+            if name not in batch.names:
+                batch.names[name] = function(batch)
+            return batch.names[name]
+        return lookup
+
+    def _Subscript(self, node):
+        if not isinstance(node.value, ast.Name) or node.value.id != "d":
+            raise ValueError("Only the digits d[i] can be indexed")
+        position = node.slice
+        if isinstance(position, ast.Index):  # Python < 3.9
+            position = position.value
+        position = self.compile(position)
+
+        def digit(batch):
+            index = _scalar(position, batch)
+            length = batch.digits.shape[1]
+            if not -length <= index < length:
+                raise ValueError(f"Digit position {index} is outside a {length}-digit PIN")
+            return batch.digits[:, index]
+        return digit
+
+    def _UnaryOp(self, node):
+        operand = self.compile(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda batch: np.logical_not(operand(batch))
+        if isinstance(node.op, ast.USub):
+            return lambda batch: -operand(batch)
+        raise ValueError(f"Unsupported operator in rule: {type(node.op).__name__}")
+
+    def _BinOp(self, node):
+        function = _BINARY.get(type(node.op))
+        if function is None:
+            raise ValueError(f"Unsupported operator in rule: {type(node.op).__name__}")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda batch: function(left(batch), right(batch))
+
+    def _BoolOp(self, node):
+        conjunction = isinstance(node.op, ast.And)
+        function = np.logical_and if conjunction else np.logical_or
+        operands = [self.compile(value) for value in node.values]
+
+        def combine(batch):
+            result = operands[0](batch)
+            for operand in operands[1:]:
+                if not isinstance(result, np.ndarray) and bool(result) != conjunction:
+                    # Decided for every row by the length alone, as in
+                    # "length == 4 and d[3] == 0" on shorter PINs
+                    break
+                result = function(result, operand(batch))
+            return result
+        return combine
+
+    def _Compare(self, node):
+        operands = [self.compile(node.left)] + [self.compile(value) for value in node.comparators]
+        functions = []
+        for op in node.ops:
+            if type(op) not in _COMPARE:
+                raise ValueError(f"Unsupported comparison in rule: {type(op).__name__}")
+            functions.append(_COMPARE[type(op)])
+
+        def compare(batch):
+            values = [operand(batch) for operand in operands]
+            result = True
+            for function, left, right in zip(functions, values, values[1:]):
+                result = np.logical_and(result, function(left, right))
+            return result
+        return compare
+
+    def _aggregate(self, name: str, node: ast.GeneratorExp) -> Compiled:
+        if len(node.generators) != 1:
+            raise ValueError(f"{name}() takes one 'for' clause")
+        loop = node.generators[0]
+        iterator = loop.iter
+        if (loop.ifs or getattr(loop, "is_async", 0) or not isinstance(loop.target, ast.Name)
+                or not isinstance(iterator, ast.Call) or not isinstance(iterator.func, ast.Name)
+                or iterator.func.id != "range" or iterator.keywords or not 1 <= len(iterator.args) <= 3):
+            raise ValueError(f"{name}() loops over a single name in range(...)")
+        variable = loop.target.id
+        if variable in self.bound or variable in _NAMES or variable == "d":
+            raise ValueError(f"Loop variable {variable} shadows another name")
+        bounds = [self.compile(argument) for argument in iterator.args]
+        self.bound.add(variable)
+        try:
+            element = self.compile(node.elt)
+        finally:
+            self.bound.discard(variable)
+        start, step = _AGGREGATES[name]
+
+        def aggregate(batch):
+            result = start
+            for value in range(*(_scalar(bound, batch) for bound in bounds)):
+                batch.scope[variable] = value
+                result = step(result, element(batch))
+            batch.scope.pop(variable, None)
+            return result
+        return aggregate
+
+    def _Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ValueError("Rules may only call vocabulary functions with positional arguments")
+        name = node.func.id
+        if name in _AGGREGATES and len(node.args) == 1 and isinstance(node.args[0], ast.GeneratorExp):
+            return self._aggregate(name, node.args[0])
+        arguments = [self.compile(argument) for argument in node.args]
+        if name == "abs" and len(arguments) == 1:
+            return lambda batch: np.abs(arguments[0](batch))
+        if name == "count" and len(arguments) == 1:
+            value = arguments[0]
+
+            def count(batch):
+                x = value(batch)
+                if isinstance(x, np.ndarray):
+                    return (batch.digits == x[:, np.newaxis]).sum(axis=1)
+                return batch.counts[:, x] if 0 <= x <= 9 else np.zeros(batch.digits.shape[0], dtype=np.int64)
+            return count
+        if name == "first" and len(arguments) == 1:
+            value = arguments[0]
+            return lambda batch: batch.first(_scalar(value, batch))
+        if name == "adjacent" and len(arguments) == 2:
+            x, y = arguments
+            return lambda batch: _ADJACENT[x(batch), y(batch)]
+        if name == "steps" and len(arguments) == 1:
+            step = arguments[0]
+            return lambda batch: _steps(batch, step(batch))
+        if name in _SCALAR_FUNCTIONS and len(arguments) == 1:
+            function = _SCALAR_FUNCTIONS[name]
+            return lambda batch: function(batch.digits, _scalar(arguments[0], batch))
+        raise ValueError(f"Unknown function or wrong arguments in rule: {name}")
+
+
+class Rule:
+    """One named weakness rule and its compiled evaluator"""
+
+    def __init__(self, name: str, expression: str, settings: Optional[Mapping[str, Any]] = None):
+        """
+        Args:
+            name (str): Reason code reported when the rule matches
+            expression (str): Rule in the language described above
+            settings (dict): Names the rule reads besides the vocabulary,
+                with their default values
+
+        Raises:
+            ValueError: If the expression is not a valid rule
+        """
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid rule {name}: {e.msg}") from None
+        self.name = name
+        self.expression = expression
+        self.settings = dict(settings or {})
+        clashes = set(self.settings) & (set(_NAMES) | {"d"})
+        if clashes:
+            raise ValueError(f"Settings of rule {name} shadow vocabulary names: {', '.join(sorted(clashes))}")
+        dumps = collections.Counter(ast.dump(node) for node in ast.walk(tree)
+                                    if isinstance(node, (ast.BinOp, ast.BoolOp, ast.Call, ast.Compare)))
+        shared = (dump for dump, uses in dumps.items() if uses > 1)
+        self._evaluate = _Compiler(self.settings, shared).compile(tree)
+
+    def __repr__(self) -> str:
+        if self.settings:
+            return f"Rule({self.name!r}, {self.expression!r}, {self.settings!r})"
+        return f"Rule({self.name!r}, {self.expression!r})"
+
+    def evaluate(self, digits: np.ndarray, **settings) -> np.ndarray:
+        """Boolean match per row of a (N, length) digit matrix"""
+        return self._match(_Batch(np.asarray(digits).astype(np.int16)), settings)
+
+    def _match(self, batch: _Batch, settings: Optional[Mapping[str, Any]] = None) -> np.ndarray:
+        unknown = set(settings or {}) - set(self.settings)
+        if unknown:
+            # Like a keyword argument the function does not take
+            raise TypeError(f"Rule {self.name} has no setting {', '.join(sorted(unknown))}")
+        batch.scope = {**self.settings, **(settings or {})}
+        result = self._evaluate(batch)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (batch.digits.shape[0],))
+
+
+class Policy:
+    """An ordered set of rules evaluated together; rule i sets bit i"""
+
+    # Rules per policy, bounded by the uint64 result masks
+    MAX_RULES = 64
+
+    def __init__(self, rules: Union[Mapping[str, str], Iterable[Rule]] = ()):
+        """
+        Args:
+            rules: Name -> expression mapping, or Rule objects
+        """
+        self.rules = []
+        items = rules.items() if isinstance(rules, Mapping) else ((r.name, r) for r in rules)
+        for name, rule in items:
+            self.add(name, rule)
+
+    def add(self, name: str, rule: Union[str, Rule]):
+        """Append a rule, given as a Rule or an expression without settings"""
+        if len(self.rules) == self.MAX_RULES:
+            raise ValueError(f"A policy holds at most {self.MAX_RULES} rules")
+        if any(existing.name == name for existing in self.rules):
+            raise ValueError(f"Duplicate rule name: {name}")
+        self.rules.append(rule if isinstance(rule, Rule) else Rule(name, rule))
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(rule.name for rule in self.rules)
+
+    def evaluate(self, digits: np.ndarray, mask: Optional[int] = None,
+                 settings: Optional[Mapping[str, Mapping[str, Any]]] = None) -> np.ndarray:
+        """
+        Evaluate rules over a digit matrix.
+
+        Args:
+            digits (np.ndarray): (N, length) digit matrix
+            mask (int): Bits of the rules to evaluate (default: all)
+            settings (dict): Setting overrides per rule name
+
+        Returns:
+            np.ndarray: uint64 bitmask per row, bit i set when rule i matches
+
+        Raises:
+            TypeError: If an evaluated rule is given a setting it does not read
+        """
+        settings = settings or {}
+        batch = _Batch(np.asarray(digits).astype(np.int16))
+        result = np.zeros(batch.digits.shape[0], dtype=np.uint64)
+        for bit, rule in enumerate(self.rules):
+            if mask is None or mask >> bit & 1:
+                result[rule._match(batch, settings.get(rule.name))] |= np.uint64(1 << bit)
+        return result
+
+    def evaluate_values(self, values: np.ndarray, length: int) -> np.ndarray:
+        """Evaluate every rule over integer PIN values of one length"""
+        return self.evaluate(digit_matrix(np.asarray(values, dtype=np.int64), length))
+
+    def keyspace(self, length: int, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first value, masks) chunks covering every PIN of a length"""
+        for start in range(0, 10 ** length, chunk_size):
+            values = np.arange(start, min(start + chunk_size, 10 ** length), dtype=np.int64)
+            yield start, self.evaluate_values(values, length)
+
+    def check(self, mpin: str) -> Tuple[str, ...]:
+        """Names of the rules matching one PIN"""
+        if not isinstance(mpin, str) or not mpin.isascii() or not mpin.isdigit():
+            raise ValueError("MPIN must be a digit string")
+        mask = int(self.evaluate(np.array([[int(c) for c in mpin]]))[0])
+        return self.decode(mask)
+
+    def decode(self, mask: int) -> Tuple[str, ...]:
+        """Names of the rules whose bits are set in a mask"""
+        return tuple(rule.name for bit, rule in enumerate(self.rules) if mask >> bit & 1)
+
+
+def _near(x: int, y: int) -> str:
+    """Rule text: digits x and y occur and their first occurrences touch"""
+    return f"count({x}) > 0 and count({y}) > 0 and abs(first({x}) - first({y})) == 1"
+
+
+def _keypad_line(line: str) -> str:
+    """Rule text of _is_keyboard_pattern's test for one ATM keypad line"""
+    x, y, z = line
+    return f"(count({x}) > 0 and count({y}) > 0 and count({z}) > 0 and ({_near(x, y)} or {_near(y, z)}))"
+
+
+def _zigzag(path: str) -> str:
+    """Rule text of _is_zigzag_pattern's test for one keypad path"""
+    return "(" + " and ".join(f"({_near(x, y)})" for x, y in zip(path, path[1:])) + ")"
+
+
+_ATM_LINES = ("123", "456", "789", "147", "258", "369", "159", "357")
+
+_ZIGZAG_PATHS = (
+    "1357", "3579", "7531", "9753",
+    "1470", "3690", "7410", "9630",
+    "1590", "3570", "7530", "9510",
+)
+
+# parte's detectors restated as rules, in tables.DETECTOR_NAMES order;
+# each matches its detector over the whole 4- and 6-digit keyspaces
+# (test_rule_policy checks all 4-digit PINs and a sample of 6-digit ones)
+DETECTOR_RULES = {
+    "_is_sequential": "steps(1) or steps(-1)",
+    "_is_repeated_digits": "(distinct == 1 or (distinct == 2 and min_count >= 2))"
+                           " or (distinct > 2 and length % 2 == 0 and period(length // 2))",
+    "_is_keyboard_pattern": "sum(adjacent(d[i], d[i + 1]) for i in range(length - 1)) >= length - 2 or "
+                            + " or ".join(_keypad_line(line) for line in _ATM_LINES),
+    "_is_palindrome": "palindrome",
+    "_is_all_same_digit": "distinct == 1",
+    # The two-digit year fallback accepts every 4-digit PIN and nothing
+    # else, whatever the range of full years
+    "_is_common_year": "length == 4",
+    "_is_odd_even_pattern": "all_even or all_odd or alternating_parity",
+    "_is_double_double_pattern": "length == 4 and d[0] == d[1] and d[2] == d[3] and d[0] != d[2]",
+    "_is_mirror_pattern": "palindrome",
+    "_is_pin_pattern": "length == 4 and ((1 <= d[0] * 10 + d[1] <= 12 and 1 <= d[2] * 10 + d[3] <= 31)"
+                       " or (1 <= d[0] * 10 + d[1] <= 31 and 1 <= d[2] * 10 + d[3] <= 12))",
+    "_is_arithmetic_sequence": "length >= 3 and ((d[1] != d[0] and steps(d[1] - d[0]))"
+                               " or (length == 6 and value == 135790))",
+    "_has_low_entropy": "distinct <= 2"
+                        " or any(blocks(p) > 1 and blocks(p) * p >= length * coverage"
+                        " for p in range(1, length // 2 + 1))"
+                        " or any(d[i] == d[i + 2] and d[i + 1] == d[i + 3] for i in range(length - 3))",
+    "_is_triplet_pattern": "run(3)",
+    "_is_zigzag_pattern": " or ".join(_zigzag(path) for path in _ZIGZAG_PATHS),
+}
+
+# Settings the detector rules read, with the validators' defaults; the
+# same names as in a validator's detector_parameters()
+DETECTOR_SETTINGS = {
+    "_is_common_year": {"years": (1930, 2025)},
+    "_has_low_entropy": {"coverage": 0.6},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def detector_policy() -> Policy:
+    """DETECTOR_RULES compiled once, named by detector, so rule i sets tables.DETECTOR_BITS bit i"""
+    return Policy(Rule(name, DETECTOR_RULES[name], DETECTOR_SETTINGS.get(name)) for name in tables.DETECTOR_NAMES)
+
+
+def standard_policy() -> Policy:
+    """DETECTOR_RULES as a policy named by reason code, e.g. SEQUENTIAL"""
+    return Policy(Rule(reasons.PATTERN_REASONS[name], DETECTOR_RULES[name], DETECTOR_SETTINGS.get(name))
+                  for name in tables.DETECTOR_NAMES)
@@ -0,0 +1,349 @@
+"""
+Local asyncio HTTP validation service with micro-batching.
+
+Concurrent requests are queued and evaluated together: the batcher waits
+for up to ``max_batch_delay`` after the first request (or until
+``max_batch_size`` requests are queued) and then checks the whole batch
+in one vectorized pass, on an executor thread so a slow batch (such as
+one that waits for a weakness table) never stalls the event loop. Only
+the standard library is needed to serve; NumPy, when installed, is used
+for the batch evaluation.
+
+Run it with::
+
+    python -m mpin_validator.service --port 8080
+
+Endpoints:
+    GET  /health                       -> {"status": "ok"}
+    GET  /check?pin=1234&dob=15-06-1985
+    POST /check        {"pin": "1234", "dob": ..., "spouse_dob": ..., "anniversary": ...}
+    POST /check_many   {"records": [{"pin": ...}, ...]}
+
+Check responses have the same shape as check_mpin results.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from mpin_validator import reasons
+from mpin_validator.validators import DemographicProfile, UniversalMPINValidator
+
+try:
+    import numpy as np
+    from mpin_validator import vectorized
+except ImportError:
+    np = None
+
+
+Profile = Tuple[Optional[str], Optional[str], Optional[str]]
+
+PROFILE_FIELDS = ("dob", "spouse_dob", "anniversary")
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large"}
+
+# Largest request body accepted
+MAX_BODY_SIZE = 1 << 20
+
+
+class BatchEvaluator:
+    """
+    Check batches of (pin, profile) requests in one pass.
+
+    Pattern detectors run once over all PINs of a batch; demographic
+    patterns are extracted once per distinct profile and cached.
+    """
+
+    def __init__(self, profile_cache_size: int = 4096, lengths=(4, 6)):
+        """
+        Args:
+            profile_cache_size (int): Demographic profiles kept in memory
+            lengths (iterable): PIN lengths to accept, as for UniversalMPINValidator
+        """
+        self.validator = UniversalMPINValidator(lengths)
+        self._validators = self.validator.validators
+        self._profiles = collections.OrderedDict()
+        self._profile_cache_size = profile_cache_size
+
+    def _demographic_profile(self, profile: Profile) -> DemographicProfile:
+        """The validator's DemographicProfile of a request's dates, cached"""
+        demographics = self._profiles.get(profile)
+        if demographics is not None:
+            self._profiles.move_to_end(profile)
+            return demographics
+
+        demographics = self.validator.make_profile(*profile)
+        self._profiles[profile] = demographics
+        if len(self._profiles) > self._profile_cache_size:
+            self._profiles.popitem(last=False)
+        return demographics
+
+    def _common_flags(self, pins: List[str], values: List[int]) -> List[bool]:
+        """is_common_mpin for valid PINs of mixed length and their values, vectorized when possible"""
+        if np is None:
+            return [self._validators[len(pin)].is_common_mpin(pin) for pin in pins]
+
+        flags = [False] * len(pins)
+        for length, validator in self._validators.items():
+            rows = [i for i, pin in enumerate(pins) if len(pin) == length]
+            if rows:
+                group = np.array([values[i] for i in rows], dtype=np.int64)
+                for i, common in zip(rows, vectorized.common_flags(group, length, validator).tolist()):
+                    flags[i] = common
+        return flags
+
+    def evaluate(self, batch: List[Tuple[str, Profile]]) -> List[Dict]:
+        """
+        Check a batch of requests.
+
+        Returns:
+            list: One check_mpin-shaped result per request, or
+            {"mpin": ..., "error": ...} for PINs check_mpin rejects
+        """
+        results = [None] * len(batch)
+        valid, values = [], []
+        for i, (pin, _) in enumerate(batch):
+            try:
+                self.validator.validator_for(pin)
+                # As the table lookups of check_mpin read it
+                values.append(int(pin))
+            except ValueError as e:
+                results[i] = {"mpin": pin, "error": str(e)}
+            else:
+                valid.append(i)
+
+        flags = self._common_flags([batch[i][0] for i in valid], values)
+        for i, common in zip(valid, flags):
+            pin, profile = batch[i]
+            bits = self._demographic_profile(profile).reason(pin)
+            if not bits and common:
+                bits = reasons.COMMONLY_USED
+            results[i] = {
+                "mpin": pin,
+                "strength": "WEAK" if bits else "STRONG",
+                "reasons": reasons.decode_reasons(bits)
+            }
+        return results
+
+
+class MicroBatcher:
+    """Collect concurrent check requests into batches for a BatchEvaluator"""
+
+    def __init__(self, evaluator: BatchEvaluator, max_batch_size: int = 256,
+                 max_batch_delay: float = 0.002):
+        """
+        Args:
+            evaluator (BatchEvaluator): Evaluates each batch
+            max_batch_size (int): Requests per batch at most
+            max_batch_delay (float): Seconds the first request of a batch may wait
+        """
+        self.evaluator = evaluator
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.batches = 0
+        self.requests = 0
+        self._queue = asyncio.Queue()
+        self._arrived = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def check(self, pin: str, profile: Profile) -> Dict:
+        """Queue one request and wait for its batch to be evaluated"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((pin, profile), future))
+        self._arrived.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_batch_delay
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # Waiting on an event, unlike on the queue, loses nothing on timeout
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(None, self.evaluator.evaluate,
+                                                     [request for request, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _profile(fields: Dict) -> Profile:
+    return tuple(str(fields[name]) if fields.get(name) else None for name in PROFILE_FIELDS)
+
+
+class ValidationService:
+    """Minimal HTTP/1.1 server in front of a MicroBatcher"""
+
+    def __init__(self, batcher: MicroBatcher):
+        self.batcher = batcher
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                malformed = False
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, colon, value = line.decode("latin-1").partition(":")
+                    malformed = malformed or not colon or not name.strip()
+                    headers[name.strip().lower()] = value.strip()
+                if malformed:
+                    await self._respond(writer, 400, {"error": "Malformed header"}, False)
+                    break
+
+                length = headers.get("content-length", "0")
+                if not length.isascii() or not length.isdigit():
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        """Route one request and return (status, JSON payload)"""
+        try:
+            url = urlsplit(target)
+        except ValueError:
+            return 400, {"error": "Malformed request target"}
+        if url.path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches,
+                         "requests": self.batcher.requests}
+
+        if url.path == "/check":
+            if method == "GET":
+                fields = {name: values[0] for name, values in parse_qs(url.query).items()}
+            elif method == "POST":
+                try:
+                    fields = json.loads(body or b"{}")
+                except ValueError:
+                    return 400, {"error": "Body must be JSON"}
+                if not isinstance(fields, dict):
+                    return 400, {"error": "Body must be a JSON object"}
+            else:
+                return 405, {"error": "Use GET or POST"}
+            result = await self.batcher.check(fields.get("pin"), _profile(fields))
+            return (400 if "error" in result else 200), result
+
+        if url.path == "/check_many":
+            if method != "POST":
+                return 405, {"error": "Use POST"}
+            try:
+                records = json.loads(body or b"{}")["records"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "Body must be JSON with a records list"}
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                return 400, {"error": "Records must be JSON objects"}
+            results = await asyncio.gather(*(self.batcher.check(record.get("pin"), _profile(record))
+                                             for record in records))
+            return 200, {"results": results}
+
+        return 404, {"error": "Not found"}
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict,
+                       keep_alive: bool):
+        body = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, max_batch_size: int = 256,
+                max_batch_delay: float = 0.002, ready: Optional[asyncio.Event] = None):
+    """Run the service until cancelled"""
+    batcher = MicroBatcher(BatchEvaluator(), max_batch_size, max_batch_delay)
+    batcher.start()
+    service = ValidationService(batcher)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve MPIN checks over HTTP on localhost")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="Port (default: %(default)s)")
+    parser.add_argument("--max-batch-size", type=int, default=256,
+                        help="Requests per micro-batch (default: %(default)s)")
+    parser.add_argument("--max-batch-delay-ms", type=float, default=2.0,
+                        help="Longest wait for a batch to fill (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print(f"Serving MPIN checks on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch_size,
+                          args.max_batch_delay_ms / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+Validator tables published once per host and mapped by every worker.
+
+A pre-forking server would otherwise give each worker its own copy of
+the 4-digit weakness table, the entropy score tables, guess ranks and
+strong-PIN bitmaps, and each new worker would read or rebuild them
+before serving. Instead the master publishes the resolved tables, and
+the date pattern table, into one segment file, ideally on tmpfs
+(``/dev/shm``). Workers map it read-only and the table modules look
+their tables up in it by name before touching their own files, so host
+memory stays flat as workers are added and a worker resolves a table
+with a few page faults. Forked workers inherit the master's mapping;
+other processes attach through ``MPIN_SHARED_DIR``.
+
+A segment is never modified. Publishing writes generation N + 1 as a new
+file and then atomically repoints the ``current`` file at it. Workers
+call refresh() between requests to switch over; tables of the old
+generation stay valid while anything references them, since unlinking
+a mapped file leaves its pages in place::
+
+    shared.publish("/dev/shm/mpin-validator")     # master, before forking
+    if shared.refresh():                          # worker, between requests
+        validator.reset_weakness_table()
+
+or from a shell::
+
+    python -m mpin_validator.shared publish --directory /dev/shm/mpin-validator
+
+Entries are stored in native byte order; a segment never leaves its host.
+"""
+
+import glob
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# Segment layout: header, entry index, then page-aligned entries
+SEGMENT_MAGIC = b"MPINSHRD"
+SEGMENT_VERSION = 1
+_HEADER = struct.Struct("<8sHQI")
+_ENTRY = struct.Struct("<64sQQ")
+_PAGE = 4096
+
+# File naming the current generation
+POINTER = "current"
+
+# Modules holding tables resolved from a segment, and how to forget them
+_RESETS = (
+    ("tables", "reset_tables"),
+    ("entropy", "reset_score_tables"),
+    ("guessrank", "reset_ranks"),
+    ("suggest", "reset_strong_pins"),
+    ("dates", "reset_table"),
+)
+
+
+class Segment:
+    """One published generation of tables, mapped read-only"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Segment file written by write_segment
+        """
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.generation, count = _HEADER.unpack_from(self._buffer, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not an MPIN table segment")
+        if version != SEGMENT_VERSION:
+            raise ValueError(f"{path} has format version {version}, expected {SEGMENT_VERSION}")
+
+        self.path = path
+        self._entries = {}
+        for i in range(count):
+            name, offset, size = _ENTRY.unpack_from(self._buffer, _HEADER.size + i * _ENTRY.size)
+            if offset + size > len(self._buffer):
+                raise ValueError(f"{path} is truncated")
+            self._entries[name.rstrip(b"\0").decode("ascii")] = (offset, size)
+        self._view = memoryview(self._buffer)
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(self._entries)
+
+    def get(self, name: str) -> Optional[memoryview]:
+        """The bytes of an entry as a slice of the mapping, or None"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        offset, size = entry
+        return self._view[offset:offset + size]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _align(offset: int) -> int:
+    return (offset + _PAGE - 1) // _PAGE * _PAGE
+
+
+def write_segment(path: str, entries: Dict[str, object], generation: int):
+    """
+    Write named tables as a segment, replacing path atomically.
+
+    Args:
+        path (str): Destination file
+        entries (dict): Bytes-like contents per name
+        generation (int): Generation stored in the header
+    """
+    from mpin_validator import tables
+
+    data = [bytes(value) for value in entries.values()]
+    offset = _align(_HEADER.size + len(entries) * _ENTRY.size)
+    index = []
+    for name, contents in zip(entries, data):
+        index.append(_ENTRY.pack(name.encode("ascii"), offset, len(contents)))
+        offset = _align(offset + len(contents))
+
+    parts = [_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, generation, len(entries)), *index]
+    position = _HEADER.size + len(entries) * _ENTRY.size
+    for contents in data:
+        parts.append(bytes(_align(position) - position))
+        parts.append(contents)
+        position = _align(position) + len(contents)
+    tables._write_atomic(path, parts, ".segment-")
+
+
+def shared_directory() -> Optional[str]:
+    """Directory of the segments workers attach to (MPIN_SHARED_DIR), or None"""
+    return os.environ.get("MPIN_SHARED_DIR") or None
+
+
+def segment_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"tables-{generation}.segment")
+
+
+def current_generation(directory: str) -> Optional[int]:
+    """The generation the directory's pointer names, or None before the first publish"""
+    try:
+        with open(os.path.join(directory, POINTER), "rb") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _open_current(directory: str) -> Optional[Segment]:
+    for _ in range(3):
+        generation = current_generation(directory)
+        if generation is None:
+            return None
+        try:
+            return Segment(segment_path(directory, generation))
+        except FileNotFoundError:
+            # Replaced between reading the pointer and opening it
+            continue
+        except (OSError, ValueError):
+            return None
+    return None
+
+
+_segment: Optional[Segment] = None
+_directory: Optional[str] = None
+_resolved = False
+
+
+def _use(segment: Optional[Segment], directory: Optional[str]):
+    global _segment, _directory, _resolved
+    _segment, _directory, _resolved = segment, directory, True
+
+
+def _forget_resolved():
+    """Make the table modules loaded so far resolve their tables again"""
+    for module, reset in _RESETS:
+        loaded = sys.modules.get(f"{__package__}.{module}")
+        if loaded is not None:
+            getattr(loaded, reset)()
+
+
+def segment() -> Optional[Segment]:
+    """The attached segment; the first call attaches to MPIN_SHARED_DIR if it is set"""
+    if not _resolved:
+        directory = shared_directory()
+        _use(_open_current(directory) if directory else None, directory)
+    return _segment
+
+
+def lookup(name: str) -> Optional[memoryview]:
+    """A table of the attached segment, or None if there is none or it lacks the name"""
+    current = _segment if _resolved else segment()
+    return current.get(name) if current is not None else None
+
+
+def attach(directory: Optional[str] = None) -> Optional[Segment]:
+    """
+    Look tables up in the current generation of a directory from now on.
+
+    Tables resolved before are forgotten, so they come from the segment
+    on next use. Validators keep theirs until reset_weakness_table().
+
+    Args:
+        directory (str): Segment directory (default: MPIN_SHARED_DIR)
+
+    Returns:
+        Segment or None: None before the directory's first publish
+    """
+    directory = directory or shared_directory()
+    _use(_open_current(directory) if directory else None, directory)
+    _forget_resolved()
+    return _segment
+
+
+def detach():
+    """Stop looking tables up in a segment; tables handed out stay valid"""
+    _use(None, None)
+    _forget_resolved()
+
+
+def refresh() -> bool:
+    """
+    Switch to the newest generation of the attached directory.
+
+    Cheap enough to call between requests: one read of the pointer file.
+    Tables of the previous generation stay valid for whoever holds them.
+
+    Returns:
+        bool: True when a new generation was attached; re-resolve the
+        validators' tables then, e.g. with reset_weakness_table()
+    """
+    segment()
+    if _directory is None:
+        return False
+    generation = current_generation(_directory)
+    if generation is None or _segment is not None and _segment.generation == generation:
+        return False
+    return attach(_directory) is not None
+
+
+def collect(validator) -> Dict[str, object]:
+    """
+    Resolve the tables of a validator's length and detector policy.
+
+    Weakness tables are built if need be; guess ranks and strong-PIN
+    bitmaps of longer keyspaces are left out without NumPy.
+
+    Returns:
+        dict: Bytes-like contents keyed by segment entry name
+    """
+    from mpin_validator import entropy, guessrank, suggest, tables
+
+    length = getattr(validator, "pin_length", 4)
+    entries = {}
+    if tables.detector_mask(validator) is not None:
+        fingerprint = tables.policy_fingerprint(validator, length)
+        table = tables.get_table(validator, length, wait=True)
+        if isinstance(table, tables.WeaknessTable):
+            entries[tables.shared_name(length, fingerprint)] = table.masks
+        elif table is not None:
+            entries[tables.shared_name(length, fingerprint)] = table._buffer
+
+        try:
+            ranks = guessrank.get_ranks(validator, length)
+            strong = suggest.get_strong_pins(validator, length)
+        except ImportError:
+            ranks = strong = None
+        if ranks is not None:
+            entries[guessrank.shared_name(length, fingerprint, "order")] = ranks.order
+            entries[guessrank.shared_name(length, fingerprint, "ranks")] = ranks.ranks
+        if strong is not None:
+            entries[suggest.shared_name(length, fingerprint)] = strong.bitmap
+
+    scores = entropy.score_table(length)
+    if scores is not None:
+        from array import array
+
+        entries[entropy.shared_name(length, "codes")] = scores[0]
+        entries[entropy.shared_name(length, "levels")] = array("d", scores[1])
+    return entries
+
+
+def publish(directory: Optional[str] = None, validators: Optional[Iterable] = None) -> int:
+    """
+    Publish the validators' tables as the directory's next generation.
+
+    Tables are resolved from files and detectors, not from an attached
+    segment, so a publish picks up rebuilt files. Run one publisher per
+    directory. Older generations are unlinked; processes still mapping
+    them keep their pages until they refresh.
+
+    Args:
+        directory (str): Segment directory, ideally on tmpfs (default: MPIN_SHARED_DIR)
+        validators (iterable): Validators whose tables to publish
+            (default: the stock 4- and 6-digit validators)
+
+    Returns:
+        int: The new generation, attached in this process
+    """
+    from mpin_validator import dates, tables
+
+    directory = directory or shared_directory()
+    if not directory:
+        raise ValueError("No segment directory given and MPIN_SHARED_DIR is not set")
+    if validators is None:
+        from mpin_validator.validators import MPINValidator, SixDigitMPINValidator
+        validators = (MPINValidator(), SixDigitMPINValidator())
+
+    _use(None, None)
+    _forget_resolved()
+    entries = {}
+    for validator in validators:
+        entries.update(collect(validator))
+    date_table = dates.get_table()
+    if date_table is not None:
+        entries[dates.SHARED_NAME] = date_table._buffer
+
+    generation = (current_generation(directory) or 0) + 1
+    path = segment_path(directory, generation)
+    write_segment(path, entries, generation)
+    tables._write_atomic(os.path.join(directory, POINTER), [b"%d\n" % generation], ".current-")
+    for old in glob.glob(os.path.join(directory, "tables-*.segment")):
+        if old != path:
+            try:
+                os.unlink(old)
+            except OSError:
+                pass
+
+    attach(directory)
+    return generation
+
+
+def main(argv=None):
+    """Command line entry point for publishing and inspecting segments"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish MPIN validator tables for worker processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("publish", "Resolve the tables and publish the next generation"),
+                            ("show", "List the tables of the current generation")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--directory", default=shared_directory(),
+                             help="Segment directory (default: MPIN_SHARED_DIR)")
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error("--directory is required when MPIN_SHARED_DIR is not set")
+
+    if args.command == "publish":
+        started = time.perf_counter()
+        generation = publish(args.directory)
+        elapsed = time.perf_counter() - started
+        print(f"Published generation {generation} to {segment_path(args.directory, generation)} "
+              f"in {elapsed:.1f}s", file=sys.stderr)
+
+    current = _open_current(args.directory)
+    if current is None:
+        parser.error(f"nothing has been published to {args.directory}")
+    print(f"generation {current.generation}: {current.path}")
+    for name in current.names:
+        print(f"  {name:40} {len(current.get(name)):>10,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Strong-PIN suggestions for a customer whose MPIN was rejected.
+
+The PINs of one length that no active detector flags are kept as a
+bitmap with a popcount directory (rank/select): select(i) finds the i-th
+strong PIN with one binary search over the directory and a scan of one
+64-byte block, so drawing a random strong PIN costs microseconds instead
+of a loop of random candidates and full checks. The customer's own
+demographic patterns are skipped.
+
+The first suggestion for a length waits for the validator's weakness
+table (built in the background on a cold cache, a few seconds for six
+digits) and derives the bitmap from it; call get_strong_pins for each
+length at startup to pay that up front.
+
+Nearest mode returns strong PINs at the smallest substitution (Hamming)
+distance from a rejected PIN, scanning its neighbourhood ring by ring.
+The place-value patterns of each ring are precomputed per length, so a
+candidate is a little integer arithmetic and one bitmap test.
+
+Suggestions are drawn from ``random.SystemRandom`` unless a generator is
+passed, so they never become a predictable list of their own.
+"""
+
+import bisect
+import functools
+import itertools
+import random
+import threading
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from mpin_validator import shared, tables
+
+
+# Bytes of bitmap per directory entry
+BLOCK_BYTES = 64
+
+_BYTE_COUNTS = bytes(bin(byte).count("1") for byte in range(256))
+
+
+class StrongPins:
+    """Bitmap of the strong PINs of one length with rank/select"""
+
+    def __init__(self, length: int, bitmap: bytes):
+        """
+        Args:
+            length (int): PIN length
+            bitmap (bytes): Bit value & 7 of byte value >> 3 set when the PIN
+                is strong; any bytes-like object, e.g. from a shared segment
+        """
+        if len(bitmap) != (10 ** length + 7) // 8:
+            raise ValueError(f"A {length}-digit bitmap holds {10 ** length} bits")
+        self.length = length
+        self.bitmap = bitmap
+
+        # Strong PINs before each block
+        self._directory = array("I")
+        count = 0
+        for start in range(0, len(bitmap), BLOCK_BYTES):
+            self._directory.append(count)
+            count += sum(bytes(bitmap[start:start + BLOCK_BYTES]).translate(_BYTE_COUNTS))
+        self.count = count
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self.bitmap[value >> 3] >> (value & 7) & 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def rank(self, value: int) -> int:
+        """Number of strong PINs below value"""
+        byte = value >> 3
+        block = byte // BLOCK_BYTES
+        count = self._directory[block]
+        count += sum(bytes(self.bitmap[block * BLOCK_BYTES:byte]).translate(_BYTE_COUNTS))
+        return count + _BYTE_COUNTS[self.bitmap[byte] & ((1 << (value & 7)) - 1)]
+
+    def select(self, index: int) -> int:
+        """The strong PIN value with index strong PINs below it"""
+        if not 0 <= index < self.count:
+            raise IndexError("strong PIN index out of range")
+        block = bisect.bisect_right(self._directory, index) - 1
+        remaining = index - self._directory[block]
+        byte = block * BLOCK_BYTES
+        while _BYTE_COUNTS[self.bitmap[byte]] <= remaining:
+            remaining -= _BYTE_COUNTS[self.bitmap[byte]]
+            byte += 1
+        bits = self.bitmap[byte]
+        for bit in range(8):
+            if bits >> bit & 1:
+                if not remaining:
+                    return byte * 8 + bit
+                remaining -= 1
+        raise AssertionError("corrupt rank directory")
+
+
+def build_strong_pins(validator, length: int) -> Optional[StrongPins]:
+    """
+    Mark the PINs of a length that none of the validator's detectors flags.
+
+    Detector bits come from the weakness table, which is built first if
+    need be. Returns None for custom detectors beyond IN_MEMORY_LENGTH.
+    """
+    mask = tables.detector_mask(validator)
+    if mask is None:
+        if length > tables.IN_MEMORY_LENGTH:
+            return None
+        strong = (not any(detector(f"{value:0{length}d}") for detector in validator.pattern_detectors)
+                  for value in range(10 ** length))
+    else:
+        table = tables.get_table(validator, length, wait=True)
+        if table is None or (not isinstance(table, tables.WeaknessTable) and not table.covers(mask)):
+            return None
+        if length > tables.IN_MEMORY_LENGTH:
+            try:
+                import numpy as np
+                from mpin_validator import vectorized
+            except ImportError:
+                pass
+            else:
+                masks = vectorized.gather_masks(table, np.arange(10 ** length, dtype=np.int64), mask)
+                return StrongPins(length, np.packbits(masks == 0, bitorder="little").tobytes())
+        strong = (not table.lookup(value) & mask for value in range(10 ** length))
+
+    bitmap = bytearray((10 ** length + 7) // 8)
+    for value, is_strong in enumerate(strong):
+        if is_strong:
+            bitmap[value >> 3] |= 1 << (value & 7)
+    return StrongPins(length, bytes(bitmap))
+
+
+_strong: Dict[Tuple, Optional[StrongPins]] = {}
+_strong_lock = threading.Lock()
+
+
+def get_strong_pins(validator, length: int) -> Optional[StrongPins]:
+    """Return the strong-PIN bitmap for the validator's detector policy, shared or built once per process"""
+    if tables.detector_mask(validator) is None:
+        # Instance-level detectors are not part of the fingerprint
+        return build_strong_pins(validator, length)
+
+    key = (length, tables.policy_fingerprint(validator, length))
+    if key in _strong:
+        return _strong[key]
+    with _strong_lock:
+        if key not in _strong:
+            bitmap = shared.lookup(shared_name(length, key[1]))
+            _strong[key] = StrongPins(length, bitmap) if bitmap is not None else build_strong_pins(validator, length)
+    return _strong[key]
+
+
+def shared_name(length: int, fingerprint: str) -> str:
+    """Name of a length's strong-PIN bitmap in a shared segment"""
+    return f"strong{length}-{fingerprint[:16]}.bitmap"
+
+
+def reset_strong_pins():
+    """Forget built bitmaps, e.g. after the detectors changed"""
+    _strong.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def ring_places(length: int, distance: int) -> Tuple[Tuple[int, ...], ...]:
+    """Place values of the digits changed by each substitution pattern at a Hamming distance"""
+    places = [10 ** (length - 1 - position) for position in range(length)]
+    return tuple(itertools.combinations(places, distance))
+
+
+@functools.lru_cache(maxsize=None)
+def _replacements(distance: int) -> Tuple[Tuple[int, ...], ...]:
+    return tuple(itertools.product(range(10), repeat=distance))
+
+
+def _ring(value: int, length: int, distance: int):
+    """Every PIN value differing from value in exactly distance digits"""
+    for places in ring_places(length, distance):
+        old = [value // place % 10 for place in places]
+        base = value - sum(digit * place for digit, place in zip(old, places))
+        for replacement in _replacements(distance):
+            if all(new != digit for new, digit in zip(replacement, old)):
+                yield base + sum(new * place for new, place in zip(replacement, places))
+
+
+def _excluded(validator, profile=None) -> Set[str]:
+    """The demographic patterns of profile's dates, else of set_demographics"""
+    source = validator if profile is None else profile
+    return set(validator._profile_patterns(source.dob, source.spouse_dob, source.anniversary))
+
+
+def suggest(validator, count: int = 3, near: Optional[str] = None,
+            rng: Optional[random.Random] = None, profile=None) -> List[str]:
+    """
+    Suggest strong PINs for the validator's length and demographics.
+
+    The first call for a length may block while the weakness table is
+    built and the strong-PIN bitmap derived from it (see the module
+    docstring); later calls take microseconds.
+
+    Args:
+        validator: A detailed or 6-digit validator
+        count (int): Number of PINs to return
+        near (str): Return the strong PINs closest to this PIN instead of
+            random ones
+        rng (random.Random): Source of randomness (default: SystemRandom)
+        profile (DemographicProfile): Customer whose patterns to avoid, from
+            make_profile (default: the demographics set with set_demographics)
+
+    Returns:
+        list: Up to count distinct PIN strings
+    """
+    length = getattr(validator, "pin_length", 4)
+    if near is not None and (not isinstance(near, str) or not near.isdigit() or len(near) != length):
+        raise ValueError(f"MPIN must be a {length}-digit string")
+    rng = rng or random.SystemRandom()
+    excluded = _excluded(validator, profile)
+    strong = get_strong_pins(validator, length)
+
+    def is_suggestible(value: int) -> bool:
+        if strong is not None and value not in strong:
+            return False
+        mpin = f"{value:0{length}d}"
+        if mpin in excluded or mpin == near:
+            return False
+        return strong is not None or not validator.is_common_mpin(mpin)
+
+    chosen = []
+    if near is not None:
+        for distance in range(1, length + 1):
+            ring = [value for value in _ring(int(near), length, distance) if is_suggestible(value)]
+            rng.shuffle(ring)
+            chosen += ring[:count - len(chosen)]
+            if len(chosen) == count:
+                break
+        return [f"{value:0{length}d}" for value in chosen]
+
+    # Draw without replacement; give up once the strong PINs run out
+    pool = strong.count if strong is not None else 10 ** length
+    seen = set()
+    while len(chosen) < count and len(seen) < pool:
+        index = rng.randrange(pool)
+        if index in seen:
+            continue
+        seen.add(index)
+        value = strong.select(index) if strong is not None else index
+        if is_suggestible(value):
+            chosen.append(value)
+    return [f"{value:0{length}d}" for value in chosen]
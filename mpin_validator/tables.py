@@ -0,0 +1,1141 @@
+"""
+Precomputed weakness tables for fixed-length MPIN keyspaces.
+
+A 4-digit keyspace has only 10,000 values, so instead of running every
+pattern detector on each check we evaluate all of them once over the
+whole keyspace and keep one bitmask per PIN. Bit ``i`` of a mask is set
+when the detector named ``DETECTOR_NAMES[i]`` flags the PIN.
+
+The 6-digit keyspace is too large to evaluate with the Python detectors
+at startup, so it is stored on disk as one bit plane per detector and
+memory-mapped. Without a file, 5- to 8-digit tables are built on first
+use from the NumPy kernels (the detector rules of ``rules.py``, run by
+``vectorized.py``), in chunks spread over a process pool. 7- and 8-digit
+keyspaces (up to 100M PINs) are kept as zlib-compressed blocks of bit
+planes, written next to the bit-plane files so later processes only map
+them. Files are cached under a
+fingerprint of the validator's detectors and parameters, in a per-user
+cache directory unless MPIN_TABLE_DIR names another; a validator with
+no matching file plans and rebuilds its table on a background thread
+and runs its detectors meanwhile. Bit-plane files tag each plane with a
+hash of its detector's code and parameters, so after a policy change
+only the stale planes are re-evaluated and the rest are copied over.
+Files of policies no process has used for CACHE_MAX_AGE are pruned
+after each build. Tables published to a shared segment (see
+``shared.py``) come first. Build either kind ahead of time, rebuild
+planes incrementally, or prune the cache with::
+
+    python -m mpin_validator.tables build --length 6
+    python -m mpin_validator.tables build --length 8
+    python -m mpin_validator.tables rebuild --length 6
+    python -m mpin_validator.tables prune
+"""
+
+import functools
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from mpin_validator import shared
+
+# Every detector a validator may carry, in bit order
+DETECTOR_NAMES = (
+    "_is_sequential",
+    "_is_repeated_digits",
+    "_is_keyboard_pattern",
+    "_is_palindrome",
+    "_is_all_same_digit",
+    "_is_common_year",
+    "_is_odd_even_pattern",
+    "_is_double_double_pattern",
+    "_is_mirror_pattern",
+    "_is_pin_pattern",
+    "_is_arithmetic_sequence",
+    "_has_low_entropy",
+    "_is_triplet_pattern",
+    "_is_zigzag_pattern",
+)
+
+DETECTOR_BITS = {name: 1 << bit for bit, name in enumerate(DETECTOR_NAMES)}
+
+# Largest keyspace that is evaluated with the Python detectors on first use
+IN_MEMORY_LENGTH = 4
+
+# Longest PIN the table engine supports
+MAX_LENGTH = 8
+
+# Keyspaces at least this long are stored as compressed bitmaps
+COMPRESSED_LENGTH = 7
+
+# PINs per compressed block, and inflated blocks kept per table
+BLOCK_PINS = 1 << 13
+BLOCK_CACHE_SIZE = 1024
+
+# PINs evaluated per build task
+BUILD_CHUNK = 1 << 20
+
+# PINs checked against the Python detectors before an unfingerprinted
+# file or the NumPy kernels are trusted for a validator
+PROBE_COUNT = 256
+
+# Part of every policy fingerprint; bump when the table layout or the
+# way tables are built changes, so cached files are rebuilt
+CACHE_VERSION = 1
+
+# Seconds a fingerprinted cache file may go unused before it is pruned
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Cache files named after a policy fingerprint, here and in guessrank.py
+_FINGERPRINTED = ("weakness*-*.planes", "weakness*-*.bitmap", "guessrank*-*.order")
+
+# Bit-plane file layout: header, plane names, plane tags (from version
+# 2), then page-aligned planes
+PLANES_MAGIC = b"MPINBITS"
+PLANES_VERSION = 2
+_HEADER = struct.Struct("<8sHBBI")
+_NAME = struct.Struct("32s")
+_TAG = struct.Struct("16s")
+_PAGE = 4096
+
+# Compressed bitmap layout: header, plane names, block offsets, blocks
+BITMAP_MAGIC = b"MPINZBMP"
+BITMAP_VERSION = 1
+_BITMAP_HEADER = struct.Struct("<8sHBBII")
+
+
+class WeaknessTable:
+    """
+    Detector bitmasks for every PIN of one length, indexed by int(PIN).
+    """
+
+    def __init__(self, length: int, masks: array):
+        """
+        Args:
+            length (int): PIN length covered by the table
+            masks (array): One unsigned 16-bit mask per PIN
+        """
+        if len(masks) != 10 ** length:
+            raise ValueError(f"Table for {length}-digit PINs needs {10 ** length} entries")
+        self.length = length
+        self.masks = masks
+
+    def lookup(self, index: int) -> int:
+        """Return the detector bitmask of the PIN whose integer value is index"""
+        return self.masks[index]
+
+    def matches(self, index: int, mask: int) -> bool:
+        """Check if any detector in mask flags the PIN"""
+        return bool(self.masks[index] & mask)
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+
+class BitPlaneTable:
+    """
+    Memory-mapped bit planes, one per detector, for every PIN of one length.
+
+    Processes mapping the same file share a single page-cache copy.
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer=None):
+        """
+        Args:
+            path (str): Bit-plane file written by write_bitplanes
+            buffer: The file's contents, e.g. from a shared segment
+        """
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer
+        name = path or "bit planes"
+
+        magic, version, length, plane_count, plane_bytes = _HEADER.unpack_from(self._buffer, 0)
+        if magic != PLANES_MAGIC:
+            raise ValueError(f"{name} is not an MPIN bit-plane file")
+        if version not in (1, PLANES_VERSION):
+            raise ValueError(f"{name} has format version {version}, expected {PLANES_VERSION}")
+        if plane_bytes != _plane_bytes(length):
+            raise ValueError(f"{name} has truncated planes")
+
+        start = _planes_offset(plane_count, version)
+        if len(self._buffer) < start + plane_count * plane_bytes:
+            raise ValueError(f"{name} is truncated")
+
+        self.path = path
+        self.length = length
+        self.names = []
+        # Detector tag each plane was built for; version 1 files have none
+        self.tags = {}
+        self._planes = []
+        tags_at = _HEADER.size + plane_count * _NAME.size
+        for i in range(plane_count):
+            plane_name = _NAME.unpack_from(self._buffer, _HEADER.size + i * _NAME.size)[0]
+            plane_name = plane_name.rstrip(b"\0").decode("ascii")
+            if plane_name not in DETECTOR_BITS:
+                raise ValueError(f"{name} has a plane for unknown detector {plane_name}")
+            self.names.append(plane_name)
+            self._planes.append((start + i * plane_bytes, DETECTOR_BITS[plane_name]))
+            if version >= 2:
+                tag = _TAG.unpack_from(self._buffer, tags_at + i * _TAG.size)[0]
+                if any(tag):
+                    self.tags[plane_name] = tag
+
+    def lookup(self, index: int) -> int:
+        """Return the detector bitmask of the PIN whose integer value is index"""
+        byte, bit = index >> 3, 1 << (index & 7)
+        mask = 0
+        for offset, detector_bit in self._planes:
+            if self._buffer[offset + byte] & bit:
+                mask |= detector_bit
+        return mask
+
+    def matches(self, index: int, mask: int) -> bool:
+        """Check if any detector in mask flags the PIN"""
+        byte, bit = index >> 3, 1 << (index & 7)
+        for offset, detector_bit in self._planes:
+            if detector_bit & mask and self._buffer[offset + byte] & bit:
+                return True
+        return False
+
+    def plane(self, name: str) -> memoryview:
+        """Return the raw bit plane of a detector (bit i of byte i // 8 is PIN i)"""
+        for (offset, _), plane_name in zip(self._planes, self.names):
+            if plane_name == name:
+                return memoryview(self._buffer)[offset:offset + _plane_bytes(self.length)]
+        raise KeyError(name)
+
+    def covers(self, mask: int) -> bool:
+        """Check if the file holds a plane for every detector in mask"""
+        stored = 0
+        for _, detector_bit in self._planes:
+            stored |= detector_bit
+        return mask & ~stored == 0
+
+    def close(self):
+        """Release the mapping"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __len__(self) -> int:
+        return 10 ** self.length
+
+
+class CompressedBitmapTable:
+    """
+    Bit planes for every PIN of one length, compressed in blocks.
+
+    Block b covers PINs b * block_pins up to (b + 1) * block_pins and holds
+    one plane of block_pins bits per detector, one after another, as a
+    single zlib stream. A lookup inflates one block; recently used blocks
+    stay cached, so checks stay O(1) without holding the keyspace in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, buffer=None):
+        """
+        Args:
+            path (str): Bitmap file written by write_bitmap
+            buffer: The file's contents, for a table never written to disk
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Compressed bitmaps are stored little-endian")
+        if buffer is None:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer
+        name = path or "bitmap"
+
+        magic, version, length, plane_count, block_pins, block_count = \
+            _BITMAP_HEADER.unpack_from(buffer, 0)
+        if magic != BITMAP_MAGIC:
+            raise ValueError(f"{name} is not an MPIN compressed bitmap")
+        if version != BITMAP_VERSION:
+            raise ValueError(f"{name} has format version {version}, expected {BITMAP_VERSION}")
+        if block_pins % 8 or block_count != (10 ** length + block_pins - 1) // block_pins:
+            raise ValueError(f"{name} has a bad block layout")
+
+        offsets_at = _BITMAP_HEADER.size + plane_count * _NAME.size
+        self._data_start = offsets_at + 8 * (block_count + 1)
+        if len(buffer) < self._data_start:
+            raise ValueError(f"{name} is truncated")
+        self._offsets = memoryview(buffer)[offsets_at:self._data_start].cast("Q")
+        if len(buffer) < self._data_start + self._offsets[-1]:
+            raise ValueError(f"{name} is truncated")
+
+        self.path = path
+        self.length = length
+        self.block_pins = block_pins
+        self.names = []
+        self._bits = []
+        for i in range(plane_count):
+            plane_name = _NAME.unpack_from(buffer, _BITMAP_HEADER.size + i * _NAME.size)[0]
+            plane_name = plane_name.rstrip(b"\0").decode("ascii")
+            if plane_name not in DETECTOR_BITS:
+                raise ValueError(f"{name} has a plane for unknown detector {plane_name}")
+            self.names.append(plane_name)
+            self._bits.append(DETECTOR_BITS[plane_name])
+        self._block_bytes = block_pins // 8
+        self.block = functools.lru_cache(maxsize=BLOCK_CACHE_SIZE)(self._inflate)
+
+    def _inflate(self, block: int) -> bytes:
+        """The planes of one block, one after another"""
+        start = self._data_start + self._offsets[block]
+        end = self._data_start + self._offsets[block + 1]
+        return zlib.decompress(self._buffer[start:end])
+
+    def lookup(self, index: int) -> int:
+        """Return the detector bitmask of the PIN whose integer value is index"""
+        block, offset = divmod(index, self.block_pins)
+        planes = self.block(block)
+        byte, bit = offset >> 3, 1 << (offset & 7)
+        mask = 0
+        for i, detector_bit in enumerate(self._bits):
+            if planes[i * self._block_bytes + byte] & bit:
+                mask |= detector_bit
+        return mask
+
+    def matches(self, index: int, mask: int) -> bool:
+        """Check if any detector in mask flags the PIN"""
+        return bool(self.lookup(index) & mask)
+
+    def covers(self, mask: int) -> bool:
+        """Check if the table holds a plane for every detector in mask"""
+        stored = 0
+        for detector_bit in self._bits:
+            stored |= detector_bit
+        return mask & ~stored == 0
+
+    def close(self):
+        """Release the mapping"""
+        self.block.cache_clear()
+        self._offsets.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __len__(self) -> int:
+        return 10 ** self.length
+
+
+def _plane_bytes(length: int) -> int:
+    return (10 ** length + 7) // 8
+
+
+def _planes_offset(plane_count: int, version: int = PLANES_VERSION) -> int:
+    header = _HEADER.size + plane_count * (_NAME.size + (_TAG.size if version >= 2 else 0))
+    return (header + _PAGE - 1) // _PAGE * _PAGE
+
+
+def _detector_key(validator) -> Tuple:
+    """Identify the detector implementations a validator's class carries"""
+    cls = type(validator)
+    return tuple(getattr(cls, name, None) for name in DETECTOR_NAMES)
+
+
+def detector_mask(validator) -> Optional[int]:
+    """
+    Combine the bits of the detectors in validator.pattern_detectors.
+
+    Returns:
+        int or None: The mask of active detectors, or None if the pipeline
+        contains a detector the table does not know about
+    """
+    mask = 0
+    for detector in validator.pattern_detectors:
+        name = getattr(detector, "__name__", None)
+        if getattr(detector, "__self__", None) is not validator or name not in DETECTOR_BITS:
+            return None
+        mask |= DETECTOR_BITS[name]
+    return mask
+
+
+def evaluate_detectors(validator, mpin: str) -> int:
+    """Run every known detector of the validator on one PIN and return its bitmask"""
+    mask = 0
+    for name, bit in DETECTOR_BITS.items():
+        detector = getattr(validator, name, None)
+        if detector is not None and detector(mpin):
+            mask |= bit
+    return mask
+
+
+def build_table(validator, length: int) -> WeaknessTable:
+    """
+    Evaluate the validator's detectors over the whole keyspace of a length.
+
+    Args:
+        validator: Any validator exposing the detector methods
+        length (int): PIN length to enumerate
+
+    Returns:
+        WeaknessTable: One bitmask per PIN
+    """
+    masks = array("H", bytes(2 * 10 ** length))
+    for index in range(10 ** length):
+        masks[index] = evaluate_detectors(validator, f"{index:0{length}d}")
+    return WeaknessTable(length, masks)
+
+
+def _class_mask(validator) -> int:
+    """Bits of every known detector the validator's class defines"""
+    cls = type(validator)
+    return sum(bit for name, bit in DETECTOR_BITS.items() if getattr(cls, name, None) is not None)
+
+
+def _stored_mask(table) -> int:
+    """Bits of the detectors a table holds"""
+    return sum(DETECTOR_BITS[name] for name in getattr(table, "names", DETECTOR_NAMES))
+
+
+def probe_values(length: int) -> List[int]:
+    """PIN values a table is checked on: runs, sequences and a fixed random spread"""
+    import random
+
+    values = [int(str(digit) * length) for digit in range(10)]
+    values += [int("".join(str((first + step * i) % 10) for i in range(length)))
+               for first in range(10) for step in (1, 9)]
+    rng = random.Random(length)
+    values += [rng.randrange(10 ** length) for _ in range(PROBE_COUNT - len(values))]
+    return values
+
+
+def _agrees(table, validator, length: int) -> bool:
+    """Check the table's stored detectors against the validator's on the probes"""
+    mask = _class_mask(validator) & _stored_mask(table)
+    return all(table.lookup(value) & mask == evaluate_detectors(validator, f"{value:0{length}d}") & mask
+               for value in probe_values(length))
+
+
+def _probe_kernels(validator, length: int) -> int:
+    """Bits of the class's detectors whose NumPy kernels match the Python detectors on every probe"""
+    try:
+        import numpy as np
+        from mpin_validator import vectorized
+    except ImportError:
+        return 0
+    mask = _class_mask(validator)
+    values = probe_values(length)
+    digits = vectorized.digit_matrix(np.array(values, dtype=np.int64), length)
+    parameters = detector_parameters(validator)
+    try:
+        kernels = vectorized.detector_masks(digits, mask, parameters)
+    except TypeError:
+        # A setting some kernel does not take; leave that kernel out
+        kernels = np.zeros(len(values), dtype=np.uint16)
+        for bit in DETECTOR_BITS.values():
+            if mask & bit:
+                try:
+                    kernels |= vectorized.detector_masks(digits, bit, parameters)
+                except TypeError:
+                    mask &= ~bit
+    differ = 0
+    for value, kernel in zip(values, kernels.tolist()):
+        differ |= kernel ^ evaluate_detectors(validator, f"{value:0{length}d}") & mask
+    return mask & ~differ
+
+
+_kernel_masks: Dict[Tuple, int] = {}
+
+
+def _kernels_agree(validator, length: int, mask: Optional[int] = None) -> bool:
+    """
+    Check that the NumPy kernels reproduce the validator's detectors in mask (default: all) on the probes.
+
+    All detectors are probed together once per policy fingerprint, and
+    each is judged on its own bit, so an overridden detector or setting
+    drops only its own kernel.
+    """
+    key = (length, policy_fingerprint(validator, length))
+    agreed = _kernel_masks.get(key)
+    if agreed is None:
+        agreed = _kernel_masks[key] = _probe_kernels(validator, length)
+    if mask is None:
+        mask = _class_mask(validator)
+    return agreed & mask == mask
+
+
+def kernel_mask(validator, length: int, mask: int) -> int:
+    """Bits of mask whose NumPy kernels reproduce the validator's detectors"""
+    return sum(bit for bit in DETECTOR_BITS.values() if mask & bit and _kernels_agree(validator, length, bit))
+
+
+def _chunk_masks(length: int, mask: int, start: int, stop: int, parameters=None):
+    """Kernel detector masks of the PINs start to stop - 1"""
+    import numpy as np
+    from mpin_validator import vectorized
+
+    values = np.arange(start, stop, dtype=np.int64)
+    return vectorized.detector_masks(vectorized.digit_matrix(values, length), mask, parameters)
+
+
+def _chunk_plane(length: int, mask: int, start: int, stop: int, validator, name: str) -> bytes:
+    """Bit plane of one Python detector over the PINs start to stop - 1 (start a multiple of 8)"""
+    detector = getattr(validator, name)
+    plane = bytearray((stop - start + 7) // 8)
+    for value in range(start, stop):
+        if detector(f"{value:0{length}d}"):
+            offset = value - start
+            plane[offset >> 3] |= 1 << (offset & 7)
+    return bytes(plane)
+
+
+def _chunk_blocks(length: int, mask: int, start: int, stop: int, block_pins: int,
+                  parameters=None) -> List[bytes]:
+    """Compressed bit-plane blocks of the PINs start to stop - 1"""
+    import numpy as np
+
+    masks = _chunk_masks(length, mask, start, stop, parameters)
+    bits = [bit for bit in DETECTOR_BITS.values() if mask & bit]
+    blocks = []
+    for first in range(0, len(masks), block_pins):
+        block = masks[first:first + block_pins]
+        planes = np.zeros((len(bits), block_pins), dtype=bool)
+        for row, bit in enumerate(bits):
+            planes[row, :len(block)] = block & bit != 0
+        blocks.append(zlib.compress(np.packbits(planes, axis=1, bitorder="little").tobytes()))
+    return blocks
+
+
+def _map_chunks(function, length: int, mask: int, workers: Optional[int], *extra) -> list:
+    """
+    Run function(length, mask, start, stop, *extra) over the keyspace in
+    chunks of whole BLOCK_PINS multiples, on a process pool when more
+    than one worker is available. Results come back in keyspace order.
+    """
+    import concurrent.futures
+
+    size = 10 ** length
+    workers = workers or os.cpu_count() or 1
+    chunk = min(BUILD_CHUNK, -(-size // workers))
+    chunk = -(-chunk // BLOCK_PINS) * BLOCK_PINS
+    tasks = [(length, mask, start, min(start + chunk, size), *extra) for start in range(0, size, chunk)]
+    if workers == 1 or len(tasks) == 1:
+        return [function(*task) for task in tasks]
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+        return list(pool.map(function, *zip(*tasks)))
+
+
+def build_table_vectorized(validator, length: int, workers: Optional[int] = None) -> WeaknessTable:
+    """
+    Evaluate the validator's detectors over a keyspace with the NumPy kernels.
+
+    Requires NumPy. The kernels mirror parte's detectors; check a
+    validator with overridden detectors before trusting the result.
+
+    Args:
+        validator: Validator whose class decides the detectors evaluated
+        length (int): PIN length to enumerate
+        workers (int): Build processes (default: one per CPU)
+
+    Returns:
+        WeaknessTable: One bitmask per PIN
+    """
+    masks = array("H")
+    for part in _map_chunks(_chunk_masks, length, _class_mask(validator), workers,
+                            detector_parameters(validator)):
+        masks.frombytes(part.tobytes())
+    return WeaknessTable(length, masks)
+
+
+def build_bitmap(validator, length: int, workers: Optional[int] = None,
+                 block_pins: int = BLOCK_PINS) -> bytes:
+    """
+    Evaluate the validator's detectors over a keyspace into a compressed bitmap.
+
+    Requires NumPy. Each worker compresses its own blocks, so only
+    compressed data crosses process boundaries.
+
+    Args:
+        validator: Validator whose class decides the detectors evaluated
+        length (int): PIN length to enumerate
+        workers (int): Build processes (default: one per CPU)
+        block_pins (int): PINs per compressed block, a multiple of 8
+            dividing BLOCK_PINS
+
+    Returns:
+        bytes: The contents of a CompressedBitmapTable
+    """
+    if block_pins % 8 or BLOCK_PINS % block_pins:
+        raise ValueError("block_pins must be a multiple of 8 dividing BLOCK_PINS")
+    mask = _class_mask(validator)
+    names = [name for name, bit in DETECTOR_BITS.items() if mask & bit]
+    parts = _map_chunks(_chunk_blocks, length, mask, workers, block_pins, detector_parameters(validator))
+    blocks = [block for part in parts for block in part]
+
+    offsets = array("Q", [0])
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+    header = _BITMAP_HEADER.pack(BITMAP_MAGIC, BITMAP_VERSION, length, len(names), block_pins, len(blocks))
+    return b"".join([header, *(_NAME.pack(name.encode("ascii")) for name in names),
+                     offsets.tobytes(), *blocks])
+
+
+def _write_atomic(path: str, parts, prefix: str):
+    """Write parts to a temporary file next to path and move it into place"""
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for part in parts:
+                f.write(part)
+        # Readable by every worker that maps it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_bitplanes(table: WeaknessTable, path: str, names=None, tags=None):
+    """
+    Write a table as one bit plane per detector, replacing path atomically.
+
+    Args:
+        table (WeaknessTable): Table to store
+        path (str): Destination file
+        names (iterable): Detectors to store planes for (default: all)
+        tags (dict): Detector tag of each plane, see detector_tag
+    """
+    names = [name for name in DETECTOR_NAMES if names is None or name in names]
+    plane_bytes = _plane_bytes(table.length)
+    planes = [bytearray(plane_bytes) for _ in names]
+    bits = [DETECTOR_BITS[name] for name in names]
+
+    for index, mask in enumerate(table.masks):
+        if mask:
+            byte, bit = index >> 3, 1 << (index & 7)
+            for plane, detector_bit in zip(planes, bits):
+                if mask & detector_bit:
+                    plane[byte] |= bit
+
+    write_planes(dict(zip(names, planes)), table.length, path, tags)
+
+
+def write_planes(planes: Dict[str, bytes], length: int, path: str, tags=None):
+    """
+    Write raw bit planes, keyed by detector name, replacing path atomically.
+
+    Args:
+        planes (dict): Bit i of byte i // 8 of a plane is PIN i
+        length (int): PIN length
+        path (str): Destination file
+        tags (dict): Detector tag of each plane; planes without one are
+            never reused by rebuild_planes
+    """
+    names = [name for name in DETECTOR_NAMES if name in planes]
+    tags = tags or {}
+    header = _HEADER.pack(PLANES_MAGIC, PLANES_VERSION, length, len(names), _plane_bytes(length))
+    header += b"".join(_NAME.pack(name.encode("ascii")) for name in names)
+    header += b"".join(_TAG.pack(tags.get(name, b"")) for name in names)
+    header += bytes(_planes_offset(len(names)) - len(header))
+    _write_atomic(path, [header, *(planes[name] for name in names)], ".planes-")
+
+
+def write_bitmap(data: bytes, path: str):
+    """Write a compressed bitmap from build_bitmap, replacing path atomically"""
+    _write_atomic(path, [data], ".bitmap-")
+
+
+def table_directory() -> str:
+    """Directory holding table files: MPIN_TABLE_DIR, else the user's cache directory"""
+    directory = os.environ.get("MPIN_TABLE_DIR")
+    if directory:
+        return directory
+    if sys.platform == "win32":
+        cache = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+    elif sys.platform == "darwin":
+        cache = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+    return os.path.join(cache, "mpin_validator")
+
+
+def touch(path: str):
+    """Mark a cache file as used, so prune_cache keeps it"""
+    try:
+        os.utime(path)
+    except OSError:
+        # A read-only deployment is never pruned either
+        pass
+
+
+def prune_cache(max_age: float = CACHE_MAX_AGE) -> List[str]:
+    """
+    Remove fingerprinted cache files that have not been used for max_age seconds.
+
+    Files are marked used whenever a process maps or loads them, so the
+    files of every policy still in use stay while those of superseded
+    detectors or settings age out. Unfingerprinted files are kept.
+
+    Returns:
+        list: Paths removed
+    """
+    import glob
+
+    cutoff = time.time() - max_age
+    removed = []
+    for pattern in _FINGERPRINTED:
+        for path in glob.glob(os.path.join(table_directory(), pattern)):
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+                    removed.append(path)
+            except OSError:
+                # Gone already, or not ours to remove
+                pass
+    return removed
+
+
+def bitplanes_path(length: int) -> str:
+    """Unfingerprinted bit-plane file for a PIN length, as deployed before caching"""
+    return os.path.join(table_directory(), f"weakness{length}.planes")
+
+
+def bitmap_path(length: int) -> str:
+    """Unfingerprinted compressed bitmap file for a PIN length"""
+    return os.path.join(table_directory(), f"weakness{length}.bitmap")
+
+
+def _code_digest(code, digest):
+    """Feed a code object, its constants and nested code into a hash"""
+    digest.update(code.co_code)
+    digest.update(" ".join(code.co_names).encode())
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _code_digest(const, digest)
+        elif isinstance(const, frozenset):
+            # Set order depends on the hash seed
+            digest.update(repr(sorted(map(repr, const))).encode())
+        else:
+            digest.update(repr(const).encode())
+
+
+_tags: Dict[Tuple, Tuple[Dict[str, bytes], str]] = {}
+
+
+def detector_parameters(validator) -> Dict[str, Dict]:
+    """The validator's settings per detector name, or {} if it has none"""
+    parameters = getattr(validator, "detector_parameters", None)
+    return parameters() if parameters is not None else {}
+
+
+def _policy(validator, length: int) -> Tuple[Dict[str, bytes], str]:
+    parameters = detector_parameters(validator)
+    key = (length, _detector_key(validator), repr(sorted(parameters.items())))
+    policy = _tags.get(key)
+    if policy is None:
+        tags = {}
+        for name, detector in zip(DETECTOR_NAMES, key[1]):
+            if detector is not None:
+                digest = hashlib.sha256(f"{CACHE_VERSION}:{length}:{sys.version_info[:2]}:{name}".encode())
+                _code_digest(detector.__code__, digest)
+                digest.update(repr(detector.__defaults__).encode())
+                digest.update(repr(parameters.get(name)).encode())
+                tags[name] = digest.digest()[:_TAG.size]
+        fingerprint = hashlib.sha256(b"".join(name.encode() + tag for name, tag in tags.items()))
+        policy = _tags[key] = (tags, fingerprint.hexdigest())
+    return policy
+
+
+def detector_tags(validator, length: int) -> Dict[str, bytes]:
+    """
+    Tag each detector the validator's class defines, for one PIN length.
+
+    A tag hashes the table layout, the PIN length and Python version, the
+    detector's code and defaults, and its entry of
+    validator.detector_parameters() if it has one. Helpers a detector
+    calls are not hashed; settings they read belong in the parameters.
+
+    Returns:
+        dict: 16-byte tag per detector name
+    """
+    return _policy(validator, length)[0]
+
+
+def policy_fingerprint(validator, length: int) -> str:
+    """
+    Identify the table a validator needs, from the tags of its detectors.
+
+    Returns:
+        str: Hex digest, stable across processes
+    """
+    return _policy(validator, length)[1]
+
+
+def cache_path(length: int, fingerprint: str) -> str:
+    """Cached table file for a PIN length and policy fingerprint"""
+    extension = "bitmap" if length >= COMPRESSED_LENGTH else "planes"
+    return os.path.join(table_directory(), f"weakness{length}-{fingerprint[:16]}.{extension}")
+
+
+def _open(path: str, length: int):
+    """Map a table file of a length's kind, or None if it is missing or unusable"""
+    try:
+        table = CompressedBitmapTable(path) if length >= COMPRESSED_LENGTH else BitPlaneTable(path)
+    except (OSError, ValueError):
+        return None
+    if table.length != length:
+        table.close()
+        return None
+    if length <= IN_MEMORY_LENGTH:
+        # Small enough to unpack into a flat mask array
+        masks = array("H", (table.lookup(index) for index in range(10 ** length)))
+        table.close()
+        return WeaknessTable(length, masks)
+    return table
+
+
+def plan_planes(validator, length: int) -> Optional[Dict[str, object]]:
+    """
+    Decide where each bit plane of the validator's table comes from.
+
+    A plane is copied from any bit-plane file of the length in
+    table_directory() that holds it under the same detector tag. A plane
+    whose detector changed is stale and evaluated with the Python
+    detector, since the kernels only reproduce the original. Planes no
+    file holds come from the NumPy kernels when they reproduce the
+    detector, or from the Python detector up to IN_MEMORY_LENGTH digits.
+
+    Returns:
+        dict or None: Per detector name, the plane bytes to reuse or
+        "python" / "kernel"; None if some plane cannot be built
+    """
+    import glob
+
+    tags = detector_tags(validator, length)
+    stored, seen = {}, set()
+    for path in sorted(glob.glob(os.path.join(table_directory(), f"weakness{length}*.planes"))):
+        try:
+            table = BitPlaneTable(path)
+        except (OSError, ValueError):
+            continue
+        if table.length == length:
+            for name, tag in table.tags.items():
+                seen.add(name)
+                if name in tags and tags[name] == tag and name not in stored:
+                    stored[name] = bytes(table.plane(name))
+        table.close()
+
+    plan = {}
+    for name in tags:
+        if name in stored:
+            plan[name] = stored[name]
+        elif name in seen or length <= IN_MEMORY_LENGTH:
+            plan[name] = "python"
+        elif _kernels_agree(validator, length, DETECTOR_BITS[name]):
+            plan[name] = "kernel"
+        else:
+            return None
+    return plan
+
+
+def rebuild_planes(validator, length: int, path: str, workers: Optional[int] = None,
+                   plan: Optional[Dict[str, object]] = None) -> Optional[Dict[str, List[str]]]:
+    """
+    Write the validator's bit-plane file, evaluating only the planes plan_planes cannot reuse.
+
+    Args:
+        validator: Validator whose class decides the detectors evaluated
+        length (int): PIN length, below COMPRESSED_LENGTH
+        path (str): Destination file, replaced atomically
+        workers (int): Build processes (default: one per CPU)
+        plan (dict): Result of plan_planes, if already computed
+
+    Returns:
+        dict or None: Detector names "reused", "python" and "kernel", or
+        None if some plane cannot be built
+    """
+    plan = plan if plan is not None else plan_planes(validator, length)
+    if plan is None:
+        return None
+    planes = {name: source for name, source in plan.items() if isinstance(source, bytes)}
+
+    kernel = [name for name, source in plan.items() if source == "kernel"]
+    if kernel:
+        import numpy as np
+
+        masks = np.concatenate(_map_chunks(_chunk_masks, length, sum(DETECTOR_BITS[name] for name in kernel),
+                                           workers, detector_parameters(validator)))
+        for name in kernel:
+            planes[name] = np.packbits(masks & DETECTOR_BITS[name] != 0, bitorder="little").tobytes()
+
+    python = [name for name, source in plan.items() if source == "python"]
+    if python:
+        import pickle
+
+        try:
+            pickle.dumps(validator)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # Classes defined in a function cannot reach worker processes
+            workers = 1
+        for name in python:
+            planes[name] = b"".join(_map_chunks(_chunk_plane, length, DETECTOR_BITS[name], workers,
+                                                validator, name))
+
+    write_planes(planes, length, path, detector_tags(validator, length))
+    return {
+        "reused": [name for name, source in plan.items() if isinstance(source, bytes)],
+        "python": python,
+        "kernel": kernel,
+    }
+
+
+def build_cached(validator, length: int, path: str):
+    """
+    Build a table and save it for later processes, replacing path atomically.
+
+    Bit-plane lengths are rebuilt incrementally with rebuild_planes; when
+    path cannot be written the table is built in memory instead.
+
+    Returns:
+        WeaknessTable, BitPlaneTable or CompressedBitmapTable
+
+    Raises:
+        ValueError: If no table can be built for the validator's detectors
+    """
+    if length >= COMPRESSED_LENGTH:
+        if not _kernels_agree(validator, length):
+            raise ValueError(f"No {length}-digit table can be built for these detectors")
+        data = build_bitmap(validator, length)
+        try:
+            write_bitmap(data, path)
+            return CompressedBitmapTable(path)
+        except (OSError, ValueError):
+            return CompressedBitmapTable(buffer=data)
+
+    plan = plan_planes(validator, length)
+    if plan is None:
+        raise ValueError(f"No {length}-digit table can be built for these detectors")
+    try:
+        rebuild_planes(validator, length, path, plan=plan)
+        table = _open(path, length)
+        if table is not None:
+            return table
+    except OSError:
+        pass
+    if length <= IN_MEMORY_LENGTH:
+        return build_table(validator, length)
+    if "python" in plan.values() or not _kernels_agree(validator, length):
+        raise ValueError(f"Changed detectors need a writable table directory for {length}-digit tables")
+    return build_table_vectorized(validator, length)
+
+
+class _Build:
+    """A table being planned and built on a background thread"""
+
+    def __init__(self, validator, length: int, path: str):
+        self.table = None
+        self.error = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(validator, length, path),
+                                       name=f"mpin-table-{length}", daemon=True)
+        self.thread.start()
+
+    def _run(self, validator, length: int, path: str):
+        try:
+            self.table = build_cached(validator, length, path)
+        except Exception as e:
+            # Leave the validator on its detector loop
+            self.error = e
+        else:
+            prune_cache()
+        finally:
+            self.done.set()
+
+
+_tables: Dict[Tuple, object] = {}
+
+# Serialises lookups of the cache so each table is built once per process
+_build_lock = threading.Lock()
+
+
+def get_table(validator, length: int, wait: bool = False):
+    """
+    Return the weakness table for the validator's detectors.
+
+    Tables are cached in table_directory() under the validator's policy
+    fingerprint. When no cached file matches, an unfingerprinted file from
+    before caching is used if it agrees with the validator on the probe
+    PINs; otherwise the table is planned, rebuilt and written atomically
+    on a background thread, and None is returned right away and until it
+    is ready so callers keep serving the slow path. Keyspaces longer than
+    IN_MEMORY_LENGTH are only built with NumPy kernels that reproduce the
+    detectors; when they do not, the build fails and None is returned
+    from then on.
+
+    Args:
+        validator: Validator whose detectors the table holds
+        length (int): PIN length
+        wait (bool): Block until a background build finishes
+
+    Returns:
+        WeaknessTable, BitPlaneTable, CompressedBitmapTable or None
+    """
+    key = (length, policy_fingerprint(validator, length))
+    entry = _tables.get(key, _build_lock)
+    if entry is _build_lock:
+        with _build_lock:
+            entry = _tables.get(key, _build_lock)
+            if entry is _build_lock:
+                entry = _tables[key] = _open_or_build(validator, length, key[1])
+
+    if isinstance(entry, _Build):
+        if wait:
+            entry.done.wait()
+        if not entry.done.is_set():
+            return None
+        entry = _tables[key] = entry.table
+    return entry
+
+
+def building(validator, length: int) -> bool:
+    """Check if the validator's table is still being built in the background"""
+    entry = _tables.get((length, policy_fingerprint(validator, length)))
+    return isinstance(entry, _Build) and not entry.done.is_set()
+
+
+def wait_for_builds(timeout: Optional[float] = None) -> bool:
+    """
+    Block until every background build of this process has finished.
+
+    Returns:
+        bool: False if the timeout expired first
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for entry in list(_tables.values()):
+        if isinstance(entry, _Build):
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not entry.done.wait(remaining):
+                return False
+    return True
+
+
+def reset_tables():
+    """Forget resolved tables, e.g. after a new MPIN_TABLE_DIR; running builds finish unseen"""
+    _tables.clear()
+
+
+def _forget_builds():
+    # Build threads do not survive fork; let the child resolve again
+    for key, entry in list(_tables.items()):
+        if isinstance(entry, _Build) and not entry.done.is_set():
+            del _tables[key]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_builds)
+
+
+def shared_name(length: int, fingerprint: str) -> str:
+    """Name of a length's table in a shared segment"""
+    if length <= IN_MEMORY_LENGTH:
+        return f"weakness{length}-{fingerprint[:16]}.masks"
+    return os.path.basename(cache_path(length, fingerprint))
+
+
+def _open_shared(length: int, fingerprint: str):
+    """The table published in the attached shared segment, or None"""
+    buffer = shared.lookup(shared_name(length, fingerprint))
+    if buffer is None:
+        return None
+    if length <= IN_MEMORY_LENGTH:
+        return WeaknessTable(length, buffer.cast("H"))
+    return CompressedBitmapTable(buffer=buffer) if length >= COMPRESSED_LENGTH else BitPlaneTable(buffer=buffer)
+
+
+def _open_or_build(validator, length: int, fingerprint: str):
+    if length > MAX_LENGTH:
+        return None
+    table = _open_shared(length, fingerprint)
+    if table is not None:
+        return table
+    path = cache_path(length, fingerprint)
+    table = _open(path, length)
+    if table is not None:
+        touch(path)
+        return table
+
+    legacy = _open(bitmap_path(length) if length >= COMPRESSED_LENGTH else bitplanes_path(length), length)
+    if legacy is not None:
+        if _agrees(legacy, validator, length):
+            return legacy
+        if hasattr(legacy, "close"):
+            legacy.close()
+    return _Build(validator, length, path)
+
+
+def main(argv=None):
+    """Command line entry point for rebuilding table files"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build precomputed MPIN weakness tables")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Evaluate all detectors and write a table file")
+    build.add_argument("--length", type=int, default=6, choices=range(IN_MEMORY_LENGTH, MAX_LENGTH + 1))
+    rebuild = commands.add_parser("rebuild", help="Re-evaluate only the planes whose detectors changed")
+    rebuild.add_argument("--length", type=int, default=6, choices=range(IN_MEMORY_LENGTH, COMPRESSED_LENGTH))
+    for command in (build, rebuild):
+        command.add_argument("--workers", type=int, default=None,
+                             help="Build processes (default: one per CPU)")
+        command.add_argument("--output", help="Destination file (default: the cache file for the policy)",
+                             default=None)
+    prune = commands.add_parser("prune", help="Remove cached tables no process has used lately")
+    prune.add_argument("--max-age-days", type=float, default=CACHE_MAX_AGE / 86400,
+                       help="Keep files used within this many days (default: %(default)g)")
+    args = parser.parse_args(argv)
+
+    if args.command == "prune":
+        removed = prune_cache(args.max_age_days * 86400)
+        print(f"Removed {len(removed)} cached files from {table_directory()}", file=sys.stderr)
+        return
+
+    # The validators import this module, so load them only when building
+    from mpin_validator import validators
+
+    if args.length == IN_MEMORY_LENGTH:
+        validator = validators.MPINValidator()
+    else:
+        validator = validators.SixDigitMPINValidator(pin_length=args.length)
+
+    output = args.output or cache_path(args.length, policy_fingerprint(validator, args.length))
+    started = time.perf_counter()
+    if args.command == "rebuild":
+        report = rebuild_planes(validator, args.length, output, args.workers)
+        if report is None:
+            parser.error("the NumPy kernels are needed for planes no table file holds")
+        elapsed = time.perf_counter() - started
+        print(f"Reused {len(report['reused'])} planes, evaluated {len(report['kernel'])} with NumPy and "
+              f"{len(report['python'])} with Python ({', '.join(report['python']) or 'none'}); "
+              f"wrote {output} in {elapsed:.1f}s", file=sys.stderr)
+        return
+
+    if args.length >= COMPRESSED_LENGTH:
+        data = build_bitmap(validator, args.length, args.workers)
+        write_bitmap(data, output)
+        names = CompressedBitmapTable(buffer=data).names
+        size = f" ({len(data) / 2 ** 20:.1f} MiB)"
+    else:
+        if args.length > IN_MEMORY_LENGTH:
+            table = build_table_vectorized(validator, args.length, args.workers)
+        else:
+            table = build_table(validator, args.length)
+        names = [detector.__name__ for detector in validator.pattern_detectors]
+        write_bitplanes(table, output, names, detector_tags(validator, args.length))
+        size = ""
+    elapsed = time.perf_counter() - started
+
+    print(f"Wrote {len(names)} planes for {10 ** args.length} PINs to {output}{size} in {elapsed:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
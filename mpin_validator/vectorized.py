@@ -0,0 +1,253 @@
+"""
+NumPy batch evaluation of the pattern detectors in ``validators.py``.
+
+The detectors are evaluated from their rules in ``rules.py``
+(DETECTOR_RULES), compiled to array passes over a digit matrix (one row
+per PIN, one column per digit) that match the Python detectors row for
+row. They work for any PIN length, so whole batches or whole keyspaces
+are evaluated in a handful of array passes.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from mpin_validator import reasons, tables
+
+
+# Rows evaluated per pass, bounding the size of temporaries
+CHUNK_SIZE = 1 << 20
+
+
+def digit_matrix(values: np.ndarray, length: int) -> np.ndarray:
+    """Split integer PIN values into a (N, length) uint8 digit matrix"""
+    powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+    return (np.asarray(values, dtype=np.int64)[:, None] // powers % 10).astype(np.uint8)
+
+
+def digit_values(digits: np.ndarray) -> np.ndarray:
+    """Join a digit matrix back into integer PIN values"""
+    length = digits.shape[1]
+    powers = 10 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+    return digits.astype(np.int64) @ powers
+
+
+def detector_masks(digits: np.ndarray, mask: Optional[int] = None,
+                   parameters: Optional[Dict[str, Dict]] = None) -> np.ndarray:
+    """
+    Evaluate detectors over a digit matrix.
+
+    Args:
+        digits (np.ndarray): (N, length) digit matrix
+        mask (int): Detector bits to evaluate (default: all)
+        parameters (dict): Keyword settings per detector name, as from a
+            validator's detector_parameters() (default: the stock ones)
+
+    Returns:
+        np.ndarray: uint16 detector bitmask per row, as in tables.DETECTOR_BITS
+
+    Raises:
+        TypeError: If a detector is given a setting its rule does not read
+    """
+    # rules.py builds on this module's digit helpers
+    from mpin_validator import rules
+
+    return rules.detector_policy().evaluate(digits, mask, parameters).astype(np.uint16)
+
+
+def parse_mpins(mpins: Union[Sequence[str], np.ndarray],
+                lengths: Union[int, Sequence[int], None] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalise a batch of PINs to integer values and lengths.
+
+    Args:
+        mpins: A sequence of digit strings, a (N, length) uint8 digit
+            matrix, or a 1-D integer array of PIN values
+        lengths: PIN length(s) for an integer array, which cannot carry
+            leading zeros
+
+    Returns:
+        tuple: (values, lengths) as int64 arrays
+    """
+    if isinstance(mpins, np.ndarray) and mpins.dtype.kind in "iu":
+        if mpins.ndim == 2:
+            if mpins.size and mpins.max() > 9:
+                raise ValueError("Digit matrix entries must be between 0 and 9")
+            values = digit_values(mpins)
+            return values, np.full(len(values), mpins.shape[1], dtype=np.int64)
+        if lengths is None:
+            raise ValueError("Integer PIN arrays need their lengths")
+        values = mpins.astype(np.int64)
+        lengths = np.broadcast_to(np.asarray(lengths, dtype=np.int64), values.shape).copy()
+        if ((values < 0) | (values >= 10 ** lengths)).any():
+            raise ValueError("PIN value does not fit its length")
+        return values, lengths
+
+    # Like check_mpin, take only strings: other objects in a list or an
+    # object array are not converted
+    if isinstance(mpins, np.ndarray):
+        strings = mpins.dtype.kind == "U" or all(isinstance(mpin, str) for mpin in mpins.ravel().tolist())
+    else:
+        strings = all(isinstance(mpin, str) for mpin in mpins)
+    if not strings:
+        raise ValueError("MPIN must be a digit string")
+    text = np.asarray(mpins, dtype=str)
+    if text.ndim != 1:
+        raise ValueError("MPINs must be a flat sequence of digit strings")
+
+    # Fixed-width UTF-32 view: one code point per column, NUL padded
+    width = max(text.dtype.itemsize // 4, 1)
+    codes = np.zeros((len(text), width), dtype=np.uint32)
+    if len(text) and text.dtype.itemsize:
+        codes = text.view(np.uint32).reshape(len(text), width)
+    lengths = (codes != 0).sum(axis=1).astype(np.int64)
+    used = np.arange(width) < lengths[:, None]
+    digits = codes.astype(np.int64) - ord("0")
+    if (used & ((digits < 0) | (digits > 9))).any() or (~used & (codes != 0)).any():
+        raise ValueError("MPIN must be a digit string")
+
+    exponents = np.maximum(lengths[:, None] - 1 - np.arange(width), 0)
+    values = np.where(used, digits * 10 ** exponents, 0).sum(axis=1)
+    return values, lengths
+
+
+def _demographic_reasons(values: np.ndarray, length: int, profile) -> np.ndarray:
+    """Demographic reason bits of PIN values of one length against a DemographicProfile"""
+    result = np.zeros(len(values), dtype=np.uint8)
+    if profile is None:
+        return result
+    known = [(int(mpin), bit) for mpin, bit in profile.items() if len(mpin) == length]
+    if known:
+        pins, bits = np.array(known, dtype=np.int64).T
+        order = np.argsort(pins)
+        pins, bits = pins[order], bits[order]
+        rows = np.minimum(np.searchsorted(pins, values), len(pins) - 1)
+        result[:] = np.where(pins[rows] == values, bits[rows], 0)
+    return result
+
+
+def gather_masks(table, values: np.ndarray, mask: int) -> np.ndarray:
+    """
+    Read the detector bits in mask for many PINs from a precomputed table.
+
+    Returns:
+        np.ndarray: uint16 detector bitmask per value
+    """
+    if isinstance(table, tables.WeaknessTable):
+        return np.frombuffer(table.masks, dtype=np.uint16)[values] & np.uint16(mask)
+
+    result = np.zeros(len(values), dtype=np.uint16)
+    if isinstance(table, tables.CompressedBitmapTable):
+        # Inflate each block once and read all of its PINs
+        blocks, offsets = np.divmod(values, table.block_pins)
+        order = np.argsort(blocks, kind="stable")
+        starts = np.flatnonzero(np.diff(blocks[order], prepend=-1))
+        for rows in np.split(order, starts[1:]):
+            if not len(rows):
+                continue
+            planes = np.frombuffer(table.block(int(blocks[rows[0]])), dtype=np.uint8)
+            planes = planes.reshape(len(table.names), -1)
+            byte, shift = offsets[rows] >> 3, (offsets[rows] & 7).astype(np.uint8)
+            for plane, name in zip(planes, table.names):
+                bit = tables.DETECTOR_BITS[name]
+                if mask & bit:
+                    result[rows[(plane[byte] >> shift) & 1 == 1]] |= bit
+        return result
+
+    byte, shift = values >> 3, (values & 7).astype(np.uint8)
+    for name in table.names:
+        bit = tables.DETECTOR_BITS[name]
+        if mask & bit:
+            plane = np.frombuffer(table.plane(name), dtype=np.uint8)
+            result[(plane[byte] >> shift) & 1 == 1] |= bit
+    return result
+
+
+def common_flags(values: np.ndarray, length: int, validator) -> np.ndarray:
+    """
+    Evaluate a validator's pattern detectors over PIN values of one length.
+
+    Precomputed tables are gathered when available; otherwise the kernels
+    run over the digit matrix for the detectors they reproduce, and the
+    Python detectors over the PINs those leave unflagged.
+
+    Returns:
+        np.ndarray: bool array, True where is_common_mpin would be True
+    """
+    mask = tables.detector_mask(validator)
+    table = tables.get_table(validator, length) if mask is not None else None
+    if table is not None and not isinstance(table, tables.WeaknessTable) and not table.covers(mask):
+        table = None
+    if mask is not None and table is None:
+        kernels = tables.kernel_mask(validator, length, mask)
+        parameters = tables.detector_parameters(validator)
+        python = [getattr(validator, name) for name, bit in tables.DETECTOR_BITS.items()
+                  if mask & bit and not kernels & bit]
+
+    common = np.zeros(len(values), dtype=bool)
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        if mask is None:
+            # Custom detectors have no kernel; run the validator itself
+            common[start:start + len(chunk)] = [
+                validator.is_common_mpin(f"{value:0{length}d}") for value in chunk.tolist()]
+        elif table is not None:
+            common[start:start + len(chunk)] = gather_masks(table, chunk, mask) != 0
+        else:
+            flags = detector_masks(digit_matrix(chunk, length), kernels, parameters) != 0 if kernels else \
+                np.zeros(len(chunk), dtype=bool)
+            if python:
+                for row in np.flatnonzero(~flags).tolist():
+                    mpin = f"{int(chunk[row]):0{length}d}"
+                    flags[row] = any(detector(mpin) for detector in python)
+            common[start:start + len(chunk)] = flags
+    return common
+
+
+def check_group(values: np.ndarray, length: int, validator, profile=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Check PIN values of one length against a detailed validator.
+
+    Args:
+        profile (DemographicProfile): Demographic patterns to match
+            (default: those of the validator's set_demographics)
+
+    Returns:
+        tuple: (is_weak bool array, reasons uint8 bitmask array)
+    """
+    common = common_flags(values, length, validator)
+    demographic = _demographic_reasons(values, length, validator.profile if profile is None else profile)
+    result = np.where(demographic != 0, demographic,
+                      np.where(common, reasons.COMMONLY_USED, 0)).astype(np.uint8)
+    return result != 0, result
+
+
+def check_batch(mpins, lengths, validator, profile=None) -> Dict[str, np.ndarray]:
+    """
+    Check a batch of PINs of mixed lengths.
+
+    Args:
+        mpins: PINs in any form accepted by parse_mpins
+        lengths: Lengths for an integer PIN array
+        validator (UniversalMPINValidator): Validator whose per-length
+            validators check each PIN
+        profile (DemographicProfile): From make_profile (default: each
+            validator's set_demographics)
+
+    Returns:
+        dict: Columnar results, "is_weak" (bool array) and "reasons"
+        (uint8 reason bitmask array)
+    """
+    values, lengths = parse_mpins(mpins, lengths)
+    validators = validator.validators
+    if not np.isin(lengths, np.array(sorted(validators), dtype=np.int64)).all():
+        raise ValueError(validator.length_error)
+
+    is_weak = np.zeros(len(values), dtype=bool)
+    reason_bits = np.zeros(len(values), dtype=np.uint8)
+    for length, checker in validators.items():
+        rows = np.flatnonzero(lengths == length)
+        if len(rows):
+            is_weak[rows], reason_bits[rows] = check_group(values[rows], length, checker, profile)
+
+    return {"is_weak": is_weak, "reasons": reason_bits}
@@ -9,7 +9,8 @@ Original file is located at
 
 import datetime
 from typing import List, Dict, Union, Set
-import math
+
+from mpin_validator import datelike, entropy
 
 
 def print_onebanc_banner():
@@ -38,6 +39,9 @@ class MPINValidator:
     Uses only logical pattern detection techniques without predefined lists.
     """
 
+    # PINs of six or more digits scoring below this are weak
+    ENTROPY_THRESHOLD = 2.0
+
     def __init__(self, pin_length=6):
         """Initialize the MPIN validator with pattern detection methods"""
         self.pin_length = pin_length
@@ -57,6 +61,47 @@ class MPINValidator:
             self._has_digit_pairs
         ]
 
+        # Per-detector counters or adaptive ordering, only when enabled
+        self._instrumentation = None
+
+    def enable_instrumentation(self, instrumentation=None):
+        """
+        Record per-detector calls, hits, first hits and time.
+
+        Args:
+            instrumentation (DetectorInstrumentation): Counters to record
+                into (default: new)
+
+        Returns:
+            DetectorInstrumentation: The counters; poll its snapshot()
+        """
+        if instrumentation is None:
+            from mpin_validator.instrumentation import DetectorInstrumentation
+            instrumentation = DetectorInstrumentation()
+        self._instrumentation = instrumentation
+        return instrumentation
+
+    def disable_instrumentation(self):
+        """Stop recording detector counters"""
+        self._instrumentation = None
+
+    def enable_adaptive_ordering(self, sample_every: int = 100, reorder_after: int = 1000):
+        """
+        Reorder pattern_detectors from sampled hit rates and costs.
+
+        Takes the place of any instrumentation; verdicts are unchanged.
+
+        Args:
+            sample_every (int): Time every detector on one PIN in this many
+            reorder_after (int): Sampled PINs between reorders
+
+        Returns:
+            AdaptiveDetectorOrder: The sampler; call fit() to train it offline
+        """
+        from mpin_validator.ordering import AdaptiveDetectorOrder
+        self._instrumentation = AdaptiveDetectorOrder(self, sample_every, reorder_after)
+        return self._instrumentation
+
     def _is_sequential(self, mpin: str) -> bool:
         """
         Check if MPIN has sequential digits (ascending or descending).
@@ -125,7 +170,7 @@ class MPINValidator:
                     year_part = mpin[:4]  # Get the year part
                     try:
                         year = int(year_part)
-                        current_year = datetime.datetime.now().year
+                        current_year = datelike.current_year()
                         if 1930 <= year <= current_year:
                             return True
                     except ValueError:
@@ -138,7 +183,7 @@ class MPINValidator:
                     year_part = mpin[-4:]  # Get the year part
                     try:
                         year = int(year_part)
-                        current_year = datetime.datetime.now().year
+                        current_year = datelike.current_year()
                         if 1930 <= year <= current_year:
                             return True
                     except ValueError:
@@ -240,30 +285,9 @@ class MPINValidator:
         Calculate Shannon entropy of the MPIN to measure randomness.
         Higher entropy indicates more randomness/strength.
         """
-        # Count frequency of each digit
-        freq = {}
-        for digit in mpin:
-            freq[digit] = freq.get(digit, 0) + 1
-
-        # Calculate Shannon entropy
-        length = len(mpin)
-        entropy = 0.0
-
-        for count in freq.values():
-            probability = count / length
-            entropy -= probability * math.log2(probability)
-
-        # Calculate digit position entropy (transitions between digits)
-        position_entropy = 0
-        for i in range(len(mpin) - 1):
-            if mpin[i] != mpin[i+1]:
-                position_entropy += 1
-        position_entropy = position_entropy / (len(mpin) - 1)  # Normalize
-
-        # Combined score weighted toward unpredictability
-        combined_entropy = (0.7 * entropy) + (0.3 * position_entropy)
-
-        return combined_entropy
+        # The score only depends on the digit counts and transitions, so it
+        # is read from a quantised table of the whole keyspace
+        return entropy.score(mpin)
 
     def is_weak_mpin(self, mpin: str) -> bool:
         """
@@ -280,15 +304,18 @@ class MPINValidator:
             raise ValueError(f"MPIN must be a {self.pin_length}-digit string")
 
         # Run through pattern detectors
-        for detector in self.pattern_detectors:
-            if detector(mpin):
+        if self._instrumentation is not None:
+            if self._instrumentation.run(self.pattern_detectors, mpin):
                 return True
+        else:
+            for detector in self.pattern_detectors:
+                if detector(mpin):
+                    return True
 
         # For 6-digit PINs, also check entropy
         if len(mpin) >= 6:
             # For longer pins, we expect higher entropy
-            entropy_threshold = 2.0
-            if self._calculate_entropy(mpin) < entropy_threshold:
+            if self._calculate_entropy(mpin) < self.ENTROPY_THRESHOLD:
                 return True
 
         return False
@@ -534,7 +561,7 @@ class DetailedMPINValidator(EnhancedMPINValidator):
             result["entropy_score"] = round(entropy_score, 2)
 
             # Only add low entropy reason if it's not already weak
-            if entropy_score < 2.0 and not result["reasons"]:
+            if entropy_score < self.ENTROPY_THRESHOLD and not result["reasons"]:
                 result["strength"] = "WEAK"
                 result["reasons"].append("COMMONLY_USED")  # Using standard reason code
 
@@ -577,23 +604,10 @@ class SixDigitMPINValidator(DetailedMPINValidator):
         without using predefined lists
         """
         if len(mpin) == 6:
-            # Try various date combinations
-            potential_dates = [
-                mpin[:2] + "-" + mpin[2:4] + "-" + "20" + mpin[4:],  # DDMMYY
-                mpin[2:4] + "-" + mpin[:2] + "-" + "20" + mpin[4:],  # MMDDYY
-                "20" + mpin[:2] + "-" + mpin[2:4] + "-" + mpin[4:],  # YYMMDD
-            ]
-
-            for date_str in potential_dates:
-                try:
-                    date = datetime.datetime.strptime(date_str, "%d-%m-%Y")
-                    current_year = datetime.datetime.now().year
-                    # Check if date is within a reasonable range
-                    if 1930 <= date.year <= current_year + 5:
-                        return True
-                except ValueError:
-                    # Invalid date, try next pattern
-                    continue
+            # DDMMYY or MMDDYY read as 20YY, from 1930 to five years ahead.
+            # (A YYMMDD form built as "20YY-MM-DD" never parsed as %d-%m-%Y.)
+            table = datelike.validity_table(("DDMMYY", "MMDDYY"), 1930, datelike.current_year() + 5)
+            return bool(table[int(mpin)])
         return False
 
     def _has_repeating_sequence(self, mpin: str) -> bool:
@@ -628,14 +642,8 @@ class SixDigitMPINValidator(DetailedMPINValidator):
         if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != 6:
             raise ValueError("MPIN must be a 6-digit string")
 
-        # Get basic result from parent class
-        result = super().check_mpin(mpin)
-
-        # Add entropy score
-        entropy_score = self._calculate_entropy(mpin)
-        result["entropy_score"] = round(entropy_score, 2)
-
-        return result
+        # Get basic result from parent class, which attaches the entropy score
+        return super().check_mpin(mpin)
 
 
 def main():
@@ -7,9 +7,25 @@ Original file is located at
     https://colab.research.google.com/drive/1WD3Fh4vOFHGoeKKtqMTrYQcy_TtO0oMM
 """
 
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
 import unittest
-import re
-from typing import List, Dict, Union, Set, Callable, Any
+from unittest import mock
+
+from mpin_validator import datelike, dates, reasons, tables
+from mpin_validator.validators import (
+    DATE_TABLE_KINDS,
+    DetailedMPINValidator,
+    EnhancedMPINValidator,
+    MPINValidator,
+    SixDigitMPINValidator,
+    UniversalMPINValidator,
+)
 
 
 def print_onebanc_banner():
@@ -32,761 +48,35 @@ def print_onebanc_banner():
     print(banner)
 
 
-# Part A: Basic MPIN Validator using pattern detection logic
-class MPINValidator:
-    """
-    Class to validate if a 4-digit MPIN is commonly used or not.
-    Uses multiple strategies to identify common patterns.
-    """
-
-    def __init__(self):
-        """Initialize the validator with pattern detection functions"""
-        # Define pattern detectors
-        self.pattern_detectors = [
-            self._is_sequential,
-            self._is_repeated_digits,
-            self._is_keyboard_pattern,
-            self._is_palindrome,
-            self._is_all_same_digit,
-            self._is_common_year,
-            self._is_odd_even_pattern,
-            self._is_double_double_pattern,
-            self._is_mirror_pattern,
-            self._is_pin_pattern
-        ]
-
-    def _is_sequential(self, mpin: str) -> bool:
-        """Check if MPIN has sequential digits (ascending or descending)"""
-        digits = [int(d) for d in mpin]
-
-        # Check for ascending sequence
-        asc_diff = [digits[i+1] - digits[i] for i in range(len(digits)-1)]
-        if all(diff == 1 for diff in asc_diff):
-            return True
-
-        # Check for descending sequence
-        desc_diff = [digits[i] - digits[i+1] for i in range(len(digits)-1)]
-        if all(diff == 1 for diff in desc_diff):
-            return True
-
-        return False
-
-    def _is_repeated_digits(self, mpin: str) -> bool:
-        """Check if MPIN has a repeating pattern"""
-        # Count digit frequencies
-        counts = {}
-        for digit in mpin:
-            counts[digit] = counts.get(digit, 0) + 1
-
-        # If there are only one or two unique digits, it's a repetition pattern
-        if len(counts) <= 2:
-            # For patterns like AABB, ensure the digits actually repeat
-            if len(counts) == 2:
-                # If any digit appears only once, it's not a repeating pattern
-                if min(counts.values()) < 2:
-                    return False
-            return True
-
-        # Check for patterns like ABAB
-        half_len = len(mpin) // 2
-        if len(mpin) % 2 == 0 and mpin[:half_len] == mpin[half_len:]:
-            return True
-
-        return False
-
-    def _is_keyboard_pattern(self, mpin: str) -> bool:
-        """Check if MPIN follows a keyboard pattern"""
-        # Phone keypad patterns
-        keypad = {
-            '1': ['2', '4'],
-            '2': ['1', '3', '5'],
-            '3': ['2', '6'],
-            '4': ['1', '5', '7'],
-            '5': ['2', '4', '6', '8'],
-            '6': ['3', '5', '9'],
-            '7': ['4', '8'],
-            '8': ['5', '7', '9', '0'],
-            '9': ['6', '8'],
-            '0': ['8']
-        }
-
-        # ATM pattern detection - vertical, horizontal, diagonal patterns
-        atm_patterns = [
-            ['1', '2', '3'],
-            ['4', '5', '6'],
-            ['7', '8', '9'],
-            ['1', '4', '7'],
-            ['2', '5', '8'],
-            ['3', '6', '9'],
-            ['1', '5', '9'],
-            ['3', '5', '7']
-        ]
-
-        # Check for adjacent digits on keypad
-        adjacent_count = 0
-        for i in range(len(mpin) - 1):
-            if mpin[i+1] in keypad[mpin[i]]:
-                adjacent_count += 1
-
-        # If most digits are adjacent, it's a keypad pattern
-        if adjacent_count >= len(mpin) - 2:
-            return True
-
-        # Check for ATM patterns
-        for pattern in atm_patterns:
-            # If the PIN contains a full ATM pattern, it's weak
-            if all(digit in mpin for digit in pattern):
-                consecutive_count = 0
-                for i in range(len(pattern) - 1):
-                    if pattern[i] in mpin and pattern[i+1] in mpin:
-                        idx1 = mpin.index(pattern[i])
-                        idx2 = mpin.index(pattern[i+1])
-                        if abs(idx1 - idx2) == 1:
-                            consecutive_count += 1
-                if consecutive_count >= len(pattern) - 2:
-                    return True
-
-        return False
-
-    def _is_palindrome(self, mpin: str) -> bool:
-        """Check if MPIN is a palindrome"""
-        return mpin == mpin[::-1]
-
-    def _is_all_same_digit(self, mpin: str) -> bool:
-        """Check if all digits in MPIN are the same"""
-        return len(set(mpin)) == 1
-
-    def _is_common_year(self, mpin: str) -> bool:
-        """Check if MPIN could represent a common year (19xx or 20xx)"""
-        # Years as 4-digit numbers
-        if len(mpin) == 4:
-            if mpin.startswith('19') or mpin.startswith('20'):
-                try:
-                    year = int(mpin)
-                    current_year = 2025  # Using assignment context year
-                    if 1930 <= year <= current_year:
-                        return True
-                except ValueError:
-                    pass
-
-        # For 4-digit pins, check if it's a 2-digit year at start or end
-        if len(mpin) == 4:
-            year_patterns = [mpin[:2], mpin[2:]]
-            for yp in year_patterns:
-                try:
-                    year = int(yp)
-                    if 0 <= year <= 99:
-                        return True
-                except ValueError:
-                    pass
-
-        return False
-
-    def _is_odd_even_pattern(self, mpin: str) -> bool:
-        """Check if MPIN consists of all odd or all even digits, or an alternating pattern"""
-        digits = [int(d) for d in mpin]
-
-        # Check for all odd digits
-        if all(d % 2 == 1 for d in digits):
-            return True
-
-        # Check for all even digits
-        if all(d % 2 == 0 for d in digits):
-            return True
-
-        # Check for alternating odd-even pattern
-        odd_even_alternating = True
-        for i in range(len(digits) - 1):
-            if (digits[i] % 2) == (digits[i+1] % 2):
-                odd_even_alternating = False
-                break
-
-        if odd_even_alternating:
-            return True
-
-        return False
-
-    def _is_double_double_pattern(self, mpin: str) -> bool:
-        """Check if MPIN consists of two repeated digit pairs (AABB pattern)"""
-        if len(mpin) == 4:
-            if mpin[0] == mpin[1] and mpin[2] == mpin[3] and mpin[0] != mpin[2]:
-                return True
-        return False
-
-    def _is_mirror_pattern(self, mpin: str) -> bool:
-        """Check if MPIN is symmetrical around a center axis"""
-        if len(mpin) % 2 == 0:  # Even length
-            half = len(mpin) // 2
-            return mpin[:half] == mpin[half:][::-1]
-        else:  # Odd length
-            half = len(mpin) // 2
-            return mpin[:half] == mpin[half+1:][::-1]
-
-    def _is_pin_pattern(self, mpin: str) -> bool:
-        """Check if MPIN follows common PIN number choices"""
-        # Common PIN combinations like birth month/day combinations
-        if len(mpin) == 4:
-            # Check if it could be a month-day combination
-            try:
-                month = int(mpin[:2])
-                day = int(mpin[2:])
-                if 1 <= month <= 12 and 1 <= day <= 31:
-                    return True
-            except ValueError:
-                pass
-
-            # Check if it could be a day-month combination
-            try:
-                day = int(mpin[:2])
-                month = int(mpin[2:])
-                if 1 <= day <= 31 and 1 <= month <= 12:
-                    return True
-            except ValueError:
-                pass
-
-        return False
-
-    def is_common_mpin(self, mpin: str) -> bool:
-        """
-        Determine if the provided MPIN is commonly used.
-
-        Args:
-            mpin (str): A 4-digit MPIN
-
-        Returns:
-            bool: True if the MPIN is common, False otherwise
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != 4:
-            raise ValueError("MPIN must be a 4-digit string")
-
-        # Run through pattern detectors
-        for detector in self.pattern_detectors:
-            if detector(mpin):
-                return True
-
-        return False
-
-    def check_mpin(self, mpin: str) -> Dict[str, Union[bool, str]]:
-        """
-        Check if the MPIN is common and return result with explanation.
-
-        Args:
-            mpin (str): A 4-digit MPIN
-
-        Returns:
-            dict: Result containing common status and explanation
-        """
-        is_common = self.is_common_mpin(mpin)
-
-        result = {
-            "mpin": mpin,
-            "is_common": is_common,
-            "strength": "WEAK" if is_common else "STRONG"
-        }
-
-        return result
-
-
-# Part B: Enhanced MPIN Validator with demographic checks
-class EnhancedMPINValidator(MPINValidator):
-    """
-    Enhanced MPIN validator that considers user demographics
-    in addition to common pattern detection.
-    """
-
-    def __init__(self):
-        """Initialize the enhanced validator"""
-        super().__init__()
-        self.demographic_patterns = []
-
-    def _extract_date_patterns(self, date_str: str) -> Set[str]:
-        """
-        Extract all possible 4-digit patterns from a date.
-
-        Args:
-            date_str (str): Date in DD-MM-YYYY format
-
-        Returns:
-            set: All possible 4-digit combinations from the date
-        """
-        if not date_str:
-            return set()
-
-        patterns = set()
-
-        # Validate date format
-        date_match = re.match(r'^(\d{2})[/-](\d{2})[/-](\d{4})$', date_str)
-        if not date_match:
-            return patterns
-
-        day, month, year = date_match.groups()
-
-        # Generate all possible combinations
-        patterns.add(day + month)  # DDMM
-        patterns.add(month + day)  # MMDD
-        patterns.add(day + year[2:])  # DDYY
-        patterns.add(month + year[2:])  # MMYY
-        patterns.add(year[2:] + day)  # YYDD
-        patterns.add(year[2:] + month)  # YYMM
-
-        # For months/days less than 10, try without leading zeros
-        patterns.add(day.lstrip('0') + month.lstrip('0'))
-        patterns.add(month.lstrip('0') + day.lstrip('0'))
-
-        # Individual components
-        if len(day.lstrip('0')) == 1:
-            day_padded = '0' + day.lstrip('0')
-        else:
-            day_padded = day
-        patterns.add(day_padded + day_padded)  # DDDD
-
-        if len(month.lstrip('0')) == 1:
-            month_padded = '0' + month.lstrip('0')
-        else:
-            month_padded = month
-        patterns.add(month_padded + month_padded)  # MMMM
-
-        # Last 4 digits of year
-        patterns.add(year)  # YYYY
-        # Last 2 digits of year repeated
-        patterns.add(year[2:] + year[2:])  # YYYY
-
-        return patterns
-
-    def set_demographics(self, dob: str = None, spouse_dob: str = None, anniversary: str = None):
-        """
-        Set user demographics for MPIN validation.
-
-        Args:
-            dob (str): Date of birth in DD-MM-YYYY format
-            spouse_dob (str): Spouse's date of birth in DD-MM-YYYY format
-            anniversary (str): Wedding anniversary in DD-MM-YYYY format
-        """
-        self.demographic_patterns = []
-
-        # Process DOB
-        if dob:
-            self.demographic_patterns.extend(self._extract_date_patterns(dob))
-
-        # Process spouse DOB
-        if spouse_dob:
-            self.demographic_patterns.extend(self._extract_date_patterns(spouse_dob))
-
-        # Process anniversary
-        if anniversary:
-            self.demographic_patterns.extend(self._extract_date_patterns(anniversary))
-
-    def is_demographic_match(self, mpin: str) -> bool:
-        """Check if MPIN matches any demographic pattern"""
-        return mpin in self.demographic_patterns
-
-    def check_mpin(self, mpin: str) -> Dict[str, Union[bool, str]]:
-        """
-        Check if the MPIN is weak based on common patterns or demographics.
-
-        Args:
-            mpin (str): A 4-digit MPIN
-
-        Returns:
-            dict: Result containing strength evaluation and explanation
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != 4:
-            raise ValueError("MPIN must be a 4-digit string")
-
-        # Check for common patterns from Part A
-        is_common = self.is_common_mpin(mpin)
-
-        # Check for demographic matches
-        is_demographic_match = self.is_demographic_match(mpin)
-
-        # Determine strength
-        is_weak = is_common or is_demographic_match
-
-        result = {
-            "mpin": mpin,
-            "strength": "WEAK" if is_weak else "STRONG",
-            "is_common": is_common,
-            "is_demographic_match": is_demographic_match
-        }
-
-        return result
-
-
-# Part C: Detailed MPIN Validator with specific reasons
-class DetailedMPINValidator(EnhancedMPINValidator):
-    """
-    Detailed MPIN validator that provides specific reasons for weakness
-    """
-
-    def __init__(self):
-        """Initialize the detailed validator"""
-        super().__init__()
-        self.dob = None
-        self.spouse_dob = None
-        self.anniversary = None
-        self.dob_patterns = set()
-        self.spouse_dob_patterns = set()
-        self.anniversary_patterns = set()
-
-    def set_demographics(self, dob: str = None, spouse_dob: str = None, anniversary: str = None):
-        """
-        Set user demographics for MPIN validation with tracking.
-
-        Args:
-            dob (str): Date of birth in DD-MM-YYYY format
-            spouse_dob (str): Spouse's date of birth in DD-MM-YYYY format
-            anniversary (str): Wedding anniversary in DD-MM-YYYY format
-        """
-        # Store original dates for reference
-        self.dob = dob
-        self.spouse_dob = spouse_dob
-        self.anniversary = anniversary
-
-        # Generate demographic patterns
-        self.dob_patterns = self._extract_date_patterns(dob) if dob else set()
-        self.spouse_dob_patterns = self._extract_date_patterns(spouse_dob) if spouse_dob else set()
-        self.anniversary_patterns = self._extract_date_patterns(anniversary) if anniversary else set()
-
-        # Keep patterns separate to identify specific reasons
-        # Remove overlaps to prevent duplicate reason codes
-        self.spouse_dob_patterns = self.spouse_dob_patterns - self.dob_patterns
-        self.anniversary_patterns = self.anniversary_patterns - self.dob_patterns - self.spouse_dob_patterns
-
-        # Combine all patterns for general demographic matching
-        self.demographic_patterns = []
-        self.demographic_patterns.extend(self.dob_patterns)
-        self.demographic_patterns.extend(self.spouse_dob_patterns)
-        self.demographic_patterns.extend(self.anniversary_patterns)
-
-    def check_mpin(self, mpin: str) -> Dict[str, Union[str, List[str]]]:
-        """
-        Check if the MPIN is weak and provide specific reasons.
-
-        Args:
-            mpin (str): A 4-digit MPIN
-
-        Returns:
-            dict: Result containing strength evaluation and weakness reasons
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != 4:
-            raise ValueError("MPIN must be a 4-digit string")
-
-        # Initialize result
-        result = {
-            "mpin": mpin,
-            "strength": "STRONG",
-            "reasons": []
-        }
-
-        # Check for common pattern
-        if self.is_common_mpin(mpin):
-            result["strength"] = "WEAK"
-            result["reasons"].append("COMMONLY_USED")
-
-        # Check for demographic matches with specific reason codes
-        if mpin in self.dob_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_DOB_SELF")
-
-        if mpin in self.spouse_dob_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_DOB_SPOUSE")
-
-        if mpin in self.anniversary_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_ANNIVERSARY")
-
-        return result
-
-    def get_demographic_info(self) -> Dict[str, str]:
-        """Get the demographic information that's been set"""
-        return {
-            "dob": self.dob if self.dob else "Not provided",
-            "spouse_dob": self.spouse_dob if self.spouse_dob else "Not provided",
-            "anniversary": self.anniversary if self.anniversary else "Not provided"
-        }
-
-
-# Part D: 6-digit MPIN Validator
-class SixDigitMPINValidator(DetailedMPINValidator):
-    """
-    MPIN validator extended to handle 6-digit PINs with additional checks.
-    """
-
-    def __init__(self, pin_length=6):
-        """
-        Initialize the 6-digit MPIN validator.
-
-        Args:
-            pin_length (int): Length of the PIN (default is 6)
-        """
-        super().__init__()
-        self.pin_length = pin_length
-
-        # Add 6-digit specific pattern detectors
-        self.pattern_detectors.extend([
-            self._is_arithmetic_sequence,
-            self._has_low_entropy,
-            self._is_triplet_pattern,
-            self._is_zigzag_pattern
-        ])
-
-    def _extract_date_patterns(self, date_str: str) -> Set[str]:
-        """
-        Extract possible 6-digit patterns from a date.
-
-        Args:
-            date_str (str): Date in DD-MM-YYYY format
-
-        Returns:
-            set: Possible 6-digit combinations from the date
-        """
-        patterns = super()._extract_date_patterns(date_str)
-
-        if not date_str:
-            return patterns
-
-        # Validate date format
-        date_match = re.match(r'^(\d{2})[/-](\d{2})[/-](\d{4})$', date_str)
-        if not date_match:
-            return patterns
-
-        day, month, year = date_match.groups()
-
-        # Add 6-digit patterns
-        patterns.add(day + month + year[2:])  # DDMMYY
-        patterns.add(day + year[2:] + month)  # DDYYMM
-        patterns.add(month + day + year[2:])  # MMDDYY
-        patterns.add(month + year[2:] + day)  # MMYYDD
-        patterns.add(year[2:] + day + month)  # YYDDMM
-        patterns.add(year[2:] + month + day)  # YYMMDD
-        patterns.add(day + month + year[:2])  # DDMMCC (CC = century)
-        patterns.add(month + day + year[:2])  # MMDDCC
-        patterns.add(day + year[:2] + month)  # DDCCMM
-        patterns.add(month + year[:2] + day)  # MMCCDD
-        patterns.add(year[:2] + day + month)  # CCDDMM
-        patterns.add(year[:2] + month + day)  # CCMMDD
-        patterns.add(year[:2] + year[2:] + day)  # CCYYDD
-        patterns.add(year[:2] + year[2:] + month)  # CCYYMM
-        patterns.add(day + year[:4])          # DDYYYY
-        patterns.add(month + year[:4])        # MMYYYY
-        patterns.add(year[:4] + day)          # YYYYDD
-        patterns.add(year[:4] + month)        # YYYYMM
-
-        return patterns
-
-    def _is_arithmetic_sequence(self, mpin: str) -> bool:
-        """Check if the MPIN forms an arithmetic sequence"""
-        if len(mpin) < 3:
-            return False
-
-        digits = [int(d) for d in mpin]
-
-        # Handle the specific case mentioned in the test
-        if mpin == "135790":
-            return True
-
-        # Check for arithmetic sequence
-        diffs = [digits[i+1] - digits[i] for i in range(len(digits)-1)]
-
-        # If all differences are the same and not zero, it's an arithmetic sequence
-        return len(set(diffs)) == 1 and diffs[0] != 0
-
-    def _has_low_entropy(self, mpin: str) -> bool:
-        """
-        Check if the MPIN has low entropy (information content)
-        This identifies patterns that might not be caught by other detectors
-        """
-        # Count unique digits
-        unique_digits = len(set(mpin))
-
-        # If there are very few unique digits, it's low entropy
-        if unique_digits <= 2:
-            return True
-
-        # Check for repeating subpatterns
-        for pattern_len in range(1, len(mpin)//2 + 1):
-            pattern = mpin[:pattern_len]
-            match_count = 0
-
-            for i in range(0, len(mpin), pattern_len):
-                if i + pattern_len <= len(mpin) and mpin[i:i+pattern_len] == pattern:
-                    match_count += 1
-
-            if match_count > 1 and match_count * pattern_len >= len(mpin) * 0.6:
-                return True
-
-        # Check for repetitive use of two alternating digits
-        if len(mpin) >= 4:
-            for i in range(len(mpin) - 3):
-                if mpin[i] == mpin[i+2] and mpin[i+1] == mpin[i+3]:
-                    return True
-
-        return False
-
-    def _is_triplet_pattern(self, mpin: str) -> bool:
-        """Check if the PIN contains digit triplets like 111, 222, etc."""
-        for i in range(len(mpin) - 2):
-            if mpin[i] == mpin[i+1] == mpin[i+2]:
-                return True
-        return False
-
-    def _is_zigzag_pattern(self, mpin: str) -> bool:
-        """Check if the PIN follows a zigzag pattern on the keypad"""
-        # Zigzag patterns on phone/ATM keypad
-        zigzag_patterns = [
-            "1357", "3579", "7531", "9753",   # Row zigzags
-            "1470", "3690", "7410", "9630",   # Column zigzags
-            "1590", "3570", "7530", "9510"    # Diagonal zigzags
-        ]
-
-        # Check for any zigzag pattern as a substring
-        for pattern in zigzag_patterns:
-            is_substring = True
-            for i in range(len(pattern) - 1):
-                if not (pattern[i] in mpin and pattern[i+1] in mpin and
-                        abs(mpin.index(pattern[i]) - mpin.index(pattern[i+1])) == 1):
-                    is_substring = False
-                    break
-            if is_substring:
-                return True
-
-        return False
-
-    def is_common_mpin(self, mpin: str) -> bool:
-        """
-        Determine if the provided MPIN is commonly used.
-
-        Args:
-            mpin (str): A PIN of specified length
-
-        Returns:
-            bool: True if the MPIN is common, False otherwise
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != self.pin_length:
-            raise ValueError(f"MPIN must be a {self.pin_length}-digit string")
-
-        # Run through pattern detectors
-        for detector in self.pattern_detectors:
-            if detector(mpin):
-                return True
-
-        return False
-
-    def check_mpin(self, mpin: str) -> Dict[str, Union[str, List[str]]]:
-        """
-        Check if the MPIN is weak and provide specific reasons.
-
-        Args:
-            mpin (str): A PIN of specified length
-
-        Returns:
-            dict: Result containing strength evaluation and weakness reasons
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit() or len(mpin) != self.pin_length:
-            raise ValueError(f"MPIN must be a {self.pin_length}-digit string")
-
-        # Initialize result
-        result = {
-            "mpin": mpin,
-            "strength": "STRONG",
-            "reasons": []
-        }
-
-        # Check for common pattern
-        if self.is_common_mpin(mpin):
-            result["strength"] = "WEAK"
-            result["reasons"].append("COMMONLY_USED")
-
-        # Check for demographic matches with specific reason codes
-        # Only check for exact matches in our demographic patterns to prevent false positives
-        if mpin in self.dob_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_DOB_SELF")
-
-        if mpin in self.spouse_dob_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_DOB_SPOUSE")
-
-        if mpin in self.anniversary_patterns:
-            result["strength"] = "WEAK"
-            if "COMMONLY_USED" in result["reasons"]:
-                result["reasons"].remove("COMMONLY_USED")
-            result["reasons"].append("DEMOGRAPHIC_ANNIVERSARY")
-
-        return result
-
-
-# Part E: Universal MPIN Validator
-class UniversalMPINValidator:
-    """
-    Universal MPIN validator that can handle both 4-digit and 6-digit PINs.
-    Provides a unified API for MPIN validation.
-    """
-
-    def __init__(self):
-        """Initialize the universal validator with both 4 and 6 digit validators"""
-        self.four_digit_validator = DetailedMPINValidator()
-        self.six_digit_validator = SixDigitMPINValidator()
-
-    def set_demographics(self, dob: str = None, spouse_dob: str = None, anniversary: str = None):
-        """
-        Set user demographics for both validators.
-
-        Args:
-            dob (str): Date of birth in DD-MM-YYYY format
-            spouse_dob (str): Spouse's date of birth in DD-MM-YYYY format
-            anniversary (str): Wedding anniversary in DD-MM-YYYY format
-        """
-        self.four_digit_validator.set_demographics(dob, spouse_dob, anniversary)
-        self.six_digit_validator.set_demographics(dob, spouse_dob, anniversary)
-
-    def check_mpin(self, mpin: str) -> Dict[str, Union[str, List[str]]]:
-        """
-        Check MPIN of any supported length (4 or 6 digits).
-
-        Args:
-            mpin (str): A 4 or 6 digit MPIN
-
-        Returns:
-            dict: Result containing strength evaluation and reasons
-        """
-        # Basic validation
-        if not isinstance(mpin, str) or not mpin.isdigit():
-            raise ValueError("MPIN must be a digit string")
-
-        # Validate based on length
-        if len(mpin) == 4:
-            return self.four_digit_validator.check_mpin(mpin)
-        elif len(mpin) == 6:
-            return self.six_digit_validator.check_mpin(mpin)
-        else:
-            raise ValueError("MPIN must be either 4 or 6 digits")
-
-    def get_demographic_info(self) -> Dict[str, str]:
-        """Get the demographic information that's been set"""
-        return self.four_digit_validator.get_demographic_info()
-
-
 # Unit Tests
 class TestMPINValidator(unittest.TestCase):
     """Unit tests for MPIN validators"""
 
+    @classmethod
+    def setUpClass(cls):
+        # Table files the tests build, shared by the tests and kept out of the package
+        cls.table_directory = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.table_directory.cleanup()
+
+    def setUp(self):
+        """Resolve tables, ranks and bitmaps from table_directory"""
+        from mpin_validator import guessrank, suggest
+
+        def reset():
+            tables.wait_for_builds()
+            tables.reset_tables()
+            guessrank.reset_ranks()
+            suggest.reset_strong_pins()
+
+        patcher = mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": self.table_directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset)
+        reset()
+
     def test_basic_validator(self):
         """Test the basic 4-digit MPIN validator"""
         validator = MPINValidator()
@@ -928,6 +218,953 @@ class TestMPINValidator(unittest.TestCase):
         demo_info = validator.get_demographic_info()
         self.assertEqual(demo_info["dob"], "15-06-1985")
 
+    def test_weakness_table(self):
+        """Test the precomputed table against the detector pipeline"""
+        validator = MPINValidator()
+
+        for value in range(10000):
+            mpin = f"{value:04d}"
+            expected = any(detector(mpin) for detector in validator.pattern_detectors)
+            self.assertEqual(validator.is_common_mpin(mpin), expected, mpin)
+
+        # Custom detectors fall back to the detector loop
+        validator.pattern_detectors = [lambda mpin: mpin == "2917"]
+        validator.reset_weakness_table()
+        self.assertTrue(validator.is_common_mpin("2917"))
+        self.assertFalse(validator.is_common_mpin("1234"))
+
+    def test_bitplane_table(self):
+        """Test that memory-mapped bit planes round-trip a weakness table"""
+        table = tables.build_table(MPINValidator(), 4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "weakness4.planes")
+            tables.write_bitplanes(table, path)
+            planes = tables.BitPlaneTable(path)
+
+            self.assertEqual(planes.length, 4)
+            for value in range(10000):
+                self.assertEqual(planes.lookup(value), table.lookup(value))
+            planes.close()
+
+        # Without a table file or NumPy the 6-digit validator runs its detectors
+        with mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": os.devnull}), \
+                mock.patch.object(tables, "_kernels_agree", return_value=False):
+            validator = SixDigitMPINValidator(pin_length=5)
+            self.assertTrue(validator.is_common_mpin("12345"))
+            self.assertIsNone(validator._weakness_table)
+            tables.wait_for_builds()
+            self.assertTrue(validator.is_common_mpin("12345"))
+            self.assertIsNone(validator._weakness_table)
+        tables.reset_tables()
+
+    def test_variable_length_tables(self):
+        """Test lazily built tables for PIN lengths other than 4 and 6"""
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        validator = SixDigitMPINValidator(pin_length=5)
+        built = tables.build_table_vectorized(validator, 5, workers=2)
+        bitmap = tables.CompressedBitmapTable(buffer=tables.build_bitmap(validator, 5, workers=1, block_pins=1024))
+        for value in range(0, 10 ** 5, 37):
+            expected = tables.evaluate_detectors(validator, f"{value:05d}")
+            self.assertEqual(built.lookup(value), expected, value)
+            self.assertEqual(bitmap.lookup(value), expected, value)
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}), \
+                mock.patch.object(tables, "COMPRESSED_LENGTH", 5):
+            tables.reset_tables()
+            universal = UniversalMPINValidator(lengths=(4, 5))
+            self.assertEqual(universal.check_mpin("12345")["strength"], "WEAK")
+            tables.wait_for_builds()
+            self.assertEqual(universal.check_mpin("29175")["strength"], "STRONG")
+            table = universal.validators[5]._weakness_table
+            self.assertIsInstance(table, tables.CompressedBitmapTable)
+            fingerprint = tables.policy_fingerprint(universal.validators[5], 5)
+            self.assertEqual(table.path, tables.cache_path(5, fingerprint))
+            with self.assertRaisesRegex(ValueError, "either 4 or 5 digits"):
+                universal.check_mpin("123456")
+
+            # Overridden detectors are not taken from the kernels
+            class CustomValidator(SixDigitMPINValidator):
+                def _is_sequential(self, mpin):
+                    return mpin == "29175"
+
+            custom = CustomValidator(pin_length=5)
+            self.assertTrue(custom.is_common_mpin("29175"))
+            self.assertIsNone(custom._weakness_table)
+        tables.reset_tables()
+
+        with self.assertRaises(ValueError):
+            UniversalMPINValidator(lengths=(4, 9))
+
+    def test_table_cache(self):
+        """Test that cached tables are keyed by the detector policy and rebuilt in the background"""
+        class LateYears(MPINValidator):
+            COMMON_YEARS = (1930, 2030)
+
+        class HouseNumber(MPINValidator):
+            def _is_pin_pattern(self, mpin):
+                return mpin == "2917"
+
+        validator = MPINValidator()
+        fingerprint = tables.policy_fingerprint(validator, 4)
+        self.assertEqual(fingerprint, tables.policy_fingerprint(MPINValidator(), 4))
+        self.assertNotEqual(fingerprint, tables.policy_fingerprint(validator, 5))
+        self.assertNotEqual(fingerprint, tables.policy_fingerprint(LateYears(), 4))
+        self.assertNotEqual(fingerprint, tables.policy_fingerprint(HouseNumber(), 4))
+
+        bit = tables.DETECTOR_BITS["_is_pin_pattern"]
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}):
+            tables.reset_tables()
+            # The detector loop serves checks until the rebuild lands
+            custom = HouseNumber()
+            self.assertTrue(custom.is_common_mpin("2917"))
+            tables.wait_for_builds()
+            self.assertTrue(custom.is_common_mpin("2917"))
+            self.assertIsNotNone(custom._weakness_table)
+            path = tables.cache_path(4, tables.policy_fingerprint(custom, 4))
+            self.assertTrue(os.path.exists(path))
+
+            # A later process maps the cached file instead of rebuilding
+            tables.reset_tables()
+            with mock.patch.object(tables, "build_table", side_effect=AssertionError):
+                table = tables.get_table(HouseNumber(), 4)
+            self.assertTrue(table.lookup(2917) & bit)
+            self.assertFalse(tables.get_table(validator, 4, wait=True).lookup(2917) & bit)
+
+            # Planning and probing happen on the build thread, not the caller's
+            tables.reset_tables()
+            threads = []
+            plan_planes = tables.plan_planes
+
+            def record(*args):
+                threads.append(threading.current_thread())
+                return plan_planes(*args)
+
+            with mock.patch.object(tables, "plan_planes", side_effect=record):
+                self.assertIsNone(tables.get_table(LateYears(), 4))
+                tables.wait_for_builds()
+            self.assertEqual(len(threads), 1)
+            self.assertIsNot(threads[0], threading.current_thread())
+
+            # Files of policies nobody used lately are pruned; used and
+            # unfingerprinted ones stay
+            stale = tables.cache_path(4, "0" * 64)
+            legacy = tables.bitplanes_path(4)
+            for name in (stale, legacy):
+                shutil.copyfile(path, name)
+                os.utime(name, (0, 0))
+            tables.reset_tables()
+            tables.get_table(HouseNumber(), 4)
+            self.assertEqual(tables.prune_cache(), [stale])
+            self.assertTrue(os.path.exists(path) and os.path.exists(legacy))
+        tables.reset_tables()
+
+        # Without MPIN_TABLE_DIR tables live in the user's cache directory
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": "/tmp/cache"}), \
+                mock.patch.object(sys, "platform", "linux"):
+            os.environ.pop("MPIN_TABLE_DIR")
+            self.assertEqual(tables.table_directory(), os.path.join("/tmp/cache", "mpin_validator"))
+
+    def test_incremental_rebuild(self):
+        """Test that a policy change re-evaluates only the planes of changed detectors"""
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        class LooseEntropy(SixDigitMPINValidator):
+            LOW_ENTROPY_COVERAGE = 0.5
+
+        stock, loose = SixDigitMPINValidator(pin_length=5), LooseEntropy(pin_length=5)
+        stock_tags, loose_tags = tables.detector_tags(stock, 5), tables.detector_tags(loose, 5)
+        self.assertEqual([name for name in stock_tags if stock_tags[name] != loose_tags[name]],
+                         ["_has_low_entropy"])
+        # The kernels take the coverage setting, so they agree with both
+        self.assertTrue(tables._kernels_agree(loose, 5, tables.DETECTOR_BITS["_has_low_entropy"]))
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}):
+            path = tables.cache_path(5, tables.policy_fingerprint(stock, 5))
+            report = tables.rebuild_planes(stock, 5, path, workers=1)
+            self.assertEqual(len(report["kernel"]), 14)
+            table = tables.BitPlaneTable(path)
+            self.assertEqual(table.tags, stock_tags)
+            table.close()
+
+            path = tables.cache_path(5, tables.policy_fingerprint(loose, 5))
+            report = tables.rebuild_planes(loose, 5, path, workers=1)
+            self.assertEqual(report["python"], ["_has_low_entropy"])
+            self.assertEqual((len(report["reused"]), report["kernel"]), (13, []))
+
+            table = tables.BitPlaneTable(path)
+            for value in range(0, 10 ** 5, 41):
+                self.assertEqual(table.lookup(value), tables.evaluate_detectors(loose, f"{value:05d}"), value)
+            table.close()
+        tables.reset_tables()
+
+    def test_shared_tables(self):
+        """Test that published tables are mapped by name and replaced by generation"""
+        from mpin_validator import shared
+
+        validator = MPINValidator()
+        name = tables.shared_name(4, tables.policy_fingerprint(validator, 4))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(shared.publish(directory, [validator]), 1)
+            self.assertEqual(shared.current_generation(directory), 1)
+            self.assertIn(name, shared.segment())
+
+            table = tables.get_table(MPINValidator(), 4)
+            self.assertIsInstance(table.masks, memoryview)
+            expected = tables.build_table(validator, 4)
+            self.assertEqual(table.masks.tolist(), expected.masks.tolist())
+            self.assertEqual(MPINValidator().check_mpin("1234")["strength"], "WEAK")
+            self.assertFalse(shared.refresh())
+
+            # Workers switch over once the pointer names a new generation
+            shared.write_segment(shared.segment_path(directory, 2), {}, 2)
+            with open(os.path.join(directory, shared.POINTER), "w") as f:
+                f.write("2\n")
+            self.assertTrue(shared.refresh())
+            self.assertEqual(shared.segment().generation, 2)
+            self.assertIsNone(shared.lookup(name))
+            self.assertEqual(table.lookup(1234), expected.lookup(1234))
+            self.assertNotIsInstance(tables.get_table(MPINValidator(), 4).masks, memoryview)
+        shared.detach()
+
+    def test_stateless_check(self):
+        """Test that check() with immutable profiles matches set_demographics and shares across threads"""
+        import pickle
+        import threading
+        from mpin_validator import DemographicProfile
+
+        profile_dates = ("15-06-1985", "22-11-1987", "15-06-1985")
+        validator = UniversalMPINValidator()
+        profile = validator.make_profile(*profile_dates)
+        self.assertEqual(profile, validator.make_profile(*profile_dates))
+        self.assertEqual(hash(profile), hash(pickle.loads(pickle.dumps(profile))))
+        with self.assertRaises(AttributeError):
+            profile.dob = "01-01-2000"
+        with self.assertRaises(ValueError):
+            SixDigitMPINValidator().check("150685", DetailedMPINValidator().make_profile(*profile_dates))
+        self.assertIsInstance(profile, DemographicProfile)
+
+        mpins = ["1506", "0615", "2211", "1985", "8520", "150685", "221187", "482915", "729458"]
+        mpins += [f"{value:04d}" for value in range(0, 10000, 97)]
+        stateful = UniversalMPINValidator()
+        stateful.set_demographics(*profile_dates)
+        expected = {mpin: stateful.check_mpin(mpin) for mpin in mpins}
+        expected_plain = {mpin: UniversalMPINValidator().check_mpin(mpin) for mpin in mpins}
+
+        # One validator, many customers and threads at once
+        failures = []
+
+        def work(seed):
+            for mpin in mpins[seed::4]:
+                if validator.check(mpin, profile) != expected[mpin] or \
+                        validator.check(mpin) != expected_plain[mpin]:
+                    failures.append(mpin)
+
+        workers = [threading.Thread(target=work, args=(seed,)) for seed in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(failures, [])
+        self.assertEqual(validator.check("1506", profile)["reasons"], ["DEMOGRAPHIC_DOB_SELF"])
+        self.assertEqual(validator.check("2211", profile)["reasons"], ["DEMOGRAPHIC_DOB_SPOUSE"])
+
+    def test_interned_results(self):
+        """Test that check() and check_mpin results are immutable and shared per PIN"""
+        validator = UniversalMPINValidator()
+        validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+        validator.check("123456")
+        tables.wait_for_builds()
+
+        result = validator.check("123456")
+        self.assertIs(validator.check("123456"), result)
+        self.assertEqual(result, {"mpin": "123456", "strength": "WEAK", "reasons": ["COMMONLY_USED"]})
+        self.assertEqual(dict(result), result.as_dict())
+        self.assertEqual((result.strength, result.reasons), ("WEAK", ("COMMONLY_USED",)))
+        with self.assertRaises(AttributeError):
+            result.code = 0
+        with self.assertRaises(TypeError):
+            result["strength"] = "STRONG"
+
+        # check_mpin allocates nothing for such PINs; as_dict() gives a
+        # fresh, mutable, JSON-ready dict
+        self.assertIs(validator.check_mpin("123456"), result)
+        legacy = validator.check_mpin("123456").as_dict()
+        self.assertIsInstance(legacy, dict)
+        self.assertEqual(json.loads(json.dumps(legacy))["reasons"], ["COMMONLY_USED"])
+        legacy["reasons"].append("SEEN")
+        validator.check_mpin("123456")["reasons"].append("SEEN")
+        self.assertEqual(validator.check_mpin("123456")["reasons"], ["COMMONLY_USED"])
+
+        # Demographic outcomes depend on the customer and are not shared
+        demographic = validator.check_mpin("150685")
+        self.assertEqual(demographic["reasons"], ["DEMOGRAPHIC_DOB_SELF"])
+        validator.set_demographics()
+        self.assertEqual(validator.check_mpin("150685").get("reasons"), [])
+
+        # Instrumented checks still run the detectors
+        checker = validator.four_digit_validator
+        checker.check("1234")
+        instrumentation = checker.enable_instrumentation()
+        checker.check("1234")
+        checker.check("1234")
+        self.assertEqual(instrumentation.snapshot()["pins"], 2)
+
+    def test_reason_flags(self):
+        """Test that reason bitmasks decode to the legacy reason lists"""
+        Reason = reasons.Reason
+        for mask in range(reasons.ALL_REASONS + 1):
+            names = [flag.name for flag in Reason if mask & flag]
+            self.assertEqual(reasons.decode_reasons(mask), names)
+            self.assertEqual(reasons.encode_reasons(names), mask)
+            self.assertEqual(reasons.flags(mask), Reason(mask))
+        self.assertEqual(Reason.DEMOGRAPHIC_DOB_SELF | Reason.DEMOGRAPHIC_ANNIVERSARY,
+                         reasons.DEMOGRAPHIC_DOB_SELF | reasons.DEMOGRAPHIC_ANNIVERSARY)
+
+        validator = UniversalMPINValidator()
+        validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+        profile = validator.make_profile("15-06-1985", "22-11-1987", "08-12-2010")
+        self.assertEqual(validator.check("150685", profile).flags, Reason.DEMOGRAPHIC_DOB_SELF)
+        self.assertEqual(validator.check("123456", profile).flags, Reason.COMMONLY_USED)
+        self.assertEqual(validator.explain_mpin("081210")["reasons"], ["DEMOGRAPHIC_ANNIVERSARY"])
+
+    def test_check_many(self):
+        """Test the vectorized batch API against check_mpin"""
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        validator = UniversalMPINValidator()
+        validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+
+        mpins = [f"{value:04d}" for value in range(0, 10000, 7)]
+        mpins += [f"{value:06d}" for value in range(0, 1000000, 997)]
+        mpins += ["1506", "2211", "150685", "221187", "081210", "123456", "729458"]
+        result = validator.check_many(mpins)
+
+        for mpin, is_weak, reason_bits in zip(mpins, result["is_weak"], result["reasons"]):
+            expected = validator.check_mpin(mpin)
+            self.assertEqual(is_weak, expected["strength"] == "WEAK", mpin)
+            self.assertEqual(reasons.decode_reasons(reason_bits), expected["reasons"], mpin)
+
+        # A profile replaces the validator's demographics, as in check()
+        profile = UniversalMPINValidator().make_profile("15-06-1985", "22-11-1987", "08-12-2010")
+        result = UniversalMPINValidator().check_many(mpins, profile=profile)
+        self.assertEqual(result["reasons"].tolist(), [validator.check(mpin, profile).code for mpin in mpins])
+
+        # Integer arrays carry their lengths separately
+        values = np.array([150685, 1506, 291756], dtype=np.uint32)
+        result = validator.check_many(values, lengths=[6, 4, 6])
+        self.assertEqual(result["is_weak"].tolist(), [True, True, False])
+        self.assertEqual(result["reasons"][0], reasons.DEMOGRAPHIC_DOB_SELF)
+
+        with self.assertRaisesRegex(ValueError, "^MPIN must be either 4 or 6 digits$"):
+            validator.check_many(["1234", "12345"])
+        with self.assertRaisesRegex(ValueError, "^MPIN must be 6 digits$"):
+            UniversalMPINValidator(lengths=(6,)).check_many(["1234"])
+        with self.assertRaises(ValueError):
+            validator.check_many(["12a4"])
+        with self.assertRaisesRegex(ValueError, "digit string"):
+            validator.check_many(np.array(["1234", 5678], dtype=object))
+
+        # Before a table is ready, changed detectors run in Python next to the kernels
+        class LooseEntropy(SixDigitMPINValidator):
+            LOW_ENTROPY_COVERAGE = 0.3
+
+            def _is_sequential(self, mpin):
+                return mpin == "291756"
+
+        from mpin_validator import vectorized
+
+        custom = LooseEntropy()
+        values = np.arange(0, 10 ** 6, 1009)
+        with mock.patch.object(tables, "get_table", return_value=None):
+            flags = vectorized.common_flags(values, 6, custom).tolist()
+        self.assertEqual(flags, [any(detector(f"{value:06d}") for detector in custom.pattern_detectors)
+                                 for value in values.tolist()])
+        with mock.patch.object(tables, "get_table", return_value=None):
+            self.assertTrue(vectorized.common_flags(np.array([291756]), 6, custom)[0])
+
+    def test_demographic_store(self):
+        """Test the flat demographic store against the detailed validators"""
+        try:
+            from mpin_validator import demographics
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        builder = demographics.DemographicStoreBuilder()
+        builder.add(42, "15-06-1985", "22-11-1987", "08-12-2010")
+        builder.add(7, "01-01-2000")
+
+        with tempfile.TemporaryDirectory() as directory:
+            builder.build().save(directory)
+            store = demographics.DemographicStore.load(directory)
+
+            four = DetailedMPINValidator()
+            six = SixDigitMPINValidator()
+            for validator in (four, six):
+                validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+
+            mpins = ["1506", "2211", "1210", "1985", "7294", "150685", "221187", "081210", "291756"]
+            for mpin in mpins:
+                validator = four if len(mpin) == 4 else six
+                expected = [r for r in validator.check_mpin(mpin)["reasons"] if r != "COMMONLY_USED"]
+                self.assertEqual(reasons.decode_reasons(store.lookup(42, mpin)), expected, mpin)
+
+            packed = [demographics.pack_pin(mpin) for mpin in mpins]
+            self.assertEqual(store.lookup_many([42] * len(mpins), packed).tolist(),
+                             [store.lookup(42, mpin) for mpin in mpins])
+            self.assertEqual(reasons.decode_reasons(store.lookup(7, "0101")), ["DEMOGRAPHIC_DOB_SELF"])
+            self.assertEqual(store.lookup(7, "1506"), 0)
+            with self.assertRaises(KeyError):
+                store.lookup(8, "1506")
+            del store
+
+    def test_bulk_audit(self):
+        """Test the streaming bulk audit keeps input order and reports errors"""
+        from mpin_validator import audit
+
+        source = io.StringIO(
+            "pin,dob,spouse_dob,anniversary\n"
+            "1506,15-06-1985,22-11-1987,08-12-2010\n"
+            "12345,,,\n"
+            "221187,15-06-1985,22-11-1987,08-12-2010\n"
+            "0101,01-01-2000,,\n"
+        )
+        records = list(audit.read_records(source, "csv"))
+        self.assertEqual(records[1], ("12345", None, None, None))
+
+        for workers in (1, 2):
+            results = list(audit.audit(records, workers=workers, chunk_size=1))
+            self.assertEqual([r["mpin"] for r in results], ["1506", "12345", "221187", "0101"])
+            self.assertEqual(results[0]["reasons"], ["DEMOGRAPHIC_DOB_SELF"])
+            self.assertIn("error", results[1])
+            self.assertEqual(results[2]["reasons"], ["DEMOGRAPHIC_DOB_SPOUSE"])
+
+        output = io.StringIO()
+        self.assertEqual(audit.write_results(results, output, "jsonl"), 4)
+        self.assertEqual(json.loads(output.getvalue().splitlines()[3])["strength"], "WEAK")
+
+        # Lines that are not JSON objects become error rows in place
+        source = io.StringIO('{"pin": "1234"}\n{"pin": \n[1, 2]\n\n{"pin": "291756"}\n')
+        records = list(audit.read_records(source, "jsonl"))
+        self.assertEqual(records[1:3], [audit.MalformedRecord(2, "not valid JSON"),
+                                        audit.MalformedRecord(3, "not a JSON object")])
+        for workers in (1, 2):
+            results = list(audit.audit(records, workers=workers, chunk_size=1))
+            self.assertEqual([r.get("error") for r in results],
+                             [None, "Line 2: not valid JSON", "Line 3: not a JSON object", None])
+            self.assertEqual(results[3]["mpin"], "291756")
+        results = list(audit.audit([audit.MalformedRecord(1, "not valid JSON")]))
+        self.assertEqual(results, [{"mpin": "", "error": "Line 1: not valid JSON"}])
+
+    def test_micro_batching_service(self):
+        """Test that batched service checks match check_mpin"""
+        import asyncio
+        from mpin_validator import service
+
+        profile = ("15-06-1985", "22-11-1987", "08-12-2010")
+        mpins = ["1234", "1506", "150685", "221187", "291756", "\u0661\u0662\u0663\u0664",
+                 "12345", "12a4", "\u00b2\u00b2\u00b2\u00b2"]
+        validator = UniversalMPINValidator()
+        validator.set_demographics(*profile)
+
+        async def request(port, raw):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            response = await reader.read()
+            writer.close()
+            return response
+
+        async def run():
+            batcher = service.MicroBatcher(service.BatchEvaluator(), max_batch_delay=0.01)
+            batcher.start()
+            server = await asyncio.start_server(service.ValidationService(batcher).handle_connection,
+                                                "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                results = await asyncio.gather(*(batcher.check(mpin, profile) for mpin in mpins))
+                status, checked = await service.ValidationService(batcher).dispatch(
+                    "GET", "/check?pin=0812&anniversary=08-12-2010", b"")
+                malformed = [await request(port, raw) for raw in (
+                    b"GARBAGE\r\n\r\n", b"GET /health HTTP/1.1\r\nno colon here\r\n\r\n")]
+            finally:
+                server.close()
+                await batcher.stop()
+            return results, status, checked, malformed, batcher.batches
+
+        results, status, checked, malformed, batches = asyncio.run(run())
+        self.assertEqual(batches, 2)
+        # Non-ASCII digits are checked as check_mpin checks them
+        for mpin, result in zip(mpins[:6], results):
+            self.assertEqual(result, validator.check_mpin(mpin))
+        self.assertEqual(results[6]["error"], validator.length_error)
+        self.assertEqual(results[7]["error"], "MPIN must be a digit string")
+        with self.assertRaises(ValueError):
+            validator.check_mpin(mpins[8])
+        self.assertIn("error", results[8])
+        self.assertEqual(status, 200)
+        self.assertEqual(checked["reasons"], ["DEMOGRAPHIC_ANNIVERSARY"])
+        for response in malformed:
+            self.assertTrue(response.startswith(b"HTTP/1.1 400 Bad Request\r\n"), response)
+
+    def test_load_generator(self):
+        """Test the load generator against a running service"""
+        import asyncio
+        from mpin_validator import loadgen, service
+
+        async def run():
+            batcher = service.MicroBatcher(service.BatchEvaluator())
+            batcher.start()
+            server = await asyncio.start_server(service.ValidationService(batcher).handle_connection,
+                                                "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                report = await loadgen.run_load("127.0.0.1", port, 40, 4, seed=3)
+                statuses = []
+                for length in (b"-5", b"abc"):
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                    writer.write(b"POST /check HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                    statuses.append((await reader.readline()).split()[1])
+                    writer.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+                await batcher.stop()
+            return report, statuses
+
+        report, statuses = asyncio.run(run())
+        self.assertEqual(report["requests"], 40)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+        self.assertLessEqual(report["p99_ms"], report["max_ms"])
+        self.assertEqual(statuses, [b"400", b"400"])
+
+        self.assertEqual(len(loadgen.make_workload(25, seed=1)), 25)
+        self.assertEqual(loadgen.make_workload(25, seed=1), loadgen.make_workload(25, seed=1))
+        self.assertEqual(loadgen.percentile([3.0, 1.0, 2.0], 0.5), 2.0)
+        for argv in (["--requests", "0"], ["--concurrency", "-1"]):
+            with self.assertRaises(SystemExit), mock.patch("sys.stderr", io.StringIO()):
+                loadgen.main(argv)
+
+    def test_parallel_auditor(self):
+        """Test the process-pool executor against check_mpin"""
+        from mpin_validator import parallel
+
+        records = parallel.make_records(300, seed=1, profiles=20) + [("12", None, None, None)]
+        validator = UniversalMPINValidator()
+
+        with parallel.ParallelAuditor(workers=2, chunk_size=64) as auditor:
+            results = list(auditor.audit(records))
+
+        self.assertEqual(len(results), len(records))
+        for (mpin, *profile), result in zip(records[:-1], results):
+            validator.set_demographics(*profile)
+            self.assertEqual(result, validator.check_mpin(mpin))
+        self.assertEqual(results[-1]["error"], "MPIN must be either 4 or 6 digits")
+
+        # Other lengths reach the workers' validators and error messages
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}):
+            tables.reset_tables()
+            with parallel.ParallelAuditor(workers=1, lengths=(4, 5)) as auditor:
+                results = list(auditor.audit([("12345", None, None, None), ("123456", None, None, None)]))
+        tables.reset_tables()
+        self.assertEqual(results[0]["reasons"], ["COMMONLY_USED"])
+        self.assertEqual(results[1]["error"], "MPIN must be either 4 or 5 digits")
+
+    def test_benchmark_suite(self):
+        """Test that the benchmark covers every generation and serializes"""
+        from mpin_validator import bench
+
+        workloads = bench.make_workloads(10, seed=3)
+        self.assertEqual(workloads, bench.make_workloads(10, seed=3))
+        self.assertEqual(set(workloads), {"weak-heavy", "strong-heavy", "demographic-hit", "mixed-length"})
+
+        report = json.loads(json.dumps(bench.run(size=10, repeat=1)))
+        self.assertEqual({row["validator"] for row in report["check_mpin"]},
+                         {name for name, _ in bench.VALIDATORS})
+        hits = [row for row in report["check_mpin"]
+                if row["validator"] == "parte.UniversalMPINValidator" and row["workload"] == "demographic-hit"]
+        self.assertEqual(hits[0]["weak_fraction"], 1.0)
+        # Timed loops wait for the tables; the older generations have none
+        warm = {row["validator"]: row["tables_warm"] for row in report["check_mpin"]}
+        self.assertTrue(warm["parte.UniversalMPINValidator"])
+        self.assertTrue(warm["parte.SixDigitMPINValidator"])
+        self.assertIsNone(warm["parta.MPINValidator"])
+        self.assertTrue(all(row["tables_warm"] for row in report["threads"]))
+        self.assertIn("MPINValidator._is_keyboard_pattern",
+                      {row["detector"] for row in report["detectors"] if row["module"] == "parte"})
+        self.assertEqual(report["import"]["heavy_modules"], [])
+        self.assertEqual([row["threads"] for row in report["threads"]], [1, 2, 4])
+
+    def test_lazy_package(self):
+        """Test that the package loads its components on first use"""
+        from mpin_validator import bench
+
+        for module in ("mpin_validator", "mpin_validator.validators"):
+            result = bench.measure_import(module, repeat=1)
+            self.assertEqual(result["heavy_modules"], [], module)
+            self.assertGreater(result["ms"], 0)
+
+        import mpin_validator
+        self.assertIs(mpin_validator.UniversalMPINValidator, UniversalMPINValidator)
+        self.assertIs(mpin_validator.tables, tables)
+        self.assertIn("ValidationService", dir(mpin_validator))
+        with self.assertRaises(AttributeError):
+            mpin_validator.missing
+
+    def test_detector_instrumentation(self):
+        """Test per-detector counters and that they leave verdicts unchanged"""
+        from mpin_validator.instrumentation import DetectorInstrumentation
+
+        plain = SixDigitMPINValidator()
+        validator = SixDigitMPINValidator()
+        instrumentation = validator.enable_instrumentation()
+        mpins = ["123456", "291756", "111111", "618394", "150685"]
+        for mpin in mpins:
+            self.assertEqual(validator.is_common_mpin(mpin), plain.is_common_mpin(mpin))
+
+        snapshot = instrumentation.snapshot(reset=True)
+        self.assertEqual(snapshot["pins"], 5)
+        self.assertEqual(snapshot["flagged"], sum(plain.is_common_mpin(mpin) for mpin in mpins))
+        detectors = snapshot["detectors"]
+        self.assertEqual(detectors["_is_sequential"]["calls"], 5)
+        self.assertEqual(detectors["_is_sequential"]["first_hits"], 1)
+        self.assertEqual(sum(stats["first_hits"] for stats in detectors.values()), snapshot["flagged"])
+        self.assertTrue(all(stats["seconds"] > 0 for stats in detectors.values()))
+        self.assertEqual(instrumentation.snapshot()["pins"], 0)
+
+        # Every detector runs when all hits are wanted
+        shared = DetectorInstrumentation(evaluate_all=True)
+        validator.enable_instrumentation(shared)
+        validator.is_common_mpin("111111")
+        detectors = shared.snapshot()["detectors"]
+        self.assertEqual(len(detectors), len(validator.pattern_detectors))
+        self.assertGreater(sum(stats["hits"] for stats in detectors.values()), 1)
+
+        validator.disable_instrumentation()
+        validator.is_common_mpin("123456")
+        self.assertEqual(shared.snapshot()["pins"], 1)
+
+    def test_adaptive_detector_ordering(self):
+        """Test that reordering detectors lowers expected cost and keeps verdicts"""
+        from mpin_validator import ordering
+
+        samples = [frozenset({"slow", "cheap"}), frozenset({"cheap"}), frozenset()]
+        costs = {"slow": 10.0, "cheap": 1.0, "never": 0.5}
+        order = ordering.best_order(["slow", "never", "cheap"], samples, costs)
+        self.assertEqual(order, ["cheap", "never", "slow"])
+        self.assertLess(ordering.expected_cost(order, samples, costs),
+                        ordering.expected_cost(["slow", "never", "cheap"], samples, costs))
+
+        mpins = ["123456", "291756", "111111", "618394", "150685", "121212", "908172", "135797"]
+        plain = SixDigitMPINValidator()
+        with mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": os.devnull}), \
+                mock.patch.object(tables, "_kernels_agree", return_value=False):
+            tables.reset_tables()
+            validator = SixDigitMPINValidator()
+            sampler = validator.enable_adaptive_ordering(sample_every=2, reorder_after=3)
+            results = [validator.is_common_mpin(mpin) for mpin in mpins]
+            tables.wait_for_builds()
+        tables.reset_tables()
+        self.assertEqual(sampler.reorders, 1)
+        self.assertEqual(results, [plain.is_common_mpin(mpin) for mpin in mpins])
+        self.assertEqual(sorted(d.__name__ for d in validator.pattern_detectors),
+                         sorted(d.__name__ for d in plain.pattern_detectors))
+
+        # A ready table keeps answering; the sampler never runs
+        served = SixDigitMPINValidator()
+        tables.get_table(served, 6, wait=True)
+        sampler = served.enable_adaptive_ordering(sample_every=1)
+        with mock.patch.object(sampler, "run", side_effect=AssertionError):
+            self.assertEqual([served.is_common_mpin(mpin) for mpin in ("123456", "291756")], [True, False])
+
+    def test_explain_mode(self):
+        """Test that explain mode lists every matching detector"""
+        validator = UniversalMPINValidator()
+        validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+
+        result = validator.explain_mpin("1221")
+        self.assertEqual(result["reasons"], ["COMMONLY_USED"])
+        self.assertIn("PALINDROME", result["patterns"])
+        self.assertIn("MIRROR", result["patterns"])
+        self.assertNotIn("guess_rank", result)
+
+        result = validator.explain_mpin("1506")
+        self.assertEqual(result["reasons"], ["DEMOGRAPHIC_DOB_SELF"])
+        self.assertIn("DATE_LIKE", result["patterns"])
+        self.assertEqual(validator.explain_mpin("291756")["patterns"], [])
+
+        # The table answer matches running every detector
+        for mpin in ["123456", "111111", "121212", "150685", "2580", "1397", "4321"]:
+            checker = validator.four_digit_validator if len(mpin) == 4 else validator.six_digit_validator
+            expected = [reasons.PATTERN_REASONS[d.__name__] for d in checker.pattern_detectors if d(mpin)]
+            self.assertEqual(sorted(checker.pattern_reasons(mpin)), sorted(expected), mpin)
+            self.assertEqual(bool(expected), checker.is_common_mpin(mpin))
+
+        custom = MPINValidator()
+        custom.pattern_detectors = [lambda mpin: mpin == "2917", custom._is_palindrome]
+        custom.reset_weakness_table()
+        self.assertEqual(custom.pattern_reasons("2917"), [reasons.CUSTOM_PATTERN])
+        self.assertEqual(custom.pattern_reasons("1221"), ["PALINDROME"])
+
+    def test_guess_ranks(self):
+        """Test the attacker guessing order and compromise probabilities"""
+        from mpin_validator import guessrank
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}):
+            guessrank.reset_ranks()
+            validator = UniversalMPINValidator(lengths=(4,))
+            checker = validator.four_digit_validator
+            ranks = guessrank.get_ranks(checker, 4)
+
+            self.assertEqual(sorted(ranks.order), list(range(10000)))
+            self.assertEqual(ranks.rank(ranks.order[0]), 1)
+            self.assertIn("1111", ranks.guesses(10))
+            self.assertLess(validator.guess_rank("1234"), validator.guess_rank("2917"))
+            self.assertEqual(validator.explain_mpin("2917", include_rank=True)["guess_rank"], validator.guess_rank("2917"))
+            self.assertEqual(validator.check_mpin("2917").guess_rank, validator.guess_rank("2917"))
+            self.assertEqual(validator.check("1506", validator.make_profile("15-06-1985")).guess_rank,
+                             validator.guess_rank("1506"))
+
+            # Guesses in order of detector hits, then entropy
+            hits = [len(checker.pattern_reasons(mpin)) for mpin in ranks.guesses(10000)]
+            self.assertEqual(hits, sorted(hits, reverse=True))
+
+            self.assertEqual(validator.compromise_probability(5, length=4), 5 / 10000)
+            weights = {ranks.guesses(1)[0]: 3, "2917": 1}
+            self.assertEqual(ranks.compromise_probability(1, weights), 0.75)
+            self.assertEqual(ranks.compromise_probability(10000, weights), 1.0)
+
+            # Reloaded from the cache file instead of rebuilt
+            guessrank.reset_ranks()
+            with mock.patch.object(guessrank, "build_order", side_effect=AssertionError):
+                self.assertEqual(guessrank.get_ranks(checker, 4).order, ranks.order)
+
+            # Instance-level pipelines are ordered once per instance and pipeline
+            custom = MPINValidator()
+            custom.pattern_detectors = [lambda mpin: mpin == "2917", custom._is_palindrome]
+            custom_ranks = guessrank.get_ranks(custom, 4)
+            self.assertLessEqual(custom_ranks.rank(2917), 101)
+            with mock.patch.object(guessrank, "build_order", side_effect=AssertionError):
+                self.assertIs(guessrank.get_ranks(custom, 4), custom_ranks)
+            custom.pattern_detectors = custom.pattern_detectors[1:]
+            self.assertGreater(guessrank.get_ranks(custom, 4).rank(2917), 100)
+        guessrank.reset_ranks()
+        tables.reset_tables()
+
+    def test_strong_suggestions(self):
+        """Test strong-PIN suggestions and the rank/select bitmap behind them"""
+        import random
+        from mpin_validator import suggest
+
+        bitmap = bytes([0b10100000, 0, 0b1]) + bytes(122)
+        strong = suggest.StrongPins(3, bitmap)
+        self.assertEqual(len(strong), 3)
+        self.assertEqual([strong.select(index) for index in range(3)], [5, 7, 16])
+        self.assertEqual([strong.rank(value) for value in (5, 6, 16, 999)], [0, 1, 2, 3])
+        self.assertIn(16, strong)
+        self.assertNotIn(15, strong)
+
+        validator = UniversalMPINValidator()
+        validator.set_demographics("15-06-1985", "22-11-1987", "08-12-2010")
+        checker = validator.six_digit_validator
+        suggestions = validator.suggest_mpins(20, rng=random.Random(7))
+        self.assertEqual(len(set(suggestions)), 20)
+        for mpin in suggestions:
+            self.assertEqual(validator.check_mpin(mpin)["strength"], "STRONG", mpin)
+
+        # Nearest mode stays one substitution away when it can
+        nearest = validator.suggest_mpins(5, near="150685", rng=random.Random(7))
+        self.assertEqual(len(nearest), 5)
+        for mpin in nearest:
+            self.assertEqual(sum(a != b for a, b in zip(mpin, "150685")), 1, mpin)
+            self.assertEqual(checker.check_mpin(mpin)["strength"], "STRONG", mpin)
+
+        # Demographic patterns are never suggested
+        with mock.patch.object(suggest, "_excluded", return_value=set(nearest)):
+            self.assertFalse(set(nearest) & set(suggest.suggest(checker, 100, near="150685")))
+
+        # A prebuilt profile is avoided instead of the validator's demographics
+        stateless = UniversalMPINValidator()
+        profile = stateless.make_profile("15-06-1985")
+        self.assertEqual(suggest._excluded(checker),
+                         set(checker._profile_patterns("15-06-1985", "22-11-1987", "08-12-2010")))
+        self.assertEqual(suggest._excluded(stateless.six_digit_validator, profile),
+                         set(stateless.six_digit_validator._profile_patterns("15-06-1985")))
+        self.assertEqual(suggest._excluded(stateless.six_digit_validator), set())
+        for mpin in stateless.suggest_mpins(50, near="150685", profile=profile, rng=random.Random(7)):
+            self.assertEqual(stateless.check(mpin, profile)["strength"], "STRONG", mpin)
+
+    def test_date_table(self):
+        """Test that the date table reproduces the date pattern extractors"""
+        self.assertEqual(dates.date_index(1, 1, 1900), 0)
+        self.assertEqual(dates.date_index(31, 12, 2100), 73413)
+        self.assertIsNone(dates.date_index(29, 2, 1900))
+        self.assertEqual(dates.date_index(29, 2, 2000), dates.date_index(28, 2, 2000) + 1)
+
+        four = DetailedMPINValidator()
+        six = SixDigitMPINValidator()
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"MPIN_TABLE_DIR": directory}):
+            dates.write_date_table(dates.date_table_path(), {
+                4: four._compute_date_patterns,
+                6: six._compute_date_patterns
+            }, 1984, 1988)
+            dates.reset_table()
+            try:
+                table = dates.get_table()
+                self.assertEqual(table.date_count, 5 * 365 + 2)
+                for validator in (four, six):
+                    for date_str in ["15-06-1985", "29/02/1988", "01-01-1984", "31-12-1988",
+                                     "15-06-1999", "31-02-1985", "1-6-1985", ""]:
+                        self.assertEqual(validator._extract_date_patterns(date_str),
+                                         validator._compute_date_patterns(date_str), date_str)
+                self.assertEqual(len(table.decode(6, table.index("15-06-1985"))),
+                                 len(six._compute_date_patterns("15-06-1985")))
+
+                # A validator with its own extractor is never served from the table
+                class CustomValidator(DetailedMPINValidator):
+                    def _compute_date_patterns(self, date_str):
+                        return {"0000"}
+
+                self.assertEqual(CustomValidator()._extract_date_patterns("15-06-1985"), {"0000"})
+                table.close()
+            finally:
+                dates.reset_table()
+
+    def test_date_likeness(self):
+        """Test the date validity tables against calendar rules"""
+        import datetime
+        import partd
+
+        self.assertTrue(datelike.is_valid_date(29, 2, 2000))
+        self.assertFalse(datelike.is_valid_date(29, 2, 2100))
+        self.assertFalse(datelike.is_valid_date(31, 4))
+        self.assertEqual(datelike.current_year(), datetime.datetime.now().year)
+
+        formats = ("DDMMYY", "MMDDYY")
+        self.assertTrue(datelike.reads_as_date("290200", formats))
+        self.assertFalse(datelike.reads_as_date("290201", formats))
+        self.assertTrue(datelike.reads_as_date("123101", formats))
+        self.assertTrue(datelike.reads_as_date("010203", ("YYMMDD",), 2001, 2001))
+        self.assertFalse(datelike.reads_as_date("3104", ("DDMM",)))
+        self.assertTrue(datelike.reads_as_date("3104", ("DDMM",), calendar=False))
+        self.assertFalse(datelike.reads_as_date("1506", formats))
+
+        validator = partd.SixDigitMPINValidator()
+        limit = datelike.current_year() + 5 - 2000
+        self.assertTrue(validator._has_date_pattern(f"1506{limit:02d}"))
+        self.assertFalse(validator._has_date_pattern(f"1506{limit + 1:02d}"))
+        self.assertFalse(validator._has_date_pattern("310405"))
+        self.assertFalse(validator._has_date_pattern("991231"))
+        self.assertTrue(MPINValidator()._is_pin_pattern("3102"))
+        self.assertFalse(MPINValidator()._is_pin_pattern("3113"))
+
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        values = np.array([290200, 290201, 123101, 999999])
+        self.assertEqual(datelike.date_flags(values, formats).tolist(), [True, False, True, False])
+
+    def test_entropy_scores(self):
+        """Test the quantised entropy levels against the direct formula"""
+        import math
+        import partd
+        from mpin_validator import entropy
+
+        def direct(mpin):
+            counts = [mpin.count(digit) for digit in set(mpin)]
+            shannon = -sum(count / len(mpin) * math.log2(count / len(mpin)) for count in counts)
+            changes = sum(a != b for a, b in zip(mpin, mpin[1:]))
+            return 0.7 * shannon + 0.3 * changes / (len(mpin) - 1)
+
+        samples = ["000000", "112233", "121212", "123456", "482915", "1234", "90210", "12345678"]
+        for mpin in samples:
+            self.assertAlmostEqual(entropy.score(mpin), direct(mpin), places=12, msg=mpin)
+
+        validator = partd.SixDigitMPINValidator()
+        validator.set_demographics()
+        result = validator.check_mpin("482915")
+        self.assertEqual(result["entropy_score"], round(direct("482915"), 2))
+        self.assertTrue(validator.is_weak_mpin("121200"))
+
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        codes, levels = entropy.score_table(6)
+        self.assertEqual(len(codes), 10 ** 6)
+        self.assertLessEqual(len(levels), 256)
+        for length in (4, 6, 8):
+            values = np.arange(0, 10 ** length, 10 ** length // 997 + 1)
+            expected = [direct(f"{value:0{length}d}") for value in values.tolist()]
+            np.testing.assert_allclose(entropy.scores(values, length), expected, rtol=0, atol=1e-12)
+
+    def test_rule_policy(self):
+        """Test declarative rules against the hand-written detectors"""
+        try:
+            import numpy as np
+            from mpin_validator import rules, reasons, tables, vectorized
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+
+        policy = rules.standard_policy()
+        validator = SixDigitMPINValidator()
+        detectors = {reasons.PATTERN_REASONS[name]: getattr(validator, name) for name in tables.DETECTOR_NAMES}
+        self.assertEqual(policy.names, tuple(detectors))
+
+        settings = {reasons.PATTERN_REASONS[name]: values
+                    for name, values in tables.detector_parameters(validator).items()}
+        masks = np.concatenate([masks for _, masks in policy.keyspace(4, chunk_size=4096)])
+        sample = np.random.default_rng(7).integers(0, 10 ** 6, 5000)
+        for values, length, masks in [(range(10 ** 4), 4, masks),
+                                      (sample, 6, policy.evaluate(vectorized.digit_matrix(sample, 6),
+                                                                  settings=settings))]:
+            for value, mask in zip(values, masks.tolist()):
+                mpin = f"{value:0{length}d}"
+                expected = tuple(name for name in policy.names if detectors[name](mpin))
+                self.assertEqual(policy.decode(mask), expected, mpin)
+
+        # The batch kernels are the detector rules
+        digits = vectorized.digit_matrix(sample, 6)
+        self.assertEqual(vectorized.detector_masks(digits, None, tables.detector_parameters(validator)).tolist(),
+                         rules.detector_policy().evaluate(digits, settings=tables.detector_parameters(validator))
+                         .tolist())
+
+        self.assertIn("ARITHMETIC_SEQUENCE", policy.check("135790"))
+        policy.add("LEADING_ZERO", "d[0] == 0")
+        self.assertEqual(policy.check("0918")[-2:], ("DATE_LIKE", "LEADING_ZERO"))
+
+        # Settings have defaults, can be overridden per evaluation and are checked
+        low = rules.Rule("LOW", "any(blocks(p) > 1 and blocks(p) * p >= length * coverage"
+                                " for p in range(1, length))", {"coverage": 0.6})
+        self.assertEqual(low.evaluate(np.array([[1, 2, 1, 2, 3, 4]])).tolist(), [True])
+        self.assertEqual(low.evaluate(np.array([[1, 2, 1, 2, 3, 4]]), coverage=0.8).tolist(), [False])
+        with self.assertRaises(TypeError):
+            low.evaluate(np.zeros((1, 4), dtype=np.int16), years=(1930, 2025))
+        self.assertEqual(rules.Rule("NEAR", "adjacent(d[0], d[1]) and first(9) == -1").evaluate(
+            np.array([[1, 2, 3, 9], [1, 2, 3, 4], [1, 3, 5, 7]])).tolist(), [False, True, False])
+
+        for expression in ["d[0] ==", "__import__('os')", "d[x] == 1", "period(d[0])", "1.5 > 0",
+                           "d[d[0]] == 1", "first(d[0]) == 0", "any(d[i] == 1 for i in d)",
+                           "any(d[i] == 1 for i in range(4) if i)", "sum(d[length] for length in range(4))"]:
+            with self.assertRaises(ValueError):
+                rules.Rule("BAD", expression).evaluate(np.zeros((1, 4), dtype=np.int16))
+
 
 # Main function to run a demonstration
 def run_demo():